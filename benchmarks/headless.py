@@ -0,0 +1,24 @@
+"""The overlays without a display: they render to a RecordingRenderBackend, such that only Python is measured"""
+from typing import Optional, Type
+
+from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelSnapshot
+from src.backend.iRacing.overlay_telemetries.relative_telemetry import RelativeSnapshot
+from src.frontend.overlays.fuel_overlay import FuelOverlay
+from src.frontend.overlays.relative_overlay import RelativeOverlay
+from src.frontend.rendering import RecordingRenderBackend
+from src.startup.my_configuration import CompleteConfig
+
+
+def headless_relative_overlay(configuration: CompleteConfig,
+                              backend: Optional[RecordingRenderBackend] = None,
+                              overlay_type: Type[RelativeOverlay] = RelativeOverlay) -> RelativeOverlay:
+    overlay = overlay_type(root=None, configuration=configuration, telemetry=RelativeSnapshot(),
+                           backend=backend if backend else RecordingRenderBackend())
+    overlay.ensure_correct_row_initialization()
+    return overlay
+
+
+def headless_fuel_overlay(configuration: CompleteConfig,
+                          backend: Optional[RecordingRenderBackend] = None) -> FuelOverlay:
+    return FuelOverlay(root=None, configuration=configuration, telemetry=FuelSnapshot(),
+                       backend=backend if backend else RecordingRenderBackend())
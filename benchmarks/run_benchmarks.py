@@ -0,0 +1,388 @@
+"""
+Benchmarks of the per tick hot paths, on the scenario dumps and on synthetic fields of 20, 40 and 63 cars.
+
+    python -m benchmarks.run_benchmarks                    # Compares against benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --update-baseline  # Stores the results (and golden frames) as the new baseline
+    python -m benchmarks.run_benchmarks --update-golden    # Only stores the golden frames
+
+The durations are normalized by a fixed calibration workload, such that the baseline stays usable between
+machines to some extent. To filter out the noise of other processes, everything is run for multiple rounds
+(each with its own calibration) and the best round counts.
+A benchmark that is more than --tolerance slower than its baseline fails the run.
+
+The overlays render to a RecordingRenderBackend, which counts the widget operations (the Tcl calls on a display)
+per frame. More operations per frame than the baseline allows fails the run as well, as does an overlay that shows
+something else than its golden frame in benchmarks/golden after a fixed number of ticks (for the scenario dumps:
+at the last frame of every dump, in the last pass over the dumps).
+
+Every run also checks that the batch relative (relative_batch) gives the same entries as the scalar reference
+implementation, on every tick of the scenario dumps and of the synthetic fields, in both relative modes. NORMAL mode
+is checked on non-monotonic estimation data as well, which both get in the validated (flattened) form.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import statistics
+import sys
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.headless import headless_fuel_overlay, headless_relative_overlay
+from benchmarks.synthetic_field import CAR_CLASS_ID, TRACK_ID, TRACK_VERSION, SyntheticField
+from src.backend.iRacing.ir_replay import IRReplay, find_scenario_dumps
+from src.backend.iRacing.overlay_telemetries.estimation_cache import EstimationCache
+from src.backend.iRacing.overlay_telemetries.estimation_table import EstimationTable
+from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelTelemetry
+from src.backend.iRacing.overlay_telemetries.race_projection import RaceProjection
+from src.backend.iRacing.overlay_telemetries.relative_telemetry import EstimationData, RelativeTelemetry, \
+    compile_estimation_data
+from src.backend.iRacing.overlay_telemetries.timing_telemetry import TimingTelemetry
+from src.backend.iRacing.session_info_cache import SessionInfoCache
+from src.frontend.overlays.relative_canvas_overlay import RelativeCanvasOverlay
+from src.frontend.rendering import RecordingRenderBackend
+from src.startup.my_configuration import CompleteConfig
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+GOLDEN_DIRECTORY = os.path.join(os.path.dirname(__file__), "golden")
+GOLDEN_TICKS = 300  # Ticks of a fresh bench before its overlays are compared against the golden frames
+DEFAULT_RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results", "benchmark_results.json")  # Git ignored
+SYNTHETIC_FIELD_SIZES = (20, 40, 63)
+
+
+@dataclass
+class BenchmarkResult:
+    iterations: int
+    median_us: float
+    p95_us: float
+    mean_us: float
+    normalized: float  # Median divided by the calibration of the same round
+
+
+class TelemetryBench:
+    """The telemetry components on top of a (stand-in) sdk, advanced one tick at a time outside of the measurements"""
+
+    def __init__(self, ir_sdk, advance: Callable[[], None], estimation_data: Optional[EstimationData] = None,
+                 golden_name: Optional[Callable[[str, int], Optional[str]]] = None):
+        self.ir_sdk = ir_sdk
+        self.advance = advance
+        # Given the scenario and the ticks that remain, the golden frame the current tick is compared against (if any)
+        self.golden_name = golden_name or last_tick_golden_name
+        self.session_info = SessionInfoCache(ir_sdk=ir_sdk)
+        self.timing = TimingTelemetry(ir_sdk=ir_sdk, session_info=self.session_info)
+        self.race_projection = RaceProjection(ir_sdk=ir_sdk, session_info=self.session_info,
+                                              timing_telemetry=self.timing)
+        self.fuel = FuelTelemetry(ir_sdk=ir_sdk, timing_telemetry=self.timing, race_projection=self.race_projection)
+        estimation_cache = None
+        if estimation_data:  # NORMAL mode, otherwise the relative runs in LITE mode and logs the data
+            estimation_cache = EstimationCache(file_path=":memory:")
+            estimation_cache.put(track_id=TRACK_ID, track_version=TRACK_VERSION, car_class_id=CAR_CLASS_ID,
+                                 distance_normalized=estimation_data.distance_normalized,
+                                 estimate_time=estimation_data.estimate_time,
+                                 resolution_normalized=estimation_data.resolution_normalized)
+        self.relative = RelativeTelemetry(ir_sdk=ir_sdk, session_info=self.session_info, dynamo_db_resource=None,
+                                          estimation_cache=estimation_cache)
+        configuration = CompleteConfig()
+        self.relative_backend = RecordingRenderBackend()
+        self.overlay = headless_relative_overlay(configuration=configuration, backend=self.relative_backend)
+        self.relative_canvas_backend = RecordingRenderBackend()
+        self.canvas_overlay = headless_relative_overlay(configuration=configuration,
+                                                        backend=self.relative_canvas_backend,
+                                                        overlay_type=RelativeCanvasOverlay)
+        self.fuel_backend = RecordingRenderBackend()
+        self.fuel_overlay = headless_fuel_overlay(configuration=configuration, backend=self.fuel_backend)
+        for backend in (self.relative_backend, self.relative_canvas_backend, self.fuel_backend):
+            backend.reset()  # Only the frames count, not building the widgets
+
+    def tick(self) -> None:
+        self.advance()
+        self.session_info.update()
+        self.timing.update()
+
+    def run(self, iterations: int) -> Dict[str, List[float]]:
+        samples: Dict[str, List[float]] = {}
+
+        def measure(name: str, fn: Callable[[], object]) -> None:
+            start = perf_counter()
+            fn()
+            samples.setdefault(name, []).append(perf_counter() - start)
+
+        for _ in range(iterations):
+            self.tick()
+            measure("RelativeTelemetry.update", self.relative.update)
+            measure("RaceProjection.update", self.race_projection.update)
+            if self.session_info.snapshot.leader and self.session_info.snapshot.player_car_idx is not None:
+                # The first access of an update does the projection, the fuel telemetry only reads it on a new lap
+                measure("RaceProjection.laps_to_finish_player", lambda: self.race_projection.laps_to_finish_player)
+            measure("FuelTelemetry.update", self.fuel.update)
+            self.overlay.set_telemetry(self.relative.snapshot())
+            measure("RelativeOverlay.update_rows", self.overlay.update_rows)
+            self.relative_backend.end_frame()
+            self.canvas_overlay.set_telemetry(self.relative.snapshot())
+            measure("RelativeCanvasOverlay.update_rows", self.canvas_overlay.update_rows)
+            self.relative_canvas_backend.end_frame()
+            self.fuel_overlay.set_telemetry(self.fuel.snapshot())
+            measure("FuelOverlay.update", self.fuel_overlay.update)
+            self.fuel_backend.end_frame()
+        return samples
+
+    def widget_operations(self) -> Dict[str, float]:
+        """Per frame, over all frames so far"""
+        return {"RelativeOverlay": self.relative_backend.operations_per_frame,
+                "RelativeCanvasOverlay": self.relative_canvas_backend.operations_per_frame,
+                "FuelOverlay": self.fuel_backend.operations_per_frame}
+
+    def golden_files(self, name: str) -> Dict[str, RecordingRenderBackend]:
+        return {os.path.join(GOLDEN_DIRECTORY, f"relative_{name}.json"): self.relative_backend,
+                os.path.join(GOLDEN_DIRECTORY, f"relative_canvas_{name}.json"): self.relative_canvas_backend,
+                os.path.join(GOLDEN_DIRECTORY, f"fuel_{name}.json"): self.fuel_backend}
+
+
+def last_tick_golden_name(scenario: str, remaining_ticks: int) -> Optional[str]:
+    return scenario if remaining_ticks == 0 else None
+
+
+def replay_golden_name(replay: IRReplay) -> Callable[[str, int], Optional[str]]:
+    """
+    The last frame of every dump in the last pass over the dumps, named after the dump.
+    Such that every dump is covered, e.g. the dumps with another player car than the one of the last dump.
+    """
+    def golden_name(scenario: str, remaining_ticks: int) -> Optional[str]:
+        if remaining_ticks >= replay.nr_frames or not replay.at_end_of_file:
+            return None
+        return os.path.basename(os.path.dirname(replay.current_frame.file_path))
+    return golden_name
+
+
+def linear_estimation_data(lap_time: float, nr_samples: int = 84) -> EstimationData:
+    """Estimation data of a car that goes round at a constant speed"""
+    resolution = 1 / nr_samples
+    distances = [(i + 1) * resolution for i in range(nr_samples)]
+    return EstimationData(distance_normalized=distances,
+                          estimate_time=[d * lap_time for d in distances],
+                          resolution_normalized=resolution)
+
+
+def noisy_estimation_data(estimation_data: EstimationData) -> EstimationData:
+    """The estimation data with noise as in logged data: every 5th estimate time dips below the one before it"""
+    estimate_time = list(estimation_data.estimate_time)
+    for index in range(5, len(estimate_time) - 1, 5):
+        estimate_time[index] = estimate_time[index - 1] - 0.5 * (estimate_time[index] - estimate_time[index - 1])
+    return EstimationData(distance_normalized=estimation_data.distance_normalized, estimate_time=estimate_time,
+                          resolution_normalized=estimation_data.resolution_normalized)
+
+
+def scenario_benches() -> Dict[str, TelemetryBench]:
+    benches = {}
+    dump_files = find_scenario_dumps()
+    if dump_files:
+        replay = IRReplay(dump_files=dump_files, speed=None, loop=True)
+        replay.startup()
+        benches["scenario_dumps"] = TelemetryBench(ir_sdk=replay, advance=replay.freeze_var_buffer_latest,
+                                                   golden_name=replay_golden_name(replay))
+
+    for nr_cars in SYNTHETIC_FIELD_SIZES:
+        field = SyntheticField(nr_cars=nr_cars)
+        benches[f"synthetic_{nr_cars}"] = TelemetryBench(ir_sdk=field, advance=field.advance,
+                                                         estimation_data=linear_estimation_data(field.lap_time))
+    return benches
+
+
+def relative_equivalence() -> List[str]:
+    """
+    Compares the batch relative with the scalar reference on every tick of fresh benches, returns the differences.
+    Each tick is compared with the estimation tables of the bench (NORMAL mode, if any), with a non-monotonic version
+    of these (which the tables flatten) and without them (LITE mode).
+    Only the first differing tick per scenario and mode is reported.
+    """
+    differences: Dict[str, str] = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        benches = scenario_benches()
+        for scenario, bench in benches.items():
+            relative = bench.relative
+            noisy: Dict[int, Tuple[EstimationData, EstimationTable]] = {}
+            for tick in range(GOLDEN_TICKS):
+                bench.tick()
+                relative.update()
+                if relative.player_car_id is None or relative.player_car_class_id is None:
+                    continue  # Not updated either
+
+                class_estimation_data, estimation_tables = relative.class_estimation_data, relative.estimation_tables
+                variants = [("", class_estimation_data, estimation_tables), ("", {}, {})]
+                if estimation_tables:
+                    for class_id in estimation_tables.keys() - noisy.keys():
+                        noisy_data = noisy_estimation_data(class_estimation_data[class_id])
+                        noisy[class_id] = compile_estimation_data(estimation_data=noisy_data)
+                    variants.append((" with non-monotonic data",
+                                     {class_id: noisy[class_id][0] for class_id in estimation_tables},
+                                     {class_id: noisy[class_id][1] for class_id in estimation_tables}))
+                for variant, data, tables in variants:
+                    relative.class_estimation_data, relative.estimation_tables = dict(data), dict(tables)
+                    batch = relative.get_sorted_relative_entries()
+                    scalar = relative.get_sorted_relative_entries_scalar()
+                    name = f"{scenario} in {relative.mode.name} mode{variant}"
+                    if batch != scalar and name not in differences:
+                        differences[name] = f"{name} from tick {tick}: the {len(batch)} batch and {len(scalar)} " \
+                                            f"scalar entries differ"
+                relative.class_estimation_data, relative.estimation_tables = class_estimation_data, estimation_tables
+                relative.update_table()
+    return list(differences.values())
+
+
+def golden_frames(update: bool) -> List[str]:
+    """
+    Runs fresh benches for a fixed number of ticks, returns the differences with the golden frames.
+    The ticks to compare are up to the bench, by default only the last one.
+    """
+    differences = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        benches = scenario_benches()
+        for scenario, bench in benches.items():
+            for tick in range(GOLDEN_TICKS):
+                bench.run(iterations=1)
+                name = bench.golden_name(scenario, GOLDEN_TICKS - tick - 1)
+                if name:
+                    differences += golden_frame(bench=bench, name=name, update=update)
+    if update:
+        print(f"Golden frames written to {GOLDEN_DIRECTORY}")
+    return differences
+
+
+def golden_frame(bench: TelemetryBench, name: str, update: bool) -> List[str]:
+    differences = []
+    for file_path, backend in bench.golden_files(name).items():
+        if update:
+            backend.save_golden(file_path)
+        elif not os.path.exists(file_path):
+            differences.append(f"{file_path}: no golden frame, run with --update-golden first")
+        else:
+            differences += [f"{os.path.basename(file_path)}{difference}"
+                            for difference in backend.compare_golden(file_path)]
+    return differences
+
+
+def calibrate(repeats: int = 50) -> float:
+    """Best duration (us) of a fixed pure Python workload"""
+    data = [math.sin(i) for i in range(2000)]
+    samples = []
+    for _ in range(repeats):
+        start = perf_counter()
+        sorted(data)
+        sum(x * x for x in data)
+        samples.append(perf_counter() - start)
+    return min(samples) * 1e6
+
+
+def summarize(samples: List[float], calibration_us: float) -> BenchmarkResult:
+    ordered = sorted(samples)
+    median_us = statistics.median(ordered) * 1e6
+    return BenchmarkResult(iterations=len(ordered),
+                           median_us=median_us,
+                           p95_us=ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1e6,
+                           mean_us=statistics.fmean(ordered) * 1e6,
+                           normalized=median_us / calibration_us)
+
+
+def run_all(iterations: int, rounds: int) -> dict:
+    benches = scenario_benches()
+    best: Dict[str, BenchmarkResult] = {}
+    widget_operations: Dict[str, float] = {}
+    best_calibration_us = math.inf
+    with contextlib.redirect_stdout(io.StringIO()):  # The telemetry prints some debug info, not of interest here
+        for _ in range(rounds):
+            calibration_us = calibrate()
+            best_calibration_us = min(best_calibration_us, calibration_us)
+            for scenario, bench in benches.items():
+                for name, samples in bench.run(iterations=iterations).items():
+                    result = summarize(samples, calibration_us)
+                    key = f"{scenario}/{name}"
+                    if key not in best or result.normalized < best[key].normalized:
+                        best[key] = result
+    for scenario, bench in benches.items():
+        for overlay, operations in bench.widget_operations().items():
+            widget_operations[f"{scenario}/{overlay}"] = operations
+    return {"calibration_us": best_calibration_us,
+            "benchmarks": {name: asdict(result) for name, result in best.items()},
+            "widget_operations": widget_operations}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns the names of the benchmarks that got slower than the baseline allows"""
+    regressions = []
+    for name, base in baseline["benchmarks"].items():
+        current = results["benchmarks"].get(name)
+        if current is None:
+            print(f"{name:<58} missing in the results")
+            continue
+
+        ratio = current["normalized"] / base["normalized"] if base["normalized"] else 1.0
+        failed = ratio > 1 + tolerance
+        if failed:
+            regressions.append(name)
+        print(f"{name:<58}{current['median_us']:>10.1f} us {ratio:>7.2f}x {'REGRESSION' if failed else 'ok'}")
+
+    for name, base_operations in baseline.get("widget_operations", {}).items():
+        operations = results["widget_operations"].get(name)
+        if operations is None:
+            print(f"{name:<58} missing in the results")
+            continue
+
+        failed = operations > max(base_operations, 1.0) * (1 + tolerance)  # An operation more of next to none is fine
+        if failed:
+            regressions.append(name)
+        print(f"{name:<58}{operations:>10.1f} ops/frame (was {base_operations:.1f}) "
+              f"{'REGRESSION' if failed else 'ok'}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500, help="Ticks per scenario per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds of which the best counts")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_FILE, help="Json file the results are written to")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Json file with the baseline results")
+    parser.add_argument("--update-baseline", action="store_true", help="Stores the results as the baseline")
+    parser.add_argument("--update-golden", action="store_true", help="Stores the golden frames of the overlays")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slow down, 0.3 is 30%%")
+    args = parser.parse_args()
+
+    differences = golden_frames(update=args.update_golden or args.update_baseline)
+    if args.update_golden:
+        return
+    equivalence_differences = relative_equivalence()
+    for difference in equivalence_differences:
+        print(f"Relative mismatch with the scalar reference: {difference}")
+    if equivalence_differences:
+        sys.exit(1)
+
+    results = run_all(iterations=args.iterations, rounds=args.rounds)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline found at {args.baseline}, run with --update-baseline first")
+        sys.exit(1)
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results=results, baseline=baseline, tolerance=args.tolerance)
+    for difference in differences:
+        print(f"Golden frame mismatch {difference}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed more than {args.tolerance:.0%}")
+    if regressions or differences:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic stand-in for the IRSDK with a field of N cars going round, to benchmark bigger grids than the dumps"""
+import random
+from typing import List
+
+NR_CAR_SLOTS = 64  # The CarIdx arrays of the sim always have this length
+PLAYER_CAR_IDX = 1  # CarIdx 0 is taken by the pace car in the sim
+CAR_CLASS_ID = 4011
+TRACK_ID = 219
+TRACK_VERSION = "2023.03.01.01"
+
+
+class SyntheticField:
+    """
+    Provides the sdk keys the telemetry reads (CarIdx arrays and session info) for nr_cars cars of a single class.
+    Every advance() moves the cars along the track as a tick of the sim would, deterministic for the same seed.
+    """
+
+    def __init__(self, nr_cars: int, seed: int = 0, lap_time: float = 90.0, tick_rate: int = 60):
+        if not 1 <= nr_cars < NR_CAR_SLOTS:
+            raise ValueError(f"The field should hold 1 to {NR_CAR_SLOTS - 1} cars, got {nr_cars}")
+
+        self.nr_cars = nr_cars
+        self.lap_time = lap_time
+        self.tick_rate = tick_rate
+        self.session_info_update = 1
+        self._random = random.Random(seed)
+
+        car_ids = range(1, nr_cars + 1)
+        self.lap_times = {idx: lap_time * self._random.uniform(0.98, 1.05) for idx in car_ids}
+        self.distance = [-1.0] * NR_CAR_SLOTS
+        self.laps = [-1] * NR_CAR_SLOTS
+        self.on_pit_road = [False] * NR_CAR_SLOTS
+        for idx in car_ids:
+            self.distance[idx] = self._random.random()
+            self.laps[idx] = self._random.randint(3, 5)
+            self.on_pit_road[idx] = self._random.random() < 0.1
+        self.on_pit_road[PLAYER_CAR_IDX] = False
+
+        self.fuel_level = 60.0
+        self.session_time_remain = 3600.0
+        self._variables = {}
+        self._session_info = self._build_session_info()
+        self._update_variables()
+
+    def advance(self) -> None:
+        """Moves every car one tick further along the track"""
+        dt = 1 / self.tick_rate
+        for idx, car_lap_time in self.lap_times.items():
+            distance = self.distance[idx] + dt / car_lap_time
+            if distance >= 1.0:
+                distance -= 1.0
+                self.laps[idx] += 1
+            self.distance[idx] = distance
+
+        self.fuel_level = max(self.fuel_level - 0.002, 0.0)
+        self.session_time_remain = max(self.session_time_remain - dt, 0.0)
+        self._update_variables()
+
+    def __getitem__(self, key):
+        if key in self._variables:
+            return self._variables[key]
+        return self._session_info.get(key)
+
+    def _update_variables(self) -> None:
+        progress = sorted(self.lap_times, key=lambda idx: self.laps[idx] + self.distance[idx], reverse=True)
+        class_position = [0] * NR_CAR_SLOTS
+        for position, idx in enumerate(progress):
+            class_position[idx] = position + 1
+
+        self._variables = {
+            'CarIdxLapDistPct': list(self.distance),
+            'CarIdxLap': list(self.laps),
+            'CarIdxOnPitRoad': list(self.on_pit_road),
+            'CarIdxClassPosition': class_position,
+            'CarIdxTireCompound': [0 if idx in self.lap_times else -1 for idx in range(NR_CAR_SLOTS)],
+            'CarIdxClass': [CAR_CLASS_ID if idx in self.lap_times else 0 for idx in range(NR_CAR_SLOTS)],
+            'CarIdxEstTime': [max(d, 0.0) * self.lap_time for d in self.distance],
+            'FuelLevel': self.fuel_level,
+            'LapCompleted': self.laps[PLAYER_CAR_IDX],
+            'LapLastLapTime': self.lap_times[PLAYER_CAR_IDX],
+            'SessionTimeRemain': self.session_time_remain,
+        }
+
+    def _build_session_info(self) -> dict:
+        drivers: List[dict] = []
+        for idx in self.lap_times:
+            drivers.append({'CarIdx': idx,
+                            'CarNumberRaw': idx + 10,
+                            'UserName': f"Driver {idx}",
+                            'LicString': self._random.choice(["A 4.99", "B 3.21", "C 2.50", "D 1.80", "R 0.50"]),
+                            'IRating': self._random.randint(300, 9000),
+                            'CarClassID': CAR_CLASS_ID,
+                            'CarClassEstLapTime': self.lap_time})
+
+        leader = max(self.lap_times, key=lambda idx: self.laps[idx] + self.distance[idx])
+        return {
+            'DriverInfo': {'DriverCarIdx': PLAYER_CAR_IDX,
+                           'DriverCarEstLapTime': self.lap_time,
+                           'Drivers': drivers},
+            'WeekendInfo': {'TrackID': TRACK_ID,
+                            'TrackVersion': TRACK_VERSION,
+                            'TrackLengthOfficial': "4.20 km"},
+            'SessionInfo': {'Sessions': [{'ResultsPositions': [{'CarIdx': leader,
+                                                                'FastestTime': self.lap_times[leader]}]}]},
+        }
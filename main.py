@@ -1,70 +1,126 @@
 """Module for logging"""
 import logging
-import time
 import tkinter
-
-# import of these is required as they are dynamically but nuitka doesn't realise
-import win32api
-import win32timezone
-import yaml
+from concurrent.futures import Future
 
 from src.backend.AWS.credentials import CognitoIdentityClient
+from src.backend.AWS.login import CognitoIDPClient, CognitoIDPToken
 from src.backend.AWS.resources import AWSResources
-from src.backend.iRacing.telemetry import RITelemetry
-from src.client_app.client_app import ClientApp
-from src.frontend.user_interface import UserInterface
-from src.startup.my_configuration import load_configuration, object_to_dict
+from src.startup.my_configuration import CompleteConfig, load_configuration, object_to_dict
 from src.startup.my_logger import initialize_logging
 from src.startup.my_login import do_login
+from src.startup.my_startup import BackgroundStartup, StartupTimings
 from src.startup.my_theme import set_my_theme
 
+# The modules of the telemetry and the UI, imported in the background while the login screen is shown
+APP_MODULES = ("src.backend.iRacing.telemetry", "src.frontend.user_interface", "src.client_app.client_app")
 
-def main() -> None:
-    start = time.time()
-    """Main application function"""
-    # -- Startup
-    initialize_logging(production=False)
 
-    # Only here to trigger imports of win32 libs
+def log_local_time() -> None:
+    """Only here to trigger imports of the win32 libs, they are imported dynamically but nuitka doesn't realise"""
+    # pylint: disable=import-outside-toplevel  # Imported on the startup thread, off the critical path
+    import win32api
+    import win32timezone
+
     logging.info("Time now in UTC: %s", win32timezone.utcnow())
     logging.info("Local time now: %s", win32api.GetLocalTime())
 
-    # Initialize the configuration - this is used for the app state
-    configuration = load_configuration()
-
-    # Initialize tkinter and set the app UI theme
-    root = tkinter.Tk()
-    root.withdraw()  # Such that it doesn't show the root window
-    font = f"{configuration.font.style} {configuration.font.size} {configuration.font.extra}"
-    set_my_theme(font=font)
 
-    # Authentication
-    login_success, idp_token = do_login(root=root, config=configuration)  # Takes approx 2.8s
+def create_aws_resources(identity_client: CognitoIdentityClient, idp_token: CognitoIDPToken) -> AWSResources:
+    aws_credentials = identity_client.get_aws_credentials(idp_token=idp_token)
+    return AWSResources(aws_credentials=aws_credentials)
 
-    if not login_success:
-        logging.info("Login screen was closed without a login, app is closed")
-        return
 
-    # -- Backend
-    # AWS - User has been authenticated at this point
-    cognito_identity_client = CognitoIdentityClient()  # Takes approx 2s
-    aws_credentials = cognito_identity_client.get_aws_credentials(idp_token=idp_token)
-    aws_resources = AWSResources(aws_credentials=aws_credentials)
+def run_app(root: tkinter.Tk, configuration: CompleteConfig, aws_resources: "Future[AWSResources]",
+            startup: BackgroundStartup) -> None:
+    """Builds the telemetry and the UI on this (the Tk) thread while the AWS credentials are exchanged, then runs"""
+    # pylint: disable=import-outside-toplevel  # Preloaded by the startup thread
+    from src.backend.iRacing.lap_history import DEFAULT_LAP_HISTORY_FILE, LapHistory
+    from src.backend.iRacing.overlay_telemetries.estimation_cache import DEFAULT_ESTIMATION_CACHE_FILE, \
+        EstimationCache
+    from src.backend.iRacing.telemetry import RITelemetry
+    from src.backend.iRacing.telemetry_recorder import DEFAULT_RECORDING_FILE, TelemetryRecorder
+    from src.backend.utils.allocation_profiling import AllocationProfiler
+    from src.backend.utils.frame_timing import FrameTimings
+    from src.client_app.client_app import ClientApp
+    from src.frontend.user_interface import UserInterface
 
     # iRacing
     # Only interaction with this is reading of attributes and calling update()
-    ri_telemetry = RITelemetry(dynamo_db_resource=aws_resources.dynamo_db)
+    with startup.timings.phase("RITelemetry"):
+        recorder = TelemetryRecorder(file_path=DEFAULT_RECORDING_FILE) if configuration.record_telemetry else None
+        timings = FrameTimings() if configuration.frame_timing else None
+        estimation_cache = EstimationCache(file_path=DEFAULT_ESTIMATION_CACHE_FILE)
+        lap_history = LapHistory(file_path=DEFAULT_LAP_HISTORY_FILE)
+        ri_telemetry = RITelemetry(dynamo_db_resource=None, recorder=recorder, timings=timings,
+                                   estimation_cache=estimation_cache, lap_history=lap_history)
 
     # --Frontend
-    user_interface = UserInterface(root, configuration, ri_telemetry)
+    with startup.timings.phase("UserInterface"):
+        user_interface = UserInterface(root, configuration, timings)
+
+    # -- Backend, AWS: the user has been authenticated at this point
+    with startup.timings.phase("wait for AWS resources"):
+        ri_telemetry.connect_db(dynamo_db_resource=aws_resources.result().dynamo_db)
+    startup.shutdown()
 
     # --Client app
-    client_app = ClientApp(root, ri_telemetry, user_interface, configuration)
-    end = time.time()
-    print(end-start)
-    client_app.run()
+    profiler = AllocationProfiler() if configuration.allocation_profiling else None
+    client_app = ClientApp(root, ri_telemetry, user_interface, configuration, timings, profiler)
+    logging.info("Startup phases (ms):\n%s", startup.timings.format_table())
+    startup.timings.export()
+    try:
+        client_app.run()
+    finally:  # Also when the mainloop raises: flushes the recording and checkpoints the SQLite files
+        ri_telemetry.close()
+        if recorder:
+            recorder.close()
+        estimation_cache.close()
+        lap_history.close()
+
+
+def main() -> None:
+    """Main application function"""
+    startup = BackgroundStartup(timings=StartupTimings())
+
+    # -- Startup
+    with startup.timings.phase("logging"):
+        initialize_logging(production=False)
+    startup.submit(name="win32 libs", fn=log_local_time)
+
+    # Initialize the configuration - this is used for the app state
+    with startup.timings.phase("configuration"):
+        configuration = load_configuration()
+
+    # Initialize tkinter and set the app UI theme
+    with startup.timings.phase("Tk"):
+        root = tkinter.Tk()
+        root.withdraw()  # Such that it doesn't show the root window
+        font = f"{configuration.font.style} {configuration.font.size} {configuration.font.extra}"
+        set_my_theme(font=font)
+
+    # The slow imports and the AWS clients are loaded in the background while the user types
+    cognito_idp_client = startup.submit(name="CognitoIDPClient", fn=CognitoIDPClient)
+    identity_client = startup.submit(name="CognitoIdentityClient", fn=CognitoIdentityClient)
+    startup.preload(*APP_MODULES)
+
+    # Authentication
+    with startup.timings.phase("login"):
+        login_success, idp_token = do_login(root=root, config=configuration, cognito=cognito_idp_client)
+
+    if not login_success:
+        logging.info("Login screen was closed without a login, app is closed")
+        startup.shutdown()
+        return
+
+    aws_resources = startup.submit(name="AWS credentials and resources",
+                                   fn=lambda: create_aws_resources(identity_client=identity_client.result(),
+                                                                   idp_token=idp_token))
+    run_app(root=root, configuration=configuration, aws_resources=aws_resources, startup=startup)
 
     # Save the final configuration desired_state
+    # import of this is required as it is dynamically but nuitka doesn't realise, only needed on exit
+    import yaml  # pylint: disable=import-outside-toplevel
     with open(r'config.yaml', 'w', encoding='utf-8') as file:
         _ = yaml.dump(object_to_dict(configuration), file)
 
@@ -1,7 +1,5 @@
 from dataclasses import dataclass
 
-import boto3
-
 from src.backend.AWS.addresses import AWSAddress
 from src.backend.AWS.login import CognitoIDPToken
 
@@ -21,6 +19,7 @@ class CognitoIdentityClient:
     """
 
     def __init__(self):
+        import boto3  # pylint: disable=import-outside-toplevel  # Slow to import, only loaded once a client is needed
         self.client = boto3.client('cognito-identity', region_name=AWSAddress.REGION.value)
 
     def get_aws_credentials(self, idp_token: CognitoIDPToken) -> AWSCredentials:
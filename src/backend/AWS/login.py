@@ -3,8 +3,6 @@ from dataclasses import dataclass
 from tkinter import messagebox, simpledialog
 from typing import Optional, Protocol, Tuple
 
-import boto3
-
 from src.backend.AWS.addresses import AWSAddress
 
 
@@ -17,6 +15,7 @@ class CognitoIDPClient:
     """Class for interacting with a cognito identity provider"""
 
     def __init__(self):
+        import boto3  # pylint: disable=import-outside-toplevel  # Slow to import, only loaded once a client is needed
         self.client = boto3.client('cognito-idp', region_name=AWSAddress.REGION.value)
 
     def get_login(self, email: str, password: str) -> Tuple[bool, Optional[CognitoIDPToken]]:
@@ -1,10 +1,9 @@
 import logging
+import threading
 from enum import Enum
 from typing import Optional, Tuple
 
-import boto3
 from botocore.exceptions import ClientError
-from dynamodb_json import json_util
 
 from src.backend.AWS.addresses import AWSAddress
 from src.backend.AWS.credentials import AWSCredentials
@@ -24,26 +23,60 @@ class AWSResources:
 
 
 class DynamoDB:
-    """General DynamoDB connection(s)"""
+    """
+    General DynamoDB connection(s)
+    A request times out after a few seconds and is not retried by boto, the callers decide on retries themselves.
+    boto3 sessions and resources are not thread safe, hence every thread gets a resource on a session of its own.
+    """
+    connect_timeout_s = 3
+    read_timeout_s = 5
 
     def __init__(self, aws_credentials: AWSCredentials):
-        self.resource = boto3.resource('dynamodb',
-                                       aws_access_key_id=aws_credentials.access_key_id,
-                                       aws_secret_access_key=aws_credentials.secret_access_key,
-                                       aws_session_token=aws_credentials.session_token,
-                                       region_name=AWSAddress.REGION.value
-                                       )
+        self.aws_credentials = aws_credentials
+        self._local = threading.local()
+        self.resource()  # The one of the creating thread, such that boto3 is loaded there
+
+    def resource(self):
+        """The resource of the calling thread, created on first use"""
+        resource = getattr(self._local, "resource", None)
+        if resource is None:
+            # Slow to import, only loaded once the resource is needed
+            import boto3  # pylint: disable=import-outside-toplevel
+            from botocore.config import Config  # pylint: disable=import-outside-toplevel
+            session = boto3.session.Session(aws_access_key_id=self.aws_credentials.access_key_id,
+                                            aws_secret_access_key=self.aws_credentials.secret_access_key,
+                                            aws_session_token=self.aws_credentials.session_token,
+                                            region_name=AWSAddress.REGION.value)
+            resource = self._local.resource = session.resource('dynamodb',
+                                                               config=Config(connect_timeout=self.connect_timeout_s,
+                                                                             read_timeout=self.read_timeout_s,
+                                                                             retries={'max_attempts': 1}))
+        return resource
 
 
 class DynamoDBTable:
-    """Class for instantiating and interacting with specific tables in the DynamoDB resource"""
+    """
+    Class for instantiating and interacting with specific tables in the DynamoDB resource.
+    Can be shared between threads, each thread uses the table on its own resource (see DynamoDB).
+    """
 
     def __init__(self, dynamo_db: DynamoDB, name: TableNames):
-        self.table = dynamo_db.resource.Table(name)
-
-    def get_item(self, key: dict, projection_expression: str, expression_attr_name: dict) -> Optional[dict]:
+        self.dynamo_db = dynamo_db
+        self.name = name
+        self._local = threading.local()
+
+    @property
+    def table(self):
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = self.dynamo_db.resource().Table(self.name)
+        return table
+
+    def get_item(self, key: dict, projection_expression: str, expression_attr_name: dict,
+                 raise_on_error: bool = False) -> Optional[dict]:
         """
-        Gets the item from the given table
+        Gets the item from the given table, None if it is not available.
+        With raise_on_error a failed request raises instead, to tell it apart from a missing item.
         Example inputs:
             key = {'track_id': 69},
             projection_expression = "EstimationData.#key_name,TrackVersion",
@@ -63,11 +96,12 @@ class DynamoDBTable:
             'TrackVersion': "2022.11.22.02",
         }
         """
-        table_response = self._get_table_response(key, projection_expression, expression_attr_name)
+        table_response = self._get_table_response(key, projection_expression, expression_attr_name, raise_on_error)
         item = self._get_item_from_response(table_response=table_response)
         return item
 
-    def _get_table_response(self, key: dict, projection_expression: str, expression_attr_name: dict) -> Optional[dict]:
+    def _get_table_response(self, key: dict, projection_expression: str, expression_attr_name: dict,
+                            raise_on_error: bool = False) -> Optional[dict]:
         """Returns the response from the table when trying to get a specific item"""
         try:
             table_response = self.table.get_item(  # EXAMPLE:
@@ -77,6 +111,8 @@ class DynamoDBTable:
             )
         except ClientError as exc:
             logging.error("%s:%s", exc.response['Error']['Code'], exc.response['Error']['Message'])
+            if raise_on_error:
+                raise
             return None
         return table_response
 
@@ -91,6 +127,7 @@ class DynamoDBTable:
         except KeyError as exc:
             logging.warning("No %s-key in the response from the db", exc)
             return None
+        from dynamodb_json import json_util  # pylint: disable=import-outside-toplevel  # Imports boto3
         return json_util.loads(item)
 
     def update_item(self, key: Tuple, update_expression, expression_attr_names, expression_attr_values):
@@ -0,0 +1,300 @@
+"""Offline replay of iRacing sdk memory map dumps, used as a stand-in for the live IRSDK"""
+import bisect
+import glob
+import logging
+import mmap
+import os
+import re
+import struct
+from dataclasses import dataclass
+from time import perf_counter, sleep
+from typing import Iterator, List, Optional, Tuple
+
+from irsdk import Header, IRSDK, VAR_TYPE_MAP, VarBuffer
+
+from src.backend.iRacing.telemetry_recorder import RECORDING_EXTENSION, SDK_HEADER_LEN, VAR_HEADER_LEN, \
+    RecordedFrame, open_recording, read_recording
+
+SCENARIO_DUMP_PATTERN = "scenario_freeze_*/iRacing_sdk_data.bin"
+
+
+@dataclass
+class ReplayFrame:
+    """A single var buffer of a dump, together with the time it should be played at (relative to replay start)"""
+    dump: IRSDK
+    var_buffer: VarBuffer
+    time_s: float
+    file_path: str  # Of the dump or recording the frame was read from
+
+
+@dataclass
+class ReplayStats:
+    """Counters that describe how the replay went"""
+    frames_played: int = 0
+    frames_dropped: int = 0  # Frames that were skipped because the consumer was too slow in timed mode
+    loops: int = 0
+
+
+class RecordedVarBuffer(VarBuffer):
+    """
+    Var buffer of a recorded frame, its memory is 'frozen' by definition and the tick count is the recorded one.
+    The values are read straight from the memory map of the recording, nothing is copied.
+    """
+
+    def __init__(self, shared_mem, frame: RecordedFrame, buf_len: int):
+        super().__init__(shared_mem, 48, buf_len=buf_len)
+        self._frozen_memory = frame.mem
+        self.is_memory_frozen = True
+        self._tick = frame.tick
+        self._offset = frame.offset
+
+    @property
+    def tick_count(self) -> int:
+        return self._tick
+
+    @property
+    def buf_offset(self) -> int:
+        return self._offset
+
+    def freeze(self):
+        """The recorded memory is all there is"""
+
+    def unfreeze(self):
+        """The recorded memory is all there is"""
+
+
+def find_scenario_dumps(logs_folder: str = "logs") -> List[str]:
+    """Returns the dumps made by the scenario freezer, sorted by their freeze number"""
+    def freeze_nr(path: str) -> int:
+        match = re.search(r"scenario_freeze_(\d+)", path)
+        return int(match.group(1)) if match else 0
+
+    return sorted(glob.glob(os.path.join(logs_folder, SCENARIO_DUMP_PATTERN)), key=freeze_nr)
+
+
+class IRReplay(IRSDK):
+    """
+    Plays back a sequence of memory map dumps as if the sim was running.
+    Every dump holds multiple var buffers (one per tick), each of these is replayed as a separate frame.
+    Recordings of the TelemetryRecorder (*.ring) can be given as well, these are replayed tick by tick.
+
+    speed: 1.0 replays at real time, N replays at N times real time and None replays as fast as possible,
+    in which case every freeze_var_buffer_latest() call advances exactly one frame (deterministic).
+
+    NOTE: Gaps between dumps (e.g. freezes taken minutes apart) are collapsed to a single tick,
+    anything larger than max_gap_ticks is considered a gap.
+    """
+
+    def __init__(self, dump_files: List[str], speed: Optional[float] = 1.0, loop: bool = False,
+                 max_gap_ticks: int = 60):
+        super().__init__()
+        if not dump_files:
+            raise ValueError("No dump files were given to replay")
+
+        self.dump_files = dump_files
+        self.speed = speed
+        self.loop = loop
+        self.max_gap_ticks = max_gap_ticks
+
+        self.stats = ReplayStats()
+        self.finished = False
+
+        self._frames: List[ReplayFrame] = []
+        self._recordings: List[mmap.mmap] = []  # Open for as long as their frames are replayed
+        self._frame_times: List[float] = []
+        self._frame_index = -1
+        self._first_frame_pending = False
+        self._start_time = 0.0
+
+    @property
+    def nr_frames(self) -> int:
+        return len(self._frames)
+
+    @property
+    def current_frame(self) -> Optional[ReplayFrame]:
+        if 0 <= self._frame_index < len(self._frames):
+            return self._frames[self._frame_index]
+        return None
+
+    @property
+    def at_end_of_file(self) -> bool:
+        """Whether the current frame is the last one of its dump (or recording)"""
+        index = self._frame_index
+        if not 0 <= index < len(self._frames):
+            return False
+        return index + 1 == len(self._frames) or self._frames[index + 1].file_path != self._frames[index].file_path
+
+    def startup(self, test_file=None, dump_to=None) -> bool:
+        """Opens all dumps (once) and (re)starts the replay clock. Returns False when the replay has finished"""
+        if self.finished:
+            return False
+
+        if not self._frames:
+            self._load_frames()
+
+        self._start_time = perf_counter()
+        self._set_frame(0)
+        self._first_frame_pending = True  # The first freeze should consume frame 0 instead of skipping it
+        self.is_initialized = True
+        return self.is_initialized
+
+    def shutdown(self) -> None:
+        self.is_initialized = False
+        for dump in {id(frame.dump): frame.dump for frame in self._frames}.values():
+            dump.shutdown()
+        self._frames = []
+        for recording in self._recordings:
+            recording.close()
+        self._recordings = []
+        self._frame_times = []
+        self._frame_index = -1
+        self._shared_mem = None
+        self._header = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._header is not None and not self.finished
+
+    @property
+    def session_info_update(self) -> int:
+        return self._header.session_info_update
+
+    @property
+    def var_headers_names(self) -> List[str]:
+        return self.current_frame.dump.var_headers_names
+
+    def __getitem__(self, key):
+        frame = self.current_frame
+        var_headers_dict = frame.dump._var_headers_dict
+        if key in var_headers_dict:
+            var_header = var_headers_dict[key]
+            res = struct.unpack_from(VAR_TYPE_MAP[var_header.type] * var_header.count,
+                                     frame.var_buffer.get_memory(),
+                                     frame.var_buffer.buf_offset + var_header.offset)
+            return res[0] if var_header.count == 1 else list(res)
+
+        return frame.dump._get_session_info(key)
+
+    @property
+    def _var_buffer_latest(self) -> VarBuffer:
+        return self.current_frame.var_buffer
+
+    def freeze_var_buffer_latest(self) -> None:
+        """Moves to the frame that the sim would be showing right now, waits for it when the consumer is early"""
+        if self.finished or not self._frames:
+            return
+
+        if self._first_frame_pending:
+            self._first_frame_pending = False
+            self.stats.frames_played += 1
+            return
+
+        if self.speed is None:
+            next_index = self._frame_index + 1
+        else:
+            next_index = self._index_due_now()
+            if next_index <= self._frame_index:  # No new data yet, wait for it like the sim's data valid event
+                next_index = self._frame_index + 1
+                if next_index < len(self._frames):
+                    sleep(max(self._wall_time_of(next_index) - perf_counter(), 0))
+            else:
+                self.stats.frames_dropped += next_index - self._frame_index - 1
+
+        if next_index >= len(self._frames):
+            if not self.loop:
+                self.finished = True
+                logging.info("Replay finished after %s frames", self.stats.frames_played)
+                return
+            self.stats.loops += 1
+            self._start_time = perf_counter()
+            next_index = 0
+
+        self._set_frame(next_index)
+        self.stats.frames_played += 1
+
+    def unfreeze_var_buffer_latest(self) -> None:
+        """Dumps are static, there is nothing to unfreeze"""
+
+    def _index_due_now(self) -> int:
+        elapsed = (perf_counter() - self._start_time) * self.speed
+        return bisect.bisect_right(self._frame_times, elapsed) - 1
+
+    def _wall_time_of(self, index: int) -> float:
+        return self._start_time + self._frame_times[index] / self.speed
+
+    def _set_frame(self, index: int) -> None:
+        self._frame_index = index
+        frame = self._frames[index]
+        self._shared_mem = frame.dump._shared_mem
+        self._header = frame.dump._header
+
+    def _load_frames(self) -> None:
+        """Opens every dump/recording and builds the frame schedule based on the tick counts"""
+        time_s = 0.0
+        previous_tick: Optional[int] = None
+        for file_path in self.dump_files:
+            if file_path.endswith(RECORDING_EXTENSION):
+                sources = self._recording_sources(file_path=file_path)
+            else:
+                sources = self._dump_sources(file_path=file_path)
+
+            for dump, var_buffer in sources:
+                if previous_tick is not None:
+                    delta_ticks = var_buffer.tick_count - previous_tick
+                    if delta_ticks <= 0 or delta_ticks > self.max_gap_ticks:
+                        delta_ticks = 1
+                    time_s += delta_ticks / dump._header.tick_rate
+                previous_tick = var_buffer.tick_count
+                self._frames.append(ReplayFrame(dump=dump, var_buffer=var_buffer, time_s=time_s,
+                                                file_path=file_path))
+
+        if not self._frames:
+            raise ValueError("None of the dump files could be opened for replay")
+
+        self._frame_times = [frame.time_s for frame in self._frames]
+        logging.info("Replay loaded %s frames from %s files", len(self._frames), len(self.dump_files))
+
+    @staticmethod
+    def _dump_sources(file_path: str) -> Iterator[Tuple[IRSDK, VarBuffer]]:
+        dump = IRSDK()
+        if not dump.startup(test_file=file_path):
+            logging.warning("Dump '%s' could not be opened for replay", file_path)
+            return
+
+        for var_buffer in sorted(dump._header.var_buf, key=lambda v: v.tick_count):
+            yield dump, var_buffer
+
+    def _recording_sources(self, file_path: str) -> Iterator[Tuple[IRSDK, VarBuffer]]:
+        """Rebuilds a memory map image for every layout/session info combination, frames share these images"""
+        recording = open_recording(file_path=file_path)
+        self._recordings.append(recording)
+        image: Optional[IRSDK] = None
+        previous: Optional[RecordedFrame] = None
+        for frame in read_recording(mem=recording):
+            if previous is None or frame.session_info_update != previous.session_info_update \
+                    or frame.layout != previous.layout:
+                image = _image_of(frame=frame)
+            previous = frame
+            yield image, RecordedVarBuffer(image._shared_mem, frame=frame, buf_len=image._header.buf_len)
+
+
+def _image_of(frame: RecordedFrame) -> IRSDK:
+    """Creates an sdk instance on top of a memory map image that holds the layout and session info of the frame"""
+    layout_header = Header(frame.layout)
+    var_headers_len = layout_header.num_vars * VAR_HEADER_LEN
+    size = max(layout_header.var_header_offset + var_headers_len,
+               layout_header.session_info_offset + layout_header.session_info_len)
+
+    mem = mmap.mmap(-1, size)
+    mem[0:SDK_HEADER_LEN] = frame.layout[0:SDK_HEADER_LEN]
+    mem[layout_header.var_header_offset:layout_header.var_header_offset + var_headers_len] = \
+        frame.layout[SDK_HEADER_LEN:]
+    mem[layout_header.session_info_offset:layout_header.session_info_offset + len(frame.session_info)] = \
+        frame.session_info
+    struct.pack_into("<i", mem, 12, frame.session_info_update)  # See irsdk.Header.session_info_update
+
+    image = IRSDK()
+    image._shared_mem = mem
+    image._header = Header(mem)
+    image.is_initialized = True
+    return image
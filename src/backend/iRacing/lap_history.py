@@ -0,0 +1,136 @@
+"""Persistent history of the laps of the player, per driver, car and track, across sessions"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.backend.utils.running_median import RunningMedian
+
+DEFAULT_LAP_HISTORY_FILE = "cache/lap_history.sqlite"
+
+
+@dataclass(frozen=True)
+class LapHistoryKey:
+    """The laps of one key are comparable to each other"""
+    driver_id: int  # UserID
+    car_id: int  # CarID, the car model (not the CarIdx)
+    track_id: int
+
+
+@dataclass(frozen=True)
+class LapRecord:
+    session_id: int
+    lap: int
+    lap_time: float
+    fuel_used: Optional[float]  # None when unknown, e.g. on a lap with a refuel
+
+
+class LapStatistics:
+    """Running medians of the laps of a key, adding a lap is O(log n) and reading a median O(1)"""
+
+    def __init__(self, laps: Iterable[LapRecord] = ()):
+        self.lap_times = RunningMedian()
+        self.fuel_used = RunningMedian()  # Of the laps with a known fuel use
+        for lap in laps:
+            self.add(lap_time=lap.lap_time, fuel_used=lap.fuel_used)
+
+    def add(self, lap_time: float, fuel_used: Optional[float]) -> None:
+        self.lap_times.add(lap_time)
+        if fuel_used:
+            self.fuel_used.add(fuel_used)
+
+    @property
+    def lap_time(self) -> Optional[float]:
+        """Median lap time, None without any laps"""
+        return self.lap_times.median if len(self.lap_times) else None
+
+    @property
+    def fuel_per_lap(self) -> Optional[float]:
+        """Median fuel use per lap, None without any laps with a known fuel use"""
+        return self.fuel_used.median if len(self.fuel_used) else None
+
+
+class LapHistory:
+    """
+    Append only SQLite store of the laps, grouped in sessions. A session starts with the first lap appended for a key
+    and lasts until end_session() or a lap for another key.
+    The sessions are indexed on their key, such that queries over the last N sessions of a key only touch those rows.
+
+    The statistics of a key are loaded from the last sessions once, after which the appended laps are added to them.
+    Hence, the laps of a session that drops out of the last sessions while the app runs are still part of them.
+
+    Can be used from multiple threads (single connection + lock). The appends are not synced to disk one by one
+    (WAL with synchronous=NORMAL), such that an append on a new lap costs next to nothing.
+    """
+
+    def __init__(self, file_path: str = DEFAULT_LAP_HISTORY_FILE, last_sessions: int = 10):
+        self.file_path = file_path
+        self.last_sessions = last_sessions
+        self._lock = threading.Lock()
+        self._session: Optional[Tuple[LapHistoryKey, int]] = None
+        self._statistics: Dict[LapHistoryKey, LapStatistics] = {}
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                                     "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                     "driver_id INTEGER NOT NULL, "
+                                     "car_id INTEGER NOT NULL, "
+                                     "track_id INTEGER NOT NULL, "
+                                     "started_at REAL NOT NULL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS sessions_by_key "
+                                     "ON sessions (driver_id, car_id, track_id, id)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS laps ("
+                                     "session_id INTEGER NOT NULL REFERENCES sessions (id), "
+                                     "lap INTEGER NOT NULL, "
+                                     "lap_time REAL NOT NULL, "
+                                     "fuel_used REAL, "
+                                     "PRIMARY KEY (session_id, lap))")
+
+    def append_lap(self, key: LapHistoryKey, lap: int, lap_time: float, fuel_used: Optional[float]) -> None:
+        with self._lock, self._connection:
+            if not self._session or self._session[0] != key:
+                cursor = self._connection.execute("INSERT INTO sessions (driver_id, car_id, track_id, started_at) "
+                                                  "VALUES (?, ?, ?, ?)",
+                                                  (key.driver_id, key.car_id, key.track_id, time.time()))
+                self._session = (key, cursor.lastrowid)
+            # A lap that is reported twice (e.g. after a reconnect) keeps its first record
+            cursor = self._connection.execute("INSERT OR IGNORE INTO laps VALUES (?, ?, ?, ?)",
+                                              (self._session[1], lap, lap_time, fuel_used))
+            if cursor.rowcount and key in self._statistics:
+                self._statistics[key].add(lap_time=lap_time, fuel_used=fuel_used)
+
+    def end_session(self) -> None:
+        """The next lap that is appended starts a new session"""
+        with self._lock:
+            self._session = None
+
+    def statistics(self, key: LapHistoryKey) -> LapStatistics:
+        """Of the laps of the last sessions of the key, only queried on the first call for a key"""
+        statistics = self._statistics.get(key)
+        if statistics is None:
+            statistics = LapStatistics(laps=self.laps(key=key, last_sessions=self.last_sessions))
+            with self._lock:
+                statistics = self._statistics.setdefault(key, statistics)
+        return statistics
+
+    def laps(self, key: LapHistoryKey, last_sessions: int = 10) -> List[LapRecord]:
+        """The laps of the last sessions of the key, oldest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                    "SELECT session_id, lap, lap_time, fuel_used FROM laps WHERE session_id IN ("
+                    "SELECT id FROM sessions WHERE driver_id = ? AND car_id = ? AND track_id = ? "
+                    "ORDER BY id DESC LIMIT ?) ORDER BY session_id, lap",
+                    (key.driver_id, key.car_id, key.track_id, last_sessions)).fetchall()
+        return [LapRecord(*row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,96 @@
+"""Local persistent cache of the relative EstimationData, such that repeat sessions don't depend on the db"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_ESTIMATION_CACHE_FILE = "cache/estimation_data.sqlite"
+DEFAULT_TTL_S = 7 * 24 * 3600
+
+
+@dataclass
+class CachedEstimationData:
+    """
+    The arrays as stored, the RelativeTelemetry converts these into its EstimationData.
+    Kept separate to avoid an import cycle with the relative telemetry.
+    """
+    distance_normalized: np.ndarray
+    estimate_time: np.ndarray
+    resolution_normalized: float
+    stored_at: float  # time.time() when written to the cache
+
+    def is_stale(self, ttl_s: float) -> bool:
+        return time.time() - self.stored_at > ttl_s
+
+
+class EstimationCache:
+    """
+    SQLite table with one row per track and car class, which also holds the TrackVersion the data belongs to.
+    A lookup for another TrackVersion invalidates the row, as the data of the old layout is of no use anymore.
+
+    The arrays are stored as raw float64 bytes. Can be used from multiple threads (single connection + lock).
+    """
+
+    def __init__(self, file_path: str = DEFAULT_ESTIMATION_CACHE_FILE, ttl_s: float = DEFAULT_TTL_S):
+        self.file_path = file_path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS estimation_data ("
+                                     "track_id INTEGER NOT NULL, "
+                                     "car_class_id INTEGER NOT NULL, "
+                                     "track_version TEXT NOT NULL, "
+                                     "resolution_normalized REAL NOT NULL, "
+                                     "distance_normalized BLOB NOT NULL, "
+                                     "estimate_time BLOB NOT NULL, "
+                                     "stored_at REAL NOT NULL, "
+                                     "PRIMARY KEY (track_id, car_class_id))")
+
+    def get(self, track_id: int, track_version: str, car_class_id: int) -> Optional[CachedEstimationData]:
+        with self._lock:
+            row = self._connection.execute(
+                    "SELECT track_version, resolution_normalized, distance_normalized, estimate_time, stored_at "
+                    "FROM estimation_data WHERE track_id = ? AND car_class_id = ?",
+                    (track_id, car_class_id)).fetchone()
+        if not row:
+            return None
+
+        cached_version, resolution_normalized, distance_normalized, estimate_time, stored_at = row
+        if cached_version != track_version:
+            logging.info("Cached estimation data of track %s is of TrackVersion %s, now %s. Invalidated",
+                         track_id, cached_version, track_version)
+            self.invalidate(track_id=track_id, car_class_id=car_class_id)
+            return None
+
+        return CachedEstimationData(distance_normalized=np.frombuffer(distance_normalized, dtype=np.float64),
+                                    estimate_time=np.frombuffer(estimate_time, dtype=np.float64),
+                                    resolution_normalized=resolution_normalized,
+                                    stored_at=stored_at)
+
+    def put(self, track_id: int, track_version: str, car_class_id: int, distance_normalized, estimate_time,
+            resolution_normalized: float) -> None:
+        distance_bytes = np.asarray(distance_normalized, dtype=np.float64).tobytes()
+        estimate_bytes = np.asarray(estimate_time, dtype=np.float64).tobytes()
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO estimation_data VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (track_id, car_class_id, track_version, resolution_normalized,
+                                      distance_bytes, estimate_bytes, time.time()))
+
+    def invalidate(self, track_id: int, car_class_id: int) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM estimation_data WHERE track_id = ? AND car_class_id = ?",
+                                     (track_id, car_class_id))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,124 @@
+"""Fetches the relative estimation data in the background, such that a slow db never stalls the telemetry loop"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from time import monotonic
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+T = TypeVar("T")
+
+# Error codes of the db that are worth another attempt: throttling and errors on the side of the service
+RETRYABLE_ERROR_CODES = frozenset({"ProvisionedThroughputExceededException", "ThrottlingException",
+                                   "RequestLimitExceeded", "InternalServerError", "ServiceUnavailable"})
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Network errors and the retryable errors of the db, anything else would fail again"""
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return isinstance(exc, BotoCoreError)
+
+
+@dataclass(frozen=True)
+class EstimationKey:
+    """Identifies the estimation data of a session, the data of one key is of no use for another"""
+    track_id: int
+    track_version: str
+    car_class_id: int
+
+
+@dataclass
+class _Request:
+    keys: Tuple[EstimationKey, ...]
+    future: Future
+    cancelled: threading.Event
+
+
+class EstimationDataFetcher(Generic[T]):
+    """
+    Runs the fetch function on a background thread, one request (for one or more keys) at a time. The owner polls
+    for the result once per tick, which makes the switch to the fetched data happen at a tick boundary.
+
+    Attempts that raise a network or throttling error are retried with exponential backoff, until the retries or the
+    total timeout run out. The time out of a single attempt is up to the db client (see DynamoDB). Any other error is
+    logged and the fetch gives None, a failed fetch never reaches the telemetry loop.
+    A new request, or cancel(), cancels the pending one: its result is never handed out.
+    """
+
+    def __init__(self, fetch: Callable[[Tuple[EstimationKey, ...]], Optional[T]], retries: int = 3,
+                 backoff_s: float = 1.0, timeout_s: float = 20.0):
+        self.fetch = fetch
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.timeout_s = timeout_s
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="EstimationDataFetcher")
+        self._request: Optional[_Request] = None
+
+    @property
+    def pending_keys(self) -> Tuple[EstimationKey, ...]:
+        return self._request.keys if self._request else ()
+
+    def request(self, keys: Tuple[EstimationKey, ...]) -> None:
+        self.cancel()
+        cancelled = threading.Event()
+        future = self._executor.submit(self._fetch_with_retries, keys, cancelled)
+        self._request = _Request(keys=keys, future=future, cancelled=cancelled)
+
+    def submit(self, fn: Callable[[], object]) -> None:
+        """Runs fn in the background without tracking it, e.g. to refresh a cache"""
+        self._executor.submit(self._log_errors, fn)
+
+    def cancel(self) -> None:
+        if self._request:
+            self._request.cancelled.set()
+            self._request.future.cancel()
+            self._request = None
+
+    def poll(self) -> Optional[T]:
+        """Returns the result once it is available, None while still pending (or when the fetch found nothing)"""
+        if not self._request or not self._request.future.done():
+            return None
+
+        request, self._request = self._request, None
+        if request.future.cancelled() or request.cancelled.is_set():
+            return None
+        try:
+            return request.future.result()
+        except Exception:  # pylint: disable=broad-except  # Already handled by _fetch_with_retries, a last resort
+            logging.exception("Fetching estimation data for %s failed", request.keys)
+            return None
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _log_errors(fn: Callable[[], object]) -> None:
+        try:
+            fn()
+        except Exception:  # pylint: disable=broad-except  # Nobody waits for the result
+            logging.exception("Background estimation data task failed")
+
+    def _fetch_with_retries(self, keys: Tuple[EstimationKey, ...], cancelled: threading.Event) -> Optional[T]:
+        deadline = monotonic() + self.timeout_s
+        for attempt in range(self.retries + 1):
+            if cancelled.is_set():
+                return None
+            try:
+                return self.fetch(keys)
+            except Exception as exc:  # pylint: disable=broad-except  # E.g. a malformed item or a cache error
+                if not is_retryable(exc):
+                    logging.exception("Fetching estimation data for %s failed", keys)
+                    return None
+                delay = self.backoff_s * 2 ** attempt
+                if attempt == self.retries or monotonic() + delay > deadline:
+                    logging.warning("Fetching estimation data for %s failed, giving up: %s", keys, exc)
+                    return None
+                logging.warning("Fetching estimation data for %s failed, retry in %.1fs: %s", keys,
+                                delay, exc)
+                cancelled.wait(delay)
+        return None
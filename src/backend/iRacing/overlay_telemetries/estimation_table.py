@@ -0,0 +1,66 @@
+"""Array backed lookup table of the relative EstimationData, compiled once when the data arrives"""
+import logging
+import math
+from typing import List
+
+import numpy as np
+
+
+class EstimationTable:
+    """
+    Compiled form of the EstimationData: the estimate times (uniform in distance_normalized) as a contiguous array,
+    together with the slopes between the bins, such that the lookups for all cars are a single batched operation.
+
+    The data is validated once, on compilation:
+    - The distances should be uniform with the given resolution and end at the S/F line (1.0)
+    - The estimate times should be positive and monotonically increasing towards the S/F line,
+      where they wrap around to 0. Small decreases (noise in logged data) are flattened.
+    """
+
+    def __init__(self, distance_normalized: List[float], estimate_time: List[float], resolution_normalized: float):
+        if resolution_normalized <= 0:
+            raise ValueError(f"Resolution should be positive, got {resolution_normalized}")
+        if not estimate_time or len(distance_normalized) != len(estimate_time):
+            raise ValueError(f"Distance ({len(distance_normalized)}) and estimate time ({len(estimate_time)}) "
+                             f"samples do not match")
+
+        self.resolution_normalized = resolution_normalized
+        self.estimate_time = np.ascontiguousarray(estimate_time, dtype=np.float64)
+        self._validate_distances(distance_normalized=np.asarray(distance_normalized, dtype=np.float64))
+        self._validate_estimate_times()
+
+        # Difference to the next bin, 0 for the last bin as lookups never go beyond it
+        self.slopes = np.append(np.diff(self.estimate_time), 0.0)
+        self.last_id = len(self.estimate_time) - 1
+
+    @property
+    def lap_time(self) -> float:
+        """The estimate time to the S/F line, where the estimate times wrap around"""
+        return float(self.estimate_time[-1])
+
+    def _validate_distances(self, distance_normalized: np.ndarray) -> None:
+        expected = (np.arange(len(distance_normalized)) + 1) * self.resolution_normalized
+        if not np.allclose(distance_normalized, expected, rtol=0, atol=self.resolution_normalized / 2):
+            raise ValueError("Distances are not uniform with the given resolution")
+        if not math.isclose(distance_normalized[-1], 1.0, abs_tol=self.resolution_normalized):
+            raise ValueError(f"Distances do not end at the S/F line, last is {distance_normalized[-1]}")
+
+    def _validate_estimate_times(self) -> None:
+        if np.any(self.estimate_time <= 0):
+            raise ValueError("Estimate times contain empty (non-positive) samples")
+
+        monotonic = np.maximum.accumulate(self.estimate_time)
+        nr_flattened = int(np.count_nonzero(monotonic != self.estimate_time))
+        if nr_flattened:
+            logging.warning("Estimation data was not monotonic, %s samples were flattened", nr_flattened)
+            self.estimate_time = monotonic
+
+    def estimate_time_to(self, distance_normalized: np.ndarray) -> np.ndarray:
+        """
+        Batched version of RelativeTelemetry.get_estimate_time_to_: the time it would take the PLAYER to reach
+        the given positions on track, measured from the S/F line. Gives the same result for the same (validated) data.
+        """
+        location_in_list = np.maximum(distance_normalized / self.resolution_normalized - 1, 0)
+        lower_id = np.minimum(location_in_list, self.last_id).astype(np.intp)  # Truncation equals floor, >= 0
+        offset = location_in_list % 1
+        return self.estimate_time[lower_id] + self.slopes[lower_id] * offset
@@ -0,0 +1,227 @@
+"""Uploads the logged relative EstimationData to the db in the background, such that others can start in NORMAL mode"""
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from src.backend.AWS.resources import DynamoDBTable
+from src.backend.iRacing.overlay_telemetries.estimation_fetcher import EstimationKey
+
+DEFAULT_PENDING_UPLOADS_FILE = "cache/pending_uploads.json"
+# The arrays are rounded to these decimals before the upload: a (lossy) quantization of the values, the item itself
+# is not compressed. Millisecond resolution is plenty for the relative
+DISTANCE_DECIMALS = 6
+TIME_DECIMALS = 3
+
+
+def quantize(values: Iterable[float], decimals: int) -> Tuple[float, ...]:
+    return tuple(round(float(value), decimals) for value in values)
+
+
+def track_version_order(track_version: str) -> Tuple[int, ...]:
+    """Sort key of a TrackVersion (e.g. "2022.11.22.02"), the numbers are compared as numbers instead of as text"""
+    return tuple(int(number) for number in re.findall(r"\d+", track_version))
+
+
+@dataclass(frozen=True)
+class PendingUpload:
+    """Logged estimation data of one track and car class, with the arrays rounded (quantized) already"""
+    track_id: int
+    track_version: str
+    car_class_id: int
+    distance_normalized: Tuple[float, ...]
+    estimate_time: Tuple[float, ...]
+    resolution_normalized: float
+
+    @classmethod
+    def from_estimation_data(cls, key: EstimationKey, distance_normalized: Iterable[float],
+                             estimate_time: Iterable[float], resolution_normalized: float) -> "PendingUpload":
+        return cls(track_id=key.track_id, track_version=key.track_version, car_class_id=key.car_class_id,
+                   distance_normalized=quantize(distance_normalized, DISTANCE_DECIMALS),
+                   estimate_time=quantize(estimate_time, TIME_DECIMALS),
+                   resolution_normalized=resolution_normalized)
+
+    def to_item(self) -> dict:
+        """In the format of the EstimationData of a car class in the db, which only takes Decimals for numbers"""
+        return {"DistancePct": [Decimal(str(value)) for value in self.distance_normalized],
+                "EstimateTime": [Decimal(str(value)) for value in self.estimate_time],
+                "ResolutionPct": Decimal(str(self.resolution_normalized))}
+
+
+class EstimationUploader:
+    """
+    Collects the completed EstimationData per track and car class (the latest one wins) and uploads it from a
+    background thread, every flush interval. The data of all car classes of a track goes up in a single update.
+    Data the db already holds for that TrackVersion and car class is not uploaded again, nor is data of an older
+    TrackVersion than the one in the db.
+
+    The pending uploads are written to disk by the background thread as soon as they are queued and again after
+    every flush, such that the uploads that did not succeed (yet) survive a crash or a restart. Queueing only
+    touches memory, the telemetry loop never waits for the disk nor for the db.
+    """
+
+    def __init__(self, table: DynamoDBTable, file_path: str = DEFAULT_PENDING_UPLOADS_FILE,
+                 flush_interval_s: float = 10.0):
+        self.table = table
+        self.file_path = file_path
+        self.flush_interval_s = flush_interval_s
+
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()  # stop() writes the file as well, in case the thread did not stop
+        self._pending: Dict[Tuple[int, int], PendingUpload] = self._load()
+        self._queued = False  # Pending uploads were queued since the file was last written
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> List[PendingUpload]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="EstimationUploader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Makes a final attempt to upload, what is left is written to disk"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logging.warning("Estimation uploader did not stop within %s s", timeout)
+        self._persist()
+
+    def enqueue(self, key: EstimationKey, distance_normalized: Iterable[float], estimate_time: Iterable[float],
+                resolution_normalized: float) -> None:
+        """Queues the data, the upload thread writes it to disk. Does not wait for the disk nor for the db"""
+        upload = PendingUpload.from_estimation_data(key=key, distance_normalized=distance_normalized,
+                                                    estimate_time=estimate_time,
+                                                    resolution_normalized=resolution_normalized)
+        with self._lock:
+            self._pending[(upload.track_id, upload.car_class_id)] = upload
+            self._queued = True
+        self._wake.set()
+
+    def flush(self) -> None:
+        """Uploads the pending data per track, the uploads that are done (or not needed) are removed"""
+        by_track: Dict[int, List[PendingUpload]] = {}
+        for upload in self.pending:
+            by_track.setdefault(upload.track_id, []).append(upload)
+
+        for track_id, uploads in by_track.items():
+            try:
+                self._upload_track(track_id=track_id, uploads=uploads)
+            except (BotoCoreError, ClientError) as exc:
+                logging.warning("Uploading the estimation data of track %s failed, retried later: %s", track_id, exc)
+                continue
+
+            with self._lock:
+                for upload in uploads:
+                    # Unless it was replaced by newer data in the meantime
+                    if self._pending.get((track_id, upload.car_class_id)) == upload:
+                        del self._pending[(track_id, upload.car_class_id)]
+        self._persist()
+
+    def _upload_track(self, track_id: int, uploads: List[PendingUpload]) -> None:
+        track_version = max((upload.track_version for upload in uploads), key=track_version_order)
+        uploads = [upload for upload in uploads if upload.track_version == track_version]
+
+        # Only the presence of the car classes is of interest, not the data itself
+        names = {f"#c{i}": str(upload.car_class_id) for i, upload in enumerate(uploads)}
+        projection = ["TrackVersion"] + [f"EstimationData.{name}.ResolutionPct" for name in names]
+        item = self.table.get_item(key={'track_id': track_id},
+                                   projection_expression=",".join(projection),
+                                   expression_attr_name=names,
+                                   raise_on_error=True)
+        db_version = item.get("TrackVersion") if item else None
+
+        if db_version and track_version_order(db_version) > track_version_order(track_version):
+            logging.info("The db holds a newer TrackVersion %s of track %s, logged data of %s is not uploaded",
+                         db_version, track_id, track_version)
+            return
+
+        if db_version == track_version:
+            db_classes = item.get("EstimationData", {})
+            uploads = [upload for upload in uploads if str(upload.car_class_id) not in db_classes]
+            if not uploads:
+                return
+            names = {f"#c{i}": str(upload.car_class_id) for i, upload in enumerate(uploads)}
+            self.table.update_item(key=('track_id', track_id),
+                                   update_expression="SET " + ", ".join(
+                                           f"EstimationData.{name} = :{name[1:]}" for name in names),
+                                   expression_attr_names=names,
+                                   expression_attr_values={f":c{i}": upload.to_item()
+                                                           for i, upload in enumerate(uploads)})
+        else:  # The track (version) is new to the db, the data of the old version is of no use anymore
+            self.table.update_item(key=('track_id', track_id),
+                                   update_expression="SET #version = :version, #data = :data",
+                                   expression_attr_names={'#version': "TrackVersion", '#data': "EstimationData"},
+                                   expression_attr_values={':version': track_version,
+                                                           ':data': {str(upload.car_class_id): upload.to_item()
+                                                                     for upload in uploads}})
+        logging.info("Uploaded the estimation data of track %s for car classes %s", track_id,
+                     [upload.car_class_id for upload in uploads])
+
+    def _run(self) -> None:
+        """Flushes every flush interval (and when stopped), in between the newly queued uploads are written to disk"""
+        next_flush = monotonic() + self.flush_interval_s
+        while not self._stop.is_set():
+            self._wake.wait(max(next_flush - monotonic(), 0))
+            self._wake.clear()
+            with self._lock:
+                queued, self._queued = self._queued, False
+            if self._stop.is_set() or monotonic() >= next_flush:
+                if self.pending:
+                    self.flush()
+                next_flush = monotonic() + self.flush_interval_s
+            elif queued:
+                self._persist()
+
+    def _load(self) -> Dict[Tuple[int, int], PendingUpload]:
+        if not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path, encoding="utf-8") as file:
+                uploads = [PendingUpload(**{name: tuple(value) if isinstance(value, list) else value
+                                            for name, value in entry.items()})
+                           for entry in json.load(file)]
+        except (OSError, ValueError, TypeError) as exc:
+            logging.warning("Pending uploads in %s could not be read and are discarded: %s", self.file_path, exc)
+            return {}
+
+        logging.info("%s pending estimation data upload(s) loaded from %s", len(uploads), self.file_path)
+        return {(upload.track_id, upload.car_class_id): upload for upload in uploads}
+
+    def _persist(self) -> None:
+        """Writes the pending uploads to disk, the file is removed once there is nothing pending"""
+        with self._persist_lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        uploads = self.pending
+        try:
+            if not uploads:
+                if os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+                return
+
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary_path = f"{self.file_path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump([asdict(upload) for upload in uploads], file)
+            os.replace(temporary_path, self.file_path)  # Never leaves a half written file behind
+        except OSError as exc:
+            logging.warning("Pending uploads could not be written to %s: %s", self.file_path, exc)
@@ -1,12 +1,16 @@
+import logging
 import math
-import statistics
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Optional
 
 from irsdk import IRSDK
 
+from src.backend.iRacing.lap_history import LapStatistics
+from src.backend.iRacing.overlay_telemetries.race_projection import ProjectionScenario, RaceProjection
 from src.backend.iRacing.overlay_telemetries.timing_telemetry import TimingTelemetry
-from src.backend.iRacing.overlay_telemetry import OverlayTelemetry
+from src.backend.iRacing.overlay_telemetry import OverlayTelemetry, UpdatePolicy, UpdateTrigger
 from src.backend.iRacing.utils.zero_div import zero_div
+from src.backend.utils.running_median import RunningMedian
 
 FUEL_BUFFER_L = 0.3
 
@@ -18,19 +22,38 @@ class TelemetryValue:
         self.value: int | float = value
 
 
+@dataclass(frozen=True)
+class FuelSnapshot:
+    """Immutable copy of the fuel values of a single tick, as handed to the fuel overlay"""
+    fuel: float = 0.0
+    last_consumption: float = 0.0
+    average_consumption: float = 0.0
+    range_laps: float = 0.0
+    target_consumption_extra: float = 0.0
+    target_consumption_finish: float = 0.0
+    refuel_amount: float = 0.0
+    refuel_amount_own_pace: float = 0.0  # In case the player, instead of the leader, takes the checkered flag
+
+
 class FuelTelemetry(OverlayTelemetry):
     """Implements all the relevant telemetry needed for the fuel overlay"""
+    # Everything but the fuel level is only derived on a new lap, the level drifts slowly enough for the default
+    # refresh rate of the fuel overlay
+    update_policy = UpdatePolicy(triggers=UpdateTrigger.TICK | UpdateTrigger.NEW_LAP, rate_hz=10)
 
-    def __init__(self, ir_sdk: IRSDK, timing_telemetry: TimingTelemetry):
+    def __init__(self, ir_sdk: IRSDK, timing_telemetry: TimingTelemetry, race_projection: RaceProjection):
         self.ir_sdk = ir_sdk
         self.timing = timing_telemetry
+        self.race_projection = race_projection
 
         # Values - Measured
         self.fuel = TelemetryValue(0.00)
 
         # Determined by calculation
         self.previous_lap_fuel_count: float = 0.00
-        self.consumptions: List[Optional[float]] = []
+        self.consumptions = RunningMedian()  # Of the laps since the last refuel, bad data (0) left out
+        self.lap_statistics: Optional[LapStatistics] = None  # Of previous sessions in this car and track, if known
+        self.lap_consumption: Optional[float] = None  # Of the lap that was just completed, None if unknown
         self.last_consumption = TelemetryValue(0.00)
 
         self.average_consumption = TelemetryValue(0.00)
@@ -40,6 +63,7 @@ class FuelTelemetry(OverlayTelemetry):
         self.target_consumption_extra = TelemetryValue(0.00)
         self.target_consumption_finish = TelemetryValue(0.00)
         self.refuel_amount = TelemetryValue(0.00)
+        self.refuel_amount_own_pace = TelemetryValue(0.00)
 
     def update(self) -> None:
         """Updates the attribute values of the fuel telemetry"""
@@ -49,18 +73,22 @@ class FuelTelemetry(OverlayTelemetry):
             return
 
         if self.previous_lap_fuel_count - self.fuel.value < 0:  # Refueled
-            self.consumptions = []
+            self.consumptions.clear()
+            self.lap_consumption = None
         else:
             self.last_consumption.value = self.previous_lap_fuel_count - self.fuel.value
-            self.consumptions.append(self.last_consumption.value)
+            self.lap_consumption = self.last_consumption.value or None
+            if self.last_consumption.value != 0:  # Filter out bad data
+                self.consumptions.add(self.last_consumption.value)
         self.previous_lap_fuel_count = self.fuel.value
 
-        if 0.0 in self.consumptions:
-            self.consumptions = [num for num in self.consumptions if num != 0]  # Filter out bad data
-
         if len(self.consumptions) > 0:
-            self.average_consumption.value = statistics.median(self.consumptions)
-            print(self.consumptions, self.average_consumption.value)
+            self.average_consumption.value = self.consumptions.median
+            logging.debug("Fuel consumption of %s laps, median %s", len(self.consumptions),
+                          self.average_consumption.value)
+        elif self.lap_statistics and self.lap_statistics.fuel_per_lap:
+            # No lap since the (re)fuel yet, the median of the previous sessions is the best guess
+            self.average_consumption.value = self.lap_statistics.fuel_per_lap
         else:
             self.average_consumption.value = 0.00
 
@@ -68,7 +96,23 @@ class FuelTelemetry(OverlayTelemetry):
         self.range_laps_extra.value = self.range_laps.value + 1
         self.target_consumption.value = zero_div(x=self.fuel.value - FUEL_BUFFER_L, y=self.range_laps.value)
         self.target_consumption_extra.value = zero_div(x=self.fuel.value - FUEL_BUFFER_L, y=self.range_laps_extra.value)
-        self.target_consumption_finish.value = zero_div(x=self.fuel.value - FUEL_BUFFER_L,
-                                                  y=self.timing.laps_to_finish_player)
-        laps_of_fuel = max(self.timing.laps_to_finish_player - self.range_laps.value + 0.15, 0)
-        self.refuel_amount.value = laps_of_fuel * self.average_consumption.value
+        laps_to_finish = self.race_projection.laps_to_finish(scenario=ProjectionScenario.LEADER_PACE)
+        self.target_consumption_finish.value = zero_div(x=self.fuel.value - FUEL_BUFFER_L, y=laps_to_finish)
+        self.refuel_amount.value = self.calculate_refuel_amount(laps_to_finish=laps_to_finish)
+        self.refuel_amount_own_pace.value = self.calculate_refuel_amount(
+                laps_to_finish=self.race_projection.laps_to_finish(scenario=ProjectionScenario.OWN_PACE))
+
+    def calculate_refuel_amount(self, laps_to_finish: float) -> float:
+        laps_of_fuel = max(laps_to_finish - self.range_laps.value + 0.15, 0)
+        return laps_of_fuel * self.average_consumption.value
+
+    def snapshot(self) -> FuelSnapshot:
+        """Copies the current values, the snapshot is not affected by later updates"""
+        return FuelSnapshot(fuel=self.fuel.value,
+                            last_consumption=self.last_consumption.value,
+                            average_consumption=self.average_consumption.value,
+                            range_laps=self.range_laps.value,
+                            target_consumption_extra=self.target_consumption_extra.value,
+                            target_consumption_finish=self.target_consumption_finish.value,
+                            refuel_amount=self.refuel_amount.value,
+                            refuel_amount_own_pace=self.refuel_amount_own_pace.value)
@@ -0,0 +1,112 @@
+"""Projection of the laps the player does until the finish, of which the fuel telemetry derives its targets"""
+import math
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Dict, Optional
+
+from irsdk import IRSDK
+
+from src.backend.iRacing.lap_history import LapStatistics
+from src.backend.iRacing.overlay_telemetries.timing_telemetry import TimingTelemetry
+from src.backend.iRacing.overlay_telemetry import OverlayTelemetry
+from src.backend.iRacing.session_info_cache import SessionInfoCache
+from src.backend.iRacing.utils.zero_div import zero_div
+
+
+class ProjectionScenario(Enum):
+    """Who takes the checkered flag first, which decides the number of laps left for the player"""
+    LEADER_PACE = auto()  # The leader takes the checkered flag, the player does laps at their own average pace
+    OWN_PACE = auto()  # The player takes the checkered flag, e.g. when leading or on a lonely stint
+
+
+@dataclass(frozen=True)
+class LeaderState:
+    """The leader data the projection needs, only re-derived when the session info changes"""
+    car_idx: int
+    fastest_lap_time: float
+    estimate_lap_time: float
+
+
+class RaceProjection(OverlayTelemetry):
+    """
+    Projects the laps the player does until the finish, for every ProjectionScenario.
+    The leader is only looked up when the session info changed and the average lap time only when a lap was
+    completed. The live projection is computed at most once per update, on first access.
+    """
+
+    def __init__(self, ir_sdk: IRSDK, session_info: SessionInfoCache, timing_telemetry: TimingTelemetry):
+        self.ir_sdk = ir_sdk
+        self.session_info = session_info
+        self.timing = timing_telemetry
+
+        self.leader: Optional[LeaderState] = None
+        self.avg_lap_time: float = 0.0
+        self.lap_statistics: Optional[LapStatistics] = None  # Of previous sessions in this car and track, if known
+        self._session_info_update: Optional[int] = None
+        self._laps_to_finish: Dict[ProjectionScenario, float] = {}  # Of the current update, filled on access
+
+    def update(self) -> None:
+        """Updates the leader and pace state when needed, to be called after the timing telemetry"""
+        session_info = self.session_info.snapshot
+        if self._session_info_update != session_info.update:
+            self.leader = self.derive_leader()
+            self._session_info_update = session_info.update
+
+        if self.timing.new_lap or not self.avg_lap_time:
+            # Until a lap with a valid time is completed (the first one on connecting has none), the previous sessions
+            # tell the pace, or else the estimate of the sim
+            self.avg_lap_time = self.timing.avg_lap_time if self.timing.lap_times else 0.0
+            if self.avg_lap_time <= 0:
+                if self.lap_statistics and self.lap_statistics.lap_time:
+                    self.avg_lap_time = self.lap_statistics.lap_time
+                else:
+                    self.avg_lap_time = session_info.player_car_est_lap_time
+
+        self._laps_to_finish.clear()
+
+    def derive_leader(self) -> Optional[LeaderState]:
+        session_info = self.session_info.snapshot
+        if not session_info.leader:
+            return None
+
+        leader = session_info.drivers.get(session_info.leader.car_idx)
+        return LeaderState(car_idx=session_info.leader.car_idx,
+                           fastest_lap_time=session_info.leader.fastest_time,
+                           estimate_lap_time=leader.car_class_est_lap_time if leader else 0.0)
+
+    @property
+    def laps_to_finish_player(self) -> float:
+        """Returns the predicted amount of laps that the player will do until the finish"""
+        return self.laps_to_finish(scenario=ProjectionScenario.LEADER_PACE)
+
+    def laps_to_finish(self, scenario: ProjectionScenario) -> float:
+        laps = self._laps_to_finish.get(scenario)
+        if laps is None:
+            if scenario == ProjectionScenario.LEADER_PACE:
+                laps = self.project_leader_pace()
+            else:
+                laps = self.project_own_pace()
+            self._laps_to_finish[scenario] = laps
+        return laps
+
+    def project_leader_pace(self) -> float:
+        if not self.leader:
+            return 0.0
+
+        estimate_to_pos_leader = self.ir_sdk['CarIdxEstTime'][self.leader.car_idx]
+        lap_progress_pct_leader = zero_div(estimate_to_pos_leader, self.leader.estimate_lap_time)
+        live_laps_to_finish_leader = math.ceil(zero_div(self.timing.time_left, self.leader.fastest_lap_time)) \
+            - lap_progress_pct_leader
+        time_to_finish_leader = live_laps_to_finish_leader * self.leader.estimate_lap_time
+        complete_laps_left_in_race = math.ceil(zero_div(time_to_finish_leader, self.avg_lap_time))
+        return complete_laps_left_in_race - self.player_distance_normalized
+
+    def project_own_pace(self) -> float:
+        """When the time runs out the player still completes the lap they're on"""
+        player_distance_normalized = self.player_distance_normalized
+        laps_in_time_left = zero_div(self.timing.time_left, self.avg_lap_time)
+        return math.ceil(laps_in_time_left + player_distance_normalized) - player_distance_normalized
+
+    @property
+    def player_distance_normalized(self) -> float:
+        return self.ir_sdk['CarIdxLapDistPct'][self.session_info.snapshot.player_car_idx]
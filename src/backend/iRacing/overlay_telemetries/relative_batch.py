@@ -0,0 +1,184 @@
+"""
+Batched (NumPy) versions of the per car relative calculations, computed over all CarIdx arrays at once.
+The scalar methods of RelativeTelemetry are the reference implementation for these.
+"""
+import weakref
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.backend.iRacing.session_info_cache import SessionInfoSnapshot
+
+# Lapped state codes, mapped to the LappedState enum by the RelativeTelemetry
+SAMELAP = 0
+BACKMARKER = 1
+LAPPING = 2
+
+
+@dataclass(frozen=True)
+class DriverArrays:
+    """
+    The per car session info data (the roster), indexed by CarIdx. Only re-derived when the session info changed,
+    never mutated afterwards such that it can be shared with the snapshots of every tick.
+    """
+    update: int  # SessionInfoUpdate these were derived from
+    has_driver: np.ndarray
+    car_class_id: np.ndarray
+    car_class_est_lap_time: np.ndarray
+    car_nr: Tuple[int, ...]
+    driver_name: Tuple[str, ...]
+    license: Tuple[str, ...]
+    irating: Tuple[int, ...]
+
+
+def driver_arrays(session_info: SessionInfoSnapshot, nr_cars: int) -> DriverArrays:
+    """Only needs to be called when the session info snapshot changed"""
+    has_driver = np.zeros(nr_cars, dtype=bool)
+    car_class_id = np.zeros(nr_cars, dtype=np.int64)
+    car_class_est_lap_time = np.zeros(nr_cars, dtype=np.float64)
+    car_nr, driver_name, license_string, irating = [0] * nr_cars, [""] * nr_cars, [""] * nr_cars, [0] * nr_cars
+    for car_idx, driver in session_info.drivers.items():
+        if 0 <= car_idx < nr_cars:
+            has_driver[car_idx] = True
+            car_class_id[car_idx] = driver.car_class_id
+            car_class_est_lap_time[car_idx] = driver.car_class_est_lap_time
+            car_nr[car_idx] = driver.car_nr
+            driver_name[car_idx] = driver.driver_name
+            license_string[car_idx] = driver.license
+            irating[car_idx] = driver.irating
+    return DriverArrays(update=session_info.update, has_driver=has_driver, car_class_id=car_class_id,
+                        car_class_est_lap_time=car_class_est_lap_time, car_nr=tuple(car_nr),
+                        driver_name=tuple(driver_name), license=tuple(license_string), irating=tuple(irating))
+
+
+class SnapshotColumns:
+    """
+    Preallocated columns of the relative in the sorted order, of which a snapshot shows (views of) the first rows.
+    Only reused once the snapshot they were handed to is gone, since another thread might still be reading it.
+    """
+
+    def __init__(self, nr_cars: int):
+        self.car_ids = np.zeros(nr_cars, dtype=np.intp)
+        self.relative_time = np.zeros(nr_cars, dtype=np.float64)
+        self.lapped_state = np.zeros(nr_cars, dtype=np.int8)
+        self.in_pits = np.zeros(nr_cars, dtype=bool)
+        self.position = np.zeros(nr_cars, dtype=np.int64)
+        self._owner: Optional[weakref.ref] = None
+
+    @property
+    def in_use(self) -> bool:
+        return self._owner is not None and self._owner() is not None
+
+    def hand_to(self, owner: object) -> None:
+        self._owner = weakref.ref(owner)
+
+
+class RelativeTable:
+    """
+    The per tick columns of the relative, indexed by CarIdx, together with the sorted order of the valid cars.
+    Allocated once and overwritten in place every tick, so it is only to be read by the thread that updates it.
+    The snapshots get a copy in SnapshotColumns, of which there are as many as there are snapshots alive (two or
+    three: the one being shown, the one handed over and the newest).
+    """
+
+    def __init__(self, nr_cars: int):
+        self.relative_time = np.zeros(nr_cars, dtype=np.float64)
+        self.lapped_state = np.zeros(nr_cars, dtype=np.int8)
+        self.in_pits = np.zeros(nr_cars, dtype=bool)
+        self.position = np.zeros(nr_cars, dtype=np.int64)
+        self._order = np.zeros(nr_cars, dtype=np.intp)
+        self.nr_sorted = 0
+        self._snapshot_columns: List[SnapshotColumns] = []
+
+    @property
+    def nr_cars(self) -> int:
+        return len(self.relative_time)
+
+    @property
+    def order(self) -> np.ndarray:
+        """Car ids of the valid cars sorted on relative time, a view that is overwritten by the next update"""
+        return self._order[:self.nr_sorted]
+
+    def set_order(self, order: np.ndarray) -> None:
+        self.nr_sorted = len(order)
+        self._order[:self.nr_sorted] = order
+
+    def sorted_columns(self) -> SnapshotColumns:
+        """Copies the columns in the sorted order into snapshot columns that are not in use, the first nr_sorted rows"""
+        columns = next((columns for columns in self._snapshot_columns if not columns.in_use), None)
+        if columns is None:
+            columns = SnapshotColumns(nr_cars=self.nr_cars)
+            self._snapshot_columns.append(columns)
+
+        order = self.order
+        columns.car_ids[:self.nr_sorted] = order
+        for name in ("relative_time", "lapped_state", "in_pits", "position"):
+            # Unlike the default mode, clip doesn't buffer the output. The order only holds valid car ids anyway
+            np.take(getattr(self, name), order, out=getattr(columns, name)[:self.nr_sorted], mode='clip')
+        return columns
+
+
+def is_ahead(distance_normalized: np.ndarray, player_distance_normalized: float) -> np.ndarray:
+    """True where the car is AHEAD of the player, False where BEHIND. See RelativeTelemetry.get_relative_location"""
+    difference = distance_normalized - player_distance_normalized
+    return ((difference > 0) & (difference < 0.5)) | (difference == 0) | (difference < -0.5)
+
+
+def relative_time_lite(distance_normalized: np.ndarray, player_distance_normalized: float,
+                       player_lap_time: float, lap_time_other: np.ndarray) -> np.ndarray:
+    """See RelativeTelemetry.calculate_relative_time_lite"""
+    difference = np.abs(distance_normalized - player_distance_normalized)
+    relative_time = np.where(difference > 0.5,
+                             -(1 - difference) * player_lap_time,
+                             difference * lap_time_other)
+    return np.where(distance_normalized < player_distance_normalized, -relative_time, relative_time)
+
+
+def relative_time_normal(distance_normalized: np.ndarray, player_distance_normalized: float,
+                         player_lap_time: float, est_to_other: np.ndarray, est_to_player: float) -> np.ndarray:
+    """See RelativeTelemetry.calculate_relative_time_normal, the estimate times come from the EstimationTable"""
+    ahead = is_ahead(distance_normalized, player_distance_normalized)
+    other_before_player = distance_normalized < player_distance_normalized
+
+    return np.select(
+            [ahead & other_before_player,  # Other <- SF <- Player
+             ahead,  # Other <- Player <- SF
+             player_distance_normalized < distance_normalized],  # Player <- SF <- Other
+            [player_lap_time - est_to_player + est_to_other,
+             est_to_other - est_to_player,
+             est_to_player + (player_lap_time - est_to_other)],
+            default=est_to_player - est_to_other)  # Player <- Other <- SF
+
+
+def lapped_state_codes(distance_normalized: np.ndarray, laps: np.ndarray,
+                       player_distance_normalized: float, player_laps: int) -> np.ndarray:
+    """See RelativeTelemetry.get_lapped_state, returns the SAMELAP/BACKMARKER/LAPPING codes"""
+    ahead = is_ahead(distance_normalized, player_distance_normalized)
+    behind = ~ahead
+    before_player = distance_normalized < player_distance_normalized
+
+    return np.select(
+            [behind & (laps > player_laps),
+             behind & (laps == player_laps) & before_player,
+             behind & (laps < player_laps - 1),
+             behind & (laps < player_laps) & before_player,
+             behind,
+             ahead & (laps < player_laps),
+             ahead & (laps == player_laps) & before_player,
+             ahead & (laps > player_laps + 1),
+             ahead & (laps > player_laps) & before_player],
+            [LAPPING, LAPPING, BACKMARKER, BACKMARKER, SAMELAP,
+             BACKMARKER, BACKMARKER, LAPPING, LAPPING],
+            default=SAMELAP)
+
+
+def valid_cars(distance_normalized: np.ndarray, tire_compound: Sequence[int], has_driver: np.ndarray) -> np.ndarray:
+    """Mask of the car ids that are actually valid (on track and in the session info)"""
+    return (distance_normalized != -1) & (np.asarray(tire_compound) != -1) & has_driver[:len(distance_normalized)]
+
+
+def sorted_order(relative_time: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Car ids of the valid cars sorted on relative time, descending. Stable, same as sorted(..., reverse=True)"""
+    car_ids = np.flatnonzero(valid)
+    return car_ids[np.argsort(-relative_time[car_ids], kind='stable')]
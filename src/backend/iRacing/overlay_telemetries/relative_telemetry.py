@@ -1,13 +1,20 @@
 import logging
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List, Optional
+from typing import Collection, Dict, FrozenSet, List, Optional, Set, Tuple
 
+import numpy as np
 from irsdk import IRSDK
 
 from src.backend.AWS.resources import DynamoDB, DynamoDBTable, TableNames
+from src.backend.iRacing.overlay_telemetries import relative_batch
+from src.backend.iRacing.overlay_telemetries.estimation_cache import EstimationCache
+from src.backend.iRacing.overlay_telemetries.estimation_fetcher import EstimationDataFetcher, EstimationKey
+from src.backend.iRacing.overlay_telemetries.estimation_uploader import EstimationUploader
+from src.backend.iRacing.overlay_telemetries.estimation_table import EstimationTable
 from src.backend.iRacing.overlay_telemetry import OverlayTelemetry
+from src.backend.iRacing.session_info_cache import DriverEntry, SessionInfoCache
 from src.frontend.utils.ri_event_handler import RIEventTypes, post_event, subscribe
 
 
@@ -17,6 +24,12 @@ class LappedState(Enum):
     SAMELAP = auto()  # Same lap as the player
 
 
+# Maps the lapped state codes of the batched calculation to the enum
+LAPPED_STATE_BY_CODE = {relative_batch.SAMELAP: LappedState.SAMELAP,
+                        relative_batch.BACKMARKER: LappedState.BACKMARKER,
+                        relative_batch.LAPPING: LappedState.LAPPING}
+
+
 class RelativeLocation(Enum):
     AHEAD = auto()
     BEHIND = auto()
@@ -29,6 +42,21 @@ class EstimationData:
     resolution_normalized: float
 
 
+def compile_estimation_data(estimation_data: EstimationData) -> Tuple[EstimationData, EstimationTable]:
+    """
+    The lookup table of the estimation data, together with the data as validated by the table (e.g. flattened).
+    The scalar reference is given the validated data, such that it works with the same data as the batch relative.
+    Raises a ValueError when the data is not valid.
+    """
+    estimation_table = EstimationTable(distance_normalized=estimation_data.distance_normalized,
+                                       estimate_time=estimation_data.estimate_time,
+                                       resolution_normalized=estimation_data.resolution_normalized)
+    validated = EstimationData(distance_normalized=estimation_data.distance_normalized,
+                               estimate_time=estimation_table.estimate_time.tolist(),
+                               resolution_normalized=estimation_data.resolution_normalized)
+    return validated, estimation_table
+
+
 @dataclass
 class RelativeEntry:
     position: int
@@ -43,72 +71,214 @@ class RelativeEntry:
     car_id: int  # Just for finding player, not for displaying
 
 
+def _empty_column(dtype) -> np.ndarray:
+    return np.zeros(0, dtype=dtype)
+
+
+@dataclass(frozen=True, eq=False)
+class RelativeSnapshot:
+    """
+    The sorted relative of a single tick, as handed to the relative overlay. Holds a column per field, in the sorted
+    order, and the (shared) roster for the session info fields. Never mutated, a RelativeEntry is only created for
+    the entries that are actually shown, at most once per snapshot.
+    """
+    car_ids: np.ndarray = field(default_factory=lambda: _empty_column(np.intp))
+    relative_time: np.ndarray = field(default_factory=lambda: _empty_column(np.float64))
+    lapped_state: np.ndarray = field(default_factory=lambda: _empty_column(np.int8))
+    in_pits: np.ndarray = field(default_factory=lambda: _empty_column(bool))
+    position: np.ndarray = field(default_factory=lambda: _empty_column(np.int64))
+    roster: Optional[relative_batch.DriverArrays] = None
+    player_car_id: Optional[int] = None
+    player_id_in_sorted: int = 0
+    _entries: Dict[int, RelativeEntry] = field(default_factory=dict, repr=False)  # By index, filled on access
+
+    def __len__(self) -> int:
+        return len(self.car_ids)
+
+    @property
+    def is_player(self) -> np.ndarray:
+        return self.car_ids == self.player_car_id
+
+    def entry(self, index: int) -> RelativeEntry:
+        entry = self._entries.get(index)
+        if entry is None:
+            car_id = int(self.car_ids[index])
+            entry = RelativeEntry(position=int(self.position[index]),
+                                  car_nr=self.roster.car_nr[car_id],
+                                  driver_name=self.roster.driver_name[car_id],
+                                  license=self.roster.license[car_id],
+                                  irating=self.roster.irating[car_id],
+                                  relative_time=float(self.relative_time[index]),
+                                  in_pits=bool(self.in_pits[index]),
+                                  is_player=car_id == self.player_car_id,
+                                  lapped_state=LAPPED_STATE_BY_CODE[int(self.lapped_state[index])],
+                                  car_id=car_id)
+            self._entries[index] = entry
+        return entry
+
+    @property
+    def sorted_relative_entries(self) -> Tuple[RelativeEntry, ...]:
+        """All the entries, only for when every one of them is needed"""
+        return tuple(self.entry(i) for i in range(len(self)))
+
+
 class RelativeMode(Enum):
     NORMAL = auto()
     LITE = auto()
 
 
-class RelativeDataLogger:
-    """Class responsible for logging of the relative_time data in case it could not be received from DB"""
-    km_to_m = 1000
-    meters_per_sample = 50
+@dataclass(frozen=True)
+class LoggedEstimationData:
+    """Posted with the ESTIMATION_DATA_LOGGED event, the data may still be partly interpolated"""
+    car_class_id: int
+    estimation_data: EstimationData
+    coverage: float  # Fraction of the samples that were logged
 
-    def __init__(self, ir_sdk: IRSDK):
-        self.ir_sdk = ir_sdk
-        self.data = EstimationData(
-                distance_normalized=[(i + 1) * self.resolution_normalized for i in
-                                     range(self.nr_estimation_samples)],
-                estimate_time=[0.0] * self.nr_estimation_samples,
-                resolution_normalized=self.resolution_normalized)
+    @property
+    def complete(self) -> bool:
+        return self.coverage >= 1.0
 
-        # Normalized distances that were used as reference when storing previously
-        self.reference_dist_normalized = [0.0] * self.nr_estimation_samples
 
-    def log_relative_data(self):
-        """Used when in LITE mode to gather the data that is to be sent to DB later to support NORMAL mode"""
-        previous_dist_error = abs(self.reference_dist_normalized[self.index_in_estimation_list]
-                                  - self.distance_normalized_here)
+class ClassEstimationLog:
+    """
+    The estimation data that is being logged for a single car class, in arrays.
+    Keeps per sample (bin) how many car samples landed in it and the distance error of the one that is kept,
+    together with the number of filled samples, such that the coverage is known without scanning the data.
+    A sample only counts as filled once an estimate time was written to it.
+    """
 
-        current_dist_error = abs(self.player_distance_normalized
-                                 - self.distance_normalized_here)
+    def __init__(self, nr_estimation_samples: int, resolution_normalized: float):
+        self.resolution_normalized = resolution_normalized
+        self.distance_normalized = (np.arange(nr_estimation_samples) + 1) * resolution_normalized
+        self.estimate_time = np.zeros(nr_estimation_samples)
 
-        # If current more accurate, overwrite the old data with new
-        if current_dist_error < previous_dist_error:
-            self.reference_dist_normalized[self.index_in_estimation_list] = self.player_distance_normalized
-            self.data.estimate_time[self.index_in_estimation_list] = \
-                (self.distance_normalized_here / self.player_distance_normalized) * self.player_estimate_time
+        # Distance error of the car sample each estimate time is derived from, as if taken at the S/F line at first
+        self.dist_error = self.distance_normalized.copy()
+        self.sample_count = np.zeros(nr_estimation_samples, dtype=np.int64)
+        self.filled = np.zeros(nr_estimation_samples, dtype=bool)
+        self.nr_filled = 0
 
-        if self.logged_data_complete:
-            # This notifies the listeners that the data has become available
-            post_event(event_type=RIEventTypes.ESTIMATION_DATA_LOGGED, data=self.data)
+    @property
+    def nr_estimation_samples(self) -> int:
+        return len(self.estimate_time)
 
     @property
-    def logged_data_complete(self) -> bool:
+    def coverage(self) -> float:
+        return self.nr_filled / self.nr_estimation_samples
+
+    @property
+    def complete(self) -> bool:
+        return self.nr_filled == self.nr_estimation_samples
+
+    def log(self, distance_normalized: np.ndarray, estimate_time: np.ndarray) -> None:
+        """Logs the samples of all cars of the class at once, a sample only replaces a less accurate one"""
+        index_in_estimation_list = np.maximum(np.rint(distance_normalized / self.resolution_normalized)
+                                              .astype(np.intp) - 1, 0)
+        current_dist_error = np.abs(distance_normalized - self.distance_normalized[index_in_estimation_list])
+
+        np.add.at(self.sample_count, index_in_estimation_list, 1)
+
+        # If current more accurate, overwrite the old data with new
+        more_accurate = current_dist_error < self.dist_error[index_in_estimation_list]
+        if not more_accurate.any():
+            return
+
+        # With multiple cars in the same sample the most accurate one is written last, and thereby is the one kept
+        order = np.argsort(-current_dist_error[more_accurate], kind='stable')
+        index = index_in_estimation_list[more_accurate][order]
+        distance = distance_normalized[more_accurate][order]
+        self.dist_error[index] = current_dist_error[more_accurate][order]
+        self.estimate_time[index] = (self.distance_normalized[index] / distance) * estimate_time[more_accurate][order]
+
+        # E.g. a car right at the S/F line lands in the first sample without being more accurate than nothing
+        newly_filled = np.unique(index[~self.filled[index]])
+        self.nr_filled += len(newly_filled)
+        self.filled[newly_filled] = True
+
+    def estimation_data(self, lap_time: float) -> EstimationData:
         """
-        Returns True if the logged data is complete, otherwise returns False
-        :return:
+        The samples that were not logged yet are interpolated linearly between the logged ones. The S/F line, where
+        the estimate time is the lap time of the class, bounds the interpolation at both ends.
         """
-        if any(sample == 0 for sample in self.data.estimate_time):
-            return False
+        if self.complete:
+            estimate_time = self.estimate_time
         else:
-            logging.info("Logged data is complete!")
-            return True
+            filled = self.filled
+            distance = self.distance_normalized[filled]
+            known_time = self.estimate_time[filled]
+            if not filled[-1]:
+                if lap_time <= 0:  # Unknown, extrapolated from the pace up to the last logged sample
+                    lap_time = known_time[-1] / distance[-1]
+                distance, known_time = np.append(distance, 1.0), np.append(known_time, lap_time)
+            estimate_time = np.interp(self.distance_normalized, np.insert(distance, 0, 0.0),
+                                      np.insert(known_time, 0, 0.0))
 
-    @property
-    def distance_normalized_here(self) -> float:
-        return self.data.distance_normalized[self.index_in_estimation_list]
+        return EstimationData(distance_normalized=self.distance_normalized.tolist(),
+                              estimate_time=estimate_time.tolist(),
+                              resolution_normalized=self.resolution_normalized)
 
-    @property
-    def player_distance_normalized(self) -> float:
-        return self.ir_sdk["CarIdxLapDistPct"][self.player_car_id]
 
-    @property
-    def player_estimate_time(self) -> float:
-        return self.ir_sdk["CarIdxEstTime"][self.player_car_id]
+class RelativeDataLogger:
+    """
+    Class responsible for logging of the relative_time data in case it could not be received from DB.
+    Every car class is logged from the CarIdxEstTime of its own cars, all in a single pass over the CarIdx arrays.
 
-    @property
-    def index_in_estimation_list(self) -> int:
-        return max(round(self.player_distance_normalized / self.resolution_normalized) - 1, 0)
+    Once a part of the lap is logged the (interpolated) data is posted already, after which it is posted again
+    every time a bit more of the lap got logged, until it is complete.
+    """
+    meters_per_sample = 50
+    usable_coverage = 0.25  # Fraction of the lap to log before the interpolated data is used
+    coverage_step = 0.05  # Fraction of the lap to log in between two posts of the refined data
+
+    def __init__(self, ir_sdk: IRSDK, session_info: SessionInfoCache):
+        self.ir_sdk = ir_sdk
+        self.session_info = session_info
+        self.class_logs: Dict[int, ClassEstimationLog] = {}
+        self.posted_coverage: Dict[int, float] = {}  # Coverage of the data that was posted last, per car class
+
+    def log_relative_data(self, car_class_ids: Collection[int]) -> None:
+        """Used to gather the data of the given car classes that is to be sent to DB later to support NORMAL mode"""
+        distance_normalized = np.asarray(self.ir_sdk["CarIdxLapDistPct"], dtype=np.float64)
+        estimate_time = np.asarray(self.ir_sdk["CarIdxEstTime"], dtype=np.float64)
+        car_classes = np.asarray(self.ir_sdk["CarIdxClass"])
+        on_track = distance_normalized > 0
+
+        for car_class_id in car_class_ids:
+            cars = on_track & (car_classes == car_class_id)
+            if not cars.any():
+                continue
+
+            class_log = self.class_logs.get(car_class_id)
+            if not class_log:
+                class_log = self.class_logs[car_class_id] = ClassEstimationLog(
+                        nr_estimation_samples=self.nr_estimation_samples,
+                        resolution_normalized=self.resolution_normalized)
+            class_log.log(distance_normalized=distance_normalized[cars], estimate_time=estimate_time[cars])
+
+            if self.should_post(car_class_id=car_class_id, coverage=class_log.coverage):
+                self.posted_coverage[car_class_id] = class_log.coverage
+                if class_log.complete:
+                    logging.info("Logged data of car class %s is complete!", car_class_id)
+                # This notifies the listeners that the data has become available, within this update
+                post_event(event_type=RIEventTypes.ESTIMATION_DATA_LOGGED,
+                           data=LoggedEstimationData(car_class_id=car_class_id,
+                                                     estimation_data=class_log.estimation_data(
+                                                             lap_time=self.class_lap_time(car_class_id)),
+                                                     coverage=class_log.coverage),
+                           immediate=True)
+
+    def should_post(self, car_class_id: int, coverage: float) -> bool:
+        if coverage < self.usable_coverage:
+            return False
+        posted_coverage = self.posted_coverage.get(car_class_id)
+        return posted_coverage is None or coverage >= 1.0 or coverage - posted_coverage >= self.coverage_step
+
+    def class_lap_time(self, car_class_id: int) -> float:
+        """The estimated lap time of the car class according to the session info, 0 if unknown"""
+        for driver in self.session_info.snapshot.drivers.values():
+            if driver.car_class_id == car_class_id:
+                return driver.car_class_est_lap_time
+        return 0.0
 
     @property
     def nr_estimation_samples(self) -> int:
@@ -120,79 +290,202 @@ class RelativeDataLogger:
 
     @property
     def track_length_m(self) -> float:
-        return float(self.ir_sdk["WeekendInfo"]["TrackLengthOfficial"][0:-4]) * self.km_to_m
-
-    @property
-    def player_car_id(self) -> Optional[int]:
-        return self.ir_sdk["DriverInfo"]["DriverCarIdx"]
+        return self.session_info.snapshot.track_length_m
 
 
 class RelativeTelemetry(OverlayTelemetry):
-    def __init__(self, ir_sdk: IRSDK, dynamo_db_resource: DynamoDB):
+    def __init__(self, ir_sdk: IRSDK, session_info: SessionInfoCache, dynamo_db_resource: Optional[DynamoDB],
+                 estimation_cache: Optional[EstimationCache] = None):
         self.ir_sdk = ir_sdk
-
-        # The telemetry that serves as output
-        self.sorted_relative_entries: List[Optional[RelativeEntry]] = []
-
-        # Estimation data attributes
-        self.estimation_data_checked = False  # Flag whether the DB was queried for the relevant data
-        self.estimation_data: Optional[EstimationData] = None
-        self.dynamo_db_table = DynamoDBTable(dynamo_db=dynamo_db_resource, name=TableNames.RELATIVE.value)
+        self.session_info = session_info
+        self.estimation_cache = estimation_cache  # Checked before the db, also holds the data logged earlier
+
+        # The telemetry that serves as output, allocated on the first update and overwritten in place afterwards
+        self.table: Optional[relative_batch.RelativeTable] = None
+        self._snapshot: Optional[RelativeSnapshot] = None  # Of the current table, shared until the next update
+
+        # Estimation data attributes, per car class. The data of the player's car class determines the mode
+        self.estimation_data_checked_update: Optional[int] = None  # SessionInfoUpdate the car classes were checked at
+        self.car_class_ids: FrozenSet[int] = frozenset()  # In the session
+        self._checked_class_ids: Set[int] = set()  # Looked up in the cache and requested from the db
+        self._partial_class_ids: Set[int] = set()  # With the data of the logger that is not complete yet
+        self.class_estimation_data: Dict[int, EstimationData] = {}
+        self.estimation_tables: Dict[int, EstimationTable] = {}  # Compiled from the estimation data on arrival
+        self.dynamo_db_table: Optional[DynamoDBTable] = None  # Without a db (e.g. offline replay) data gets logged
+        self.estimation_fetcher: Optional[EstimationDataFetcher[Dict[int, EstimationData]]] = None
+        self.estimation_uploader: Optional[EstimationUploader] = None  # Shares the logged data through the db
+        if dynamo_db_resource:
+            self.connect_db(dynamo_db_resource=dynamo_db_resource)
+        self._estimation_key: Optional[EstimationKey] = None  # The session (and player class) the data belongs to
         self.relative_data_logger: Optional[RelativeDataLogger] = None
+        self._driver_arrays: Optional[relative_batch.DriverArrays] = None
         # Event handling to receive estimation data from logger
         subscribe(event_type=RIEventTypes.ESTIMATION_DATA_LOGGED, fn=self.estimation_data_logged_event_handler)
 
     def update(self) -> None:
         """Updates the attribute values of the relative_time telemetry"""
-        if not self.player_car_id:
+        if self.player_car_id is None:
             return
-        if not self.player_car_class_id:
+        if self.player_car_class_id is None:
             return
 
-        # The check is to be performed after car class is available!
-        if not self.estimation_data_checked:
+        # A new track, track version or car class, the estimation data of the previous one is of no use anymore
+        estimation_key = self.estimation_key
+        if estimation_key != self._estimation_key:
+            self.reset_estimation_data(estimation_key=estimation_key)
+
+        # The check is to be performed after car class is available! Car classes that join later are checked too
+        if self.estimation_data_checked_update != self.session_info.snapshot.update:
             self.check_estimation_data()
-            self.estimation_data_checked = True
+            self.estimation_data_checked_update = self.session_info.snapshot.update
 
-        if self.mode == RelativeMode.LITE:
-            self.relative_data_logger.log_relative_data()
+        # Switches to NORMAL mode in between ticks, once the data from the db arrived
+        if self.estimation_fetcher:
+            fetched = self.estimation_fetcher.poll()
+            for car_class_id, estimation_data in (fetched or {}).items():
+                self.set_estimation_data(car_class_id=car_class_id, estimation_data=estimation_data)
+
+        # Classes without (complete) data are logged
+        logged_car_class_ids = self.car_class_ids.difference(self.estimation_tables).union(self._partial_class_ids)
+        if logged_car_class_ids:
+            self.relative_data_logger.log_relative_data(car_class_ids=logged_car_class_ids)
 
-        self.sorted_relative_entries = self.get_sorted_relative_entries()
+        self.update_table()
+
+    def connect_db(self, dynamo_db_resource: DynamoDB) -> None:
+        """
+        Only to be called before the first update, for when the db resource is created in parallel with the telemetry.
+        """
+        # Shared by the threads of the fetcher and the uploader, each uses a boto3 resource of its own
+        self.dynamo_db_table = DynamoDBTable(dynamo_db=dynamo_db_resource, name=TableNames.RELATIVE.value)
+        self.estimation_fetcher = EstimationDataFetcher(fetch=self.fetch_estimation_data)
+        self.estimation_uploader = EstimationUploader(table=self.dynamo_db_table)
+        self.estimation_uploader.start()
 
     def check_estimation_data(self) -> None:
-        self.estimation_data = self.get_estimation_data()
-        if not self.estimation_data:
-            self.relative_data_logger = RelativeDataLogger(ir_sdk=self.ir_sdk)
+        """
+        Cached data is used right away. The car classes without it are fetched from the db in a single request,
+        while being logged (the player's car class in LITE mode).
+        """
+        self.car_class_ids = frozenset(driver.car_class_id for driver in self.session_info.snapshot.drivers.values()
+                                       ) | {self._estimation_key.car_class_id}
+        unchecked_class_ids = self.car_class_ids - self._checked_class_ids
+        if not unchecked_class_ids:
+            return
+        self._checked_class_ids.update(unchecked_class_ids)
 
-    def get_estimation_data(self) -> Optional[EstimationData]:
+        for car_class_id in unchecked_class_ids:
+            self.set_estimation_data(car_class_id=car_class_id,
+                                     estimation_data=self.get_cached_estimation_data(
+                                             key=self.estimation_key_for(car_class_id)))
+
+        missing_class_ids = sorted(self.car_class_ids.difference(self.estimation_tables))
+        if not missing_class_ids:
+            return
+        if self.estimation_fetcher and unchecked_class_ids.intersection(missing_class_ids):
+            # Replaces a pending request, so that one's car classes are requested again
+            self.estimation_fetcher.request(keys=tuple(self.estimation_key_for(car_class_id)
+                                                       for car_class_id in missing_class_ids))
+        if not self.relative_data_logger:
+            self.relative_data_logger = RelativeDataLogger(ir_sdk=self.ir_sdk, session_info=self.session_info)
+
+    def reset_estimation_data(self, estimation_key: EstimationKey) -> None:
+        """Cancels a pending fetch for the previous session, the data for the new one is checked next"""
+        if self.estimation_fetcher:
+            self.estimation_fetcher.cancel()
+        self._estimation_key = estimation_key
+        self.estimation_data_checked_update = None
+        self.car_class_ids = frozenset()
+        self._checked_class_ids = set()
+        self._partial_class_ids = set()
+        self.class_estimation_data, self.estimation_tables = {}, {}
+        self.relative_data_logger = None
+
+    def get_cached_estimation_data(self, key: EstimationKey) -> Optional[EstimationData]:
         """
-        Queries the AWS Dynamo DB Table for the estimate data of that track and car class combo.
-        Example output:
+        Gets the estimate data of that track and car class combo from the local cache.
+        When it is older than the TTL it is still used, while it is refreshed from the db in the background.
+        """
+        if not self.estimation_cache:
+            return None
+
+        cached = self.estimation_cache.get(track_id=key.track_id, track_version=key.track_version,
+                                           car_class_id=key.car_class_id)
+        if not cached:
+            return None
+
+        if cached.is_stale(ttl_s=self.estimation_cache.ttl_s) and self.estimation_fetcher:
+            self.estimation_fetcher.submit(lambda: self.fetch_estimation_data(keys=(key,)))
+        return EstimationData(distance_normalized=cached.distance_normalized.tolist(),
+                              estimate_time=cached.estimate_time.tolist(),
+                              resolution_normalized=cached.resolution_normalized)
+
+    def fetch_estimation_data(self, keys: Tuple[EstimationKey, ...]) -> Dict[int, EstimationData]:
+        """
+        Queries the AWS Dynamo DB Table for the estimate data of the car classes of that track, in a single request.
+        Valid data is stored in the cache. Only depends on the keys, as it is called from a background thread.
+        Returns the data by car class, the car classes the db has no data for are left out.
+        Example item:
             {
-                "DistancePct": [],
-                "EstimateTime": [],
-                "ResolutionPct": 0.0024154589371980675
+                "EstimationData": {
+                    "4011": {
+                        "DistancePct": [],
+                        "EstimateTime": [],
+                        "ResolutionPct": 0.0024154589371980675
+                    }
+                },
+                "TrackVersion": "2022.11.22.02"
             }
         """
-        data = self.dynamo_db_table.get_item(key={'track_id': self.track_id},
-                                             projection_expression="EstimationData.#key_name,TrackVersion",
-                                             expression_attr_name={'#key_name': str(self.player_car_class_id)})
-
-        if self.is_data_valid(data=data):
-            estimation_dict = data["EstimationData"][f"{self.player_car_class_id}"]
+        if not self.dynamo_db_table or not keys:
+            return {}
+
+        track_id, track_version = keys[0].track_id, keys[0].track_version
+        names = {f"#c{i}": str(key.car_class_id) for i, key in enumerate(keys)}
+        data = self.dynamo_db_table.get_item(key={'track_id': track_id},
+                                             projection_expression=",".join(
+                                                     [f"EstimationData.{name}" for name in names] + ["TrackVersion"]),
+                                             expression_attr_name=names,
+                                             raise_on_error=True)  # Such that the fetcher can retry
+
+        if not self.is_data_valid(data=data, track_version=track_version):
+            if data and data["TrackVersion"] != track_version and self.estimation_cache:
+                for key in keys:
+                    self.estimation_cache.invalidate(track_id=key.track_id, car_class_id=key.car_class_id)
+            return {}
+
+        fetched = {}
+        for key in keys:
+            estimation_dict = data["EstimationData"].get(f"{key.car_class_id}")
+            if not estimation_dict:
+                logging.info("The estimation data was not provided for car class %s", key.car_class_id)
+                continue
             estimation_data = EstimationData(distance_normalized=estimation_dict["DistancePct"],
                                              estimate_time=estimation_dict["EstimateTime"],
                                              resolution_normalized=estimation_dict["ResolutionPct"])
-            return estimation_data
-
-    def is_data_valid(self, data):
+            self.store_estimation_data(estimation_data=estimation_data, key=key)
+            fetched[key.car_class_id] = estimation_data
+        return fetched
+
+    def store_estimation_data(self, estimation_data: EstimationData, key: EstimationKey) -> None:
+        if self.estimation_cache:
+            self.estimation_cache.put(track_id=key.track_id, track_version=key.track_version,
+                                      car_class_id=key.car_class_id,
+                                      distance_normalized=estimation_data.distance_normalized,
+                                      estimate_time=estimation_data.estimate_time,
+                                      resolution_normalized=estimation_data.resolution_normalized)
+
+    def is_data_valid(self, data, track_version: Optional[str] = None):
         """
         Validates whether the relative_time estimation data is available, valid and up-to-date. Returns False otherwise.
+        The track version defaults to the one of the current session.
         """
         if not data:
             return False
 
-        if data["TrackVersion"] != self.ir_sdk["WeekendInfo"]["TrackVersion"]:
+        if track_version is None:
+            track_version = self.session_info.snapshot.track_version
+        if data["TrackVersion"] != track_version:
             logging.warning("Data was returned from db but the 'Track Version' in the database is outdated")
             return False
 
@@ -205,24 +498,84 @@ class RelativeTelemetry(OverlayTelemetry):
             logging.info("The data that was returned from the db is checked and deemed valid.")
             return True
 
-    def estimation_data_logged_event_handler(self, estimation_data: EstimationData):
-        """This is tied to the ESTIMATION_DATA_LOGGED event, posted by the relative_data_logger"""
-        self.estimation_data = estimation_data
+    def estimation_data_logged_event_handler(self, logged: LoggedEstimationData):
+        """
+        This is tied to the ESTIMATION_DATA_LOGGED event, posted by the relative_data_logger.
+        Partly logged data is used right away, it is only stored and shared once complete.
+        """
+        self.set_estimation_data(car_class_id=logged.car_class_id, estimation_data=logged.estimation_data)
+        if logged.car_class_id not in self.estimation_tables:
+            return
+        if not logged.complete:
+            self._partial_class_ids.add(logged.car_class_id)  # Keeps logging to refine it
+            return
+
+        # Passed validation, next sessions at this track can start in NORMAL mode
+        key = self.estimation_key_for(logged.car_class_id)
+        self.store_estimation_data(estimation_data=logged.estimation_data, key=key)
+        if self.estimation_uploader:
+            self.estimation_uploader.enqueue(key=key,
+                                             distance_normalized=logged.estimation_data.distance_normalized,
+                                             estimate_time=logged.estimation_data.estimate_time,
+                                             resolution_normalized=logged.estimation_data.resolution_normalized)
+
+    def set_estimation_data(self, car_class_id: int, estimation_data: Optional[EstimationData]) -> None:
+        """Compiles the estimation data into the lookup table, data that doesn't pass validation is not used"""
+        self._partial_class_ids.discard(car_class_id)
+        self.class_estimation_data.pop(car_class_id, None)
+        self.estimation_tables.pop(car_class_id, None)
+        if not estimation_data:
+            return
+
+        try:
+            estimation_data, estimation_table = compile_estimation_data(estimation_data=estimation_data)
+        except ValueError as exc:
+            logging.warning("Estimation data of car class %s is not valid and will not be used: %s",
+                            car_class_id, exc)
+            return
+
+        self.class_estimation_data[car_class_id] = estimation_data
+        self.estimation_tables[car_class_id] = estimation_table
+
+    @property
+    def estimation_data(self) -> Optional[EstimationData]:
+        """The estimation data of the player's car class"""
+        return self.class_estimation_data.get(self._estimation_key.car_class_id) if self._estimation_key else None
+
+    @property
+    def estimation_table(self) -> Optional[EstimationTable]:
+        return self.estimation_tables.get(self._estimation_key.car_class_id) if self._estimation_key else None
 
     @property
     def mode(self) -> RelativeMode:
-        if self.estimation_data:
+        if self.estimation_table:
             return RelativeMode.NORMAL
         else:
             return RelativeMode.LITE
 
     @property
     def track_id(self) -> int:
-        return self.ir_sdk["WeekendInfo"]["TrackID"]
+        return self.session_info.snapshot.track_id
+
+    @property
+    def estimation_key(self) -> EstimationKey:
+        return self.estimation_key_for(car_class_id=self.player_car_class_id)
+
+    def estimation_key_for(self, car_class_id: int) -> EstimationKey:
+        return EstimationKey(track_id=self.track_id,
+                             track_version=self.session_info.snapshot.track_version,
+                             car_class_id=car_class_id)
+
+    def close(self) -> None:
+        """Stops the background fetches, the logged data that could not be uploaded yet is kept on disk"""
+        if self.estimation_fetcher:
+            self.estimation_fetcher.shutdown()
+        if self.estimation_uploader:
+            self.estimation_uploader.stop()
 
     @property
     def player_car_id(self) -> Optional[int]:
-        return self.ir_sdk["DriverInfo"]["DriverCarIdx"]
+        return self.session_info.snapshot.player_car_idx
 
     @property
     def player_car_class_id(self) -> Optional[int]:
@@ -234,17 +587,99 @@ class RelativeTelemetry(OverlayTelemetry):
 
     @property
     def player_lap_time(self) -> float:
-        return self.ir_sdk['DriverInfo']['DriverCarEstLapTime']
+        return self.session_info.snapshot.player_car_est_lap_time
 
     @property
     def player_laps(self) -> float:
         return self.ir_sdk['CarIdxLap'][self.player_car_id]
 
-    @property
-    def driver_results(self):
-        return self.ir_sdk['DriverInfo']['Drivers']
+    def update_table(self) -> None:
+        """
+        Computes the relative for all CarIdx arrays at once, such that the cost per tick is flat in field size, and
+        writes it into the table. Besides the table and its roster, no objects are kept from one tick to the next.
+        get_sorted_relative_entries_scalar is the reference implementation that should give the same result.
+        """
+        distance_normalized = np.array(self.ir_sdk['CarIdxLapDistPct'], dtype=np.float64)
+        nr_cars = len(distance_normalized)
+        driver_arrays = self.get_driver_arrays(nr_cars=nr_cars)
+        if not self.table or self.table.nr_cars != nr_cars:
+            self.table = relative_batch.RelativeTable(nr_cars=nr_cars)
+        table = self.table
+
+        valid = relative_batch.valid_cars(distance_normalized=distance_normalized,
+                                          tire_compound=self.ir_sdk['CarIdxTireCompound'],
+                                          has_driver=driver_arrays.has_driver)
+
+        player_distance_normalized = float(distance_normalized[self.player_car_id])
+        if self.mode == RelativeMode.NORMAL:
+            estimate_time = self.estimation_table.estimate_time_to(distance_normalized)
+            relative_time = relative_batch.relative_time_normal(
+                    distance_normalized=distance_normalized,
+                    player_distance_normalized=player_distance_normalized,
+                    player_lap_time=self.player_lap_time,
+                    est_to_other=estimate_time,
+                    est_to_player=float(estimate_time[self.player_car_id]))
+        else:
+            relative_time = relative_batch.relative_time_lite(
+                    distance_normalized=distance_normalized,
+                    player_distance_normalized=player_distance_normalized,
+                    player_lap_time=self.player_lap_time,
+                    lap_time_other=driver_arrays.car_class_est_lap_time)
+        np.copyto(table.relative_time, relative_time)
+        self.apply_class_estimation_tables(relative_time=table.relative_time,
+                                           distance_normalized=distance_normalized,
+                                           player_distance_normalized=player_distance_normalized,
+                                           car_class_id=driver_arrays.car_class_id)
+
+        laps = np.array(self.ir_sdk['CarIdxLap'])
+        table.lapped_state[:] = relative_batch.lapped_state_codes(distance_normalized=distance_normalized,
+                                                                  laps=laps,
+                                                                  player_distance_normalized=player_distance_normalized,
+                                                                  player_laps=int(laps[self.player_car_id]))
+        table.in_pits[:] = self.ir_sdk['CarIdxOnPitRoad']
+        table.position[:] = self.ir_sdk['CarIdxClassPosition']
+        table.set_order(relative_batch.sorted_order(relative_time=table.relative_time, valid=valid))
+        self._snapshot = None
 
     def get_sorted_relative_entries(self) -> List[RelativeEntry]:
+        """All the entries of a fresh table, in the same form as get_sorted_relative_entries_scalar"""
+        self.update_table()
+        return list(self.snapshot().sorted_relative_entries)
+
+    def apply_class_estimation_tables(self, relative_time: np.ndarray, distance_normalized: np.ndarray,
+                                      player_distance_normalized: float, car_class_id: np.ndarray) -> None:
+        """
+        The time to a car BEHIND is the time it takes that car to reach the player. For cars of another car class it
+        is estimated with the data of their own class, when available. Overwrites those in relative_time.
+        """
+        other_class_ids = [class_id for class_id in self.estimation_tables
+                           if class_id != self._estimation_key.car_class_id]
+        if not other_class_ids:
+            return
+
+        behind = ~relative_batch.is_ahead(distance_normalized, player_distance_normalized)
+        for class_id in other_class_ids:
+            cars = behind & (car_class_id == class_id)
+            if not cars.any():
+                continue
+            table = self.estimation_tables[class_id]
+            relative_time[cars] = relative_batch.relative_time_normal(
+                    distance_normalized=distance_normalized[cars],
+                    player_distance_normalized=player_distance_normalized,
+                    player_lap_time=table.lap_time,
+                    est_to_other=table.estimate_time_to(distance_normalized[cars]),
+                    est_to_player=float(table.estimate_time_to(np.array([player_distance_normalized]))[0]))
+
+    def get_driver_arrays(self, nr_cars: int) -> relative_batch.DriverArrays:
+        """The per car session info arrays, only re-derived when the session info changed"""
+        if not self._driver_arrays or self._driver_arrays.update != self.session_info.snapshot.update \
+                or len(self._driver_arrays.has_driver) != nr_cars:
+            self._driver_arrays = relative_batch.driver_arrays(session_info=self.session_info.snapshot,
+                                                               nr_cars=nr_cars)
+        return self._driver_arrays
+
+    def get_sorted_relative_entries_scalar(self) -> List[RelativeEntry]:
+        """Reference (per car) implementation of get_sorted_relative_entries, the benchmarks check that both agree"""
         relative_entry_list = self.get_relative_entry_list()
 
         # Sort the relative_time list based on relative_time time
@@ -268,10 +703,14 @@ class RelativeTelemetry(OverlayTelemetry):
             #     continue
 
             # Get the input data for relative entry
+            driver = self.get_driver(car_id=idx)
+            if not driver:  # Not (yet) in the session info
+                continue
+
             distance_normalized = self.ir_sdk['CarIdxLapDistPct'][idx]
-            driver_dict = self.get_driver_dict(car_id=idx)
             relative_time = self.get_relative_time(distance_normalized=distance_normalized,
-                                                   lap_time_other=driver_dict["CarClassEstLapTime"])
+                                                   lap_time_other=driver.car_class_est_lap_time,
+                                                   car_class_id=driver.car_class_id)
             in_pits = self.ir_sdk['CarIdxOnPitRoad'][idx]
             lapped_state = self.get_lapped_state(laps_other=self.ir_sdk['CarIdxLap'][idx],
                                                  distance_normalized=distance_normalized)
@@ -279,10 +718,10 @@ class RelativeTelemetry(OverlayTelemetry):
 
             # Create a relative entry instance
             relative_entry = RelativeEntry(position=class_position,
-                                           car_nr=driver_dict["CarNumberRaw"],
-                                           driver_name=driver_dict["UserName"],
-                                           license=driver_dict["LicString"],
-                                           irating=driver_dict["IRating"],
+                                           car_nr=driver.car_nr,
+                                           driver_name=driver.driver_name,
+                                           license=driver.license,
+                                           irating=driver.irating,
                                            relative_time=relative_time,
                                            in_pits=in_pits,
                                            is_player=bool(idx == self.player_car_id),
@@ -293,46 +732,72 @@ class RelativeTelemetry(OverlayTelemetry):
             relative_entry_list.append(relative_entry)
         return relative_entry_list
 
-    @property
-    def player_id_in_sorted(self) -> int:
-        # Store the index for the player in this list, such that the UI can center itself around this index later
-        for i, entry in enumerate(self.sorted_relative_entries):
-            if entry.car_id == self.player_car_id:
-                return i
-        return 0
-
-    def get_driver_dict(self, car_id: int) -> dict:
-        for driver in self.driver_results:
-            if driver["CarIdx"] == car_id:
-                return driver
-
-    def get_relative_time(self, distance_normalized: float, lap_time_other: float) -> float:
+    def snapshot(self) -> RelativeSnapshot:
+        """
+        Copies the sorted rows out of the table (which the next update overwrites) into preallocated columns that no
+        other snapshot uses, the roster is shared.
+        Until the table is updated again the same snapshot is returned, such that its entries are reused.
+        """
+        if self._snapshot is not None:
+            return self._snapshot
+        if not self.table:
+            return RelativeSnapshot()
+
+        nr_sorted = self.table.nr_sorted
+        columns = self.table.sorted_columns()
+        car_ids = columns.car_ids[:nr_sorted]
+        player_ids = np.flatnonzero(car_ids == self.player_car_id)
+        self._snapshot = RelativeSnapshot(car_ids=car_ids,
+                                          relative_time=columns.relative_time[:nr_sorted],
+                                          lapped_state=columns.lapped_state[:nr_sorted],
+                                          in_pits=columns.in_pits[:nr_sorted],
+                                          position=columns.position[:nr_sorted],
+                                          roster=self._driver_arrays,
+                                          player_car_id=self.player_car_id,
+                                          player_id_in_sorted=int(player_ids[0]) if len(player_ids) else 0)
+        columns.hand_to(self._snapshot)
+        return self._snapshot
+
+    def get_driver(self, car_id: int) -> Optional[DriverEntry]:
+        return self.session_info.snapshot.drivers.get(car_id)
+
+    def get_relative_time(self, distance_normalized: float, lap_time_other: float,
+                          car_class_id: Optional[int] = None) -> float:
+        if car_class_id != self._estimation_key.car_class_id and car_class_id in self.estimation_tables \
+                and self.get_relative_location(distance_normalized) == RelativeLocation.BEHIND:
+            return self.calculate_relative_time_normal(distance_normalized=distance_normalized,
+                                                       estimation_data=self.class_estimation_data[car_class_id],
+                                                       lap_time=self.estimation_tables[car_class_id].lap_time)
         if self.mode == RelativeMode.NORMAL:
             return self.calculate_relative_time_normal(distance_normalized=distance_normalized)
         if self.mode == RelativeMode.LITE:
             return self.calculate_relative_time_lite(distance_normalized=distance_normalized,
                                                      lap_time_other=lap_time_other)
 
-    def calculate_relative_time_normal(self, distance_normalized: float) -> float:
+    def calculate_relative_time_normal(self, distance_normalized: float,
+                                       estimation_data: Optional[EstimationData] = None,
+                                       lap_time: Optional[float] = None) -> float:
         """
         Method that uses the estimation data to calculate the relative_time time between other(input) and the player
-        NOTE: An assumption is made here that the relative_time time is based on the estimate time of the player
+        NOTE: An assumption is made here that the relative_time time is based on the estimate time of the player,
+        unless the estimation data (and lap time) of another car class is given
         """
         relative_location = self.get_relative_location(distance_normalized=distance_normalized)
 
-        est_to_other = self.get_estimate_time_to_(distance_normalized)
-        est_to_player = self.get_estimate_time_to_(self.player_distance_normalized)
+        est_to_other = self.get_estimate_time_to_(distance_normalized, estimation_data)
+        est_to_player = self.get_estimate_time_to_(self.player_distance_normalized, estimation_data)
+        player_lap_time = self.player_lap_time if lap_time is None else lap_time
 
         if relative_location == RelativeLocation.AHEAD:
             if distance_normalized < self.player_distance_normalized:  # Other <- SF <- Player
-                time_player_to_sf = self.player_lap_time - est_to_player
+                time_player_to_sf = player_lap_time - est_to_player
                 relative_time = time_player_to_sf + est_to_other
             else:  # Other <- Player <- SF
                 relative_time = est_to_other - est_to_player
 
         else:  # relative_location == RelativeLocation.BEHIND:
             if self.player_distance_normalized < distance_normalized:  # Player <- SF <- Other
-                time_other_to_sf = self.player_lap_time - est_to_other
+                time_other_to_sf = player_lap_time - est_to_other
                 relative_time = est_to_player + time_other_to_sf
             else:  # Player <- Other <- SF
                 relative_time = est_to_player - est_to_other
@@ -374,24 +839,27 @@ class RelativeTelemetry(OverlayTelemetry):
             else:
                 return RelativeLocation.BEHIND
 
-    def get_estimate_time_to_(self, distance_normalized: float) -> float:
+    def get_estimate_time_to_(self, distance_normalized: float,
+                              estimation_data: Optional[EstimationData] = None) -> float:
         """
         Returns the value that represents the time it would take the PLAYER to reach that position
-        on track (aka normalized distance), measured starting from the start finish line
+        on track (aka normalized distance), measured starting from the start finish line.
+        With the estimation data of another car class it's the time it would take a car of that class.
         :return:
         """
+        estimation_data = estimation_data or self.estimation_data
         # Calculate the REAL index (float) that this location would have if possible to index with floats
         # -1 because 0 not included in data
-        location_in_list = max((distance_normalized / self.estimation_data.resolution_normalized) - 1, 0)
+        location_in_list = max((distance_normalized / estimation_data.resolution_normalized) - 1, 0)
 
         # Get the 2 int indices that bound this float index
         # # min to assure it doesn't go outside
-        upper_id = min(math.ceil(location_in_list), len(self.estimation_data.estimate_time) - 1)
+        upper_id = min(math.ceil(location_in_list), len(estimation_data.estimate_time) - 1)
         lower_id = math.floor(location_in_list)
 
         # Calculate the values in these indices
-        upper_value = self.estimation_data.estimate_time[upper_id]
-        lower_value = self.estimation_data.estimate_time[lower_id]
+        upper_value = estimation_data.estimate_time[upper_id]
+        lower_value = estimation_data.estimate_time[lower_id]
 
         # Interpolate linearly inbetween these bounding values based on the float index offset
         offset = location_in_list % 1
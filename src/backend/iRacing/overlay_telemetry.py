@@ -1,8 +1,43 @@
 import abc
+from dataclasses import dataclass
+from enum import Flag, auto
+from typing import Optional
+
+TICK_JITTER_S = 0.004  # The ticks of the sim are not exactly evenly spaced, a rate is not to skip a tick because of it
+
+
+class UpdateTrigger(Flag):
+    TICK = auto()  # Every tick of the sim, at (at most) the rate of the policy
+    NEW_LAP = auto()  # The tick on which the player completed a lap
+    SESSION_INFO = auto()  # The tick on which the sim updated the session info
+
+
+@dataclass(frozen=True)
+class UpdatePolicy:
+    """When an update is due: on any of its triggers. Used for the telemetries as well as the overlays"""
+    triggers: UpdateTrigger = UpdateTrigger.TICK
+    rate_hz: Optional[float] = None  # Of the TICK trigger, None for every tick
+
+    def interval_s(self, tick_interval_s: float) -> Optional[float]:
+        """Between the periodic updates, None when only the other triggers cause an update"""
+        if UpdateTrigger.TICK not in self.triggers:
+            return None
+        return max(1 / self.rate_hz, tick_interval_s) if self.rate_hz else tick_interval_s
+
+    def is_due(self, elapsed_s: float, new_lap: bool, session_info_changed: bool) -> bool:
+        """elapsed_s: since the previous update"""
+        if new_lap and UpdateTrigger.NEW_LAP in self.triggers:
+            return True
+        if session_info_changed and UpdateTrigger.SESSION_INFO in self.triggers:
+            return True
+        if UpdateTrigger.TICK not in self.triggers:
+            return False
+        return not self.rate_hz or elapsed_s + TICK_JITTER_S >= 1 / self.rate_hz
 
 
 class OverlayTelemetry(metaclass=abc.ABCMeta):
     """Abstract base class that defines the minimum implementation requirements for an overlay telemetry class"""
+    update_policy = UpdatePolicy()  # Every tick, unless the telemetry declares that it needs less
 
     @abc.abstractmethod
     def update(self) -> None:
@@ -0,0 +1,121 @@
+"""Cache of the session info (yaml) data, derived into typed and pre-indexed structures"""
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from irsdk import IRSDK
+
+
+@dataclass(frozen=True)
+class DriverEntry:
+    """The static data of a driver/car in the session, as found in DriverInfo.Drivers"""
+    car_idx: int
+    car_nr: int
+    driver_name: str
+    license: str
+    irating: int
+    car_class_id: int
+    car_class_est_lap_time: float
+
+
+@dataclass(frozen=True)
+class LeaderEntry:
+    """The leader of the last valid session, as found in SessionInfo.Sessions[].ResultsPositions"""
+    car_idx: int
+    fastest_time: float
+
+
+@dataclass(frozen=True)
+class SessionInfoSnapshot:
+    """All the session info data the telemetry needs, only re-derived when SessionInfoUpdate changes"""
+    update: int = -1
+    player_car_idx: Optional[int] = None
+    player_car_est_lap_time: float = 0.0
+    player_user_id: Optional[int] = None
+    player_car_model_id: Optional[int] = None  # CarID, the car model (not the CarIdx)
+    drivers: Dict[int, DriverEntry] = field(default_factory=dict)  # By CarIdx
+    last_session_id: int = -1  # Negative index into SessionInfo.Sessions, as iRacing pre-populates sessions
+    leader: Optional[LeaderEntry] = None  # None when the last session has no results (yet)
+    track_id: Optional[int] = None
+    track_version: Optional[str] = None
+    track_length_m: float = 0.0
+
+
+class SessionInfoCache:
+    """
+    Re-derives the SessionInfoSnapshot only when the sim updates the session info.
+    Per-tick code should read from the snapshot instead of indexing the yaml derived dicts of the sdk.
+    """
+    km_to_m = 1000
+
+    def __init__(self, ir_sdk: IRSDK):
+        self.ir_sdk = ir_sdk
+        self.snapshot = SessionInfoSnapshot()
+
+    def update(self) -> bool:
+        """To be called every tick (after freezing the data). Returns True when the snapshot was re-derived"""
+        session_info_update = self.ir_sdk.session_info_update
+        if session_info_update == self.snapshot.update:
+            return False
+
+        self.snapshot = self.derive_snapshot(update=session_info_update)
+        return True
+
+    def reset(self) -> None:
+        """To be called when disconnected, a new session might start counting its updates from the same number"""
+        self.snapshot = SessionInfoSnapshot()
+
+    def derive_snapshot(self, update: int) -> SessionInfoSnapshot:
+        """Walks the session info dicts once to build the snapshot"""
+        driver_info = self.ir_sdk['DriverInfo']
+        weekend_info = self.ir_sdk['WeekendInfo']
+        session_info = self.ir_sdk['SessionInfo']
+        if not (driver_info and weekend_info and session_info):  # Not (yet) available, try again next update
+            return SessionInfoSnapshot()
+
+        drivers = {}
+        for driver in driver_info['Drivers']:
+            drivers[driver['CarIdx']] = DriverEntry(car_idx=driver['CarIdx'],
+                                                    car_nr=driver['CarNumberRaw'],
+                                                    driver_name=driver['UserName'],
+                                                    license=driver['LicString'],
+                                                    irating=driver['IRating'],
+                                                    car_class_id=driver['CarClassID'],
+                                                    car_class_est_lap_time=driver['CarClassEstLapTime'])
+
+        player = next((driver for driver in driver_info['Drivers']
+                       if driver['CarIdx'] == driver_info['DriverCarIdx']), {})
+
+        last_session_id = self.find_last_session_id(sessions=session_info['Sessions'])
+        results_positions = session_info['Sessions'][last_session_id]['ResultsPositions']
+        leader = None
+        if results_positions:
+            leader = LeaderEntry(car_idx=results_positions[0]['CarIdx'],
+                                 fastest_time=results_positions[0]['FastestTime'])
+
+        return SessionInfoSnapshot(update=update,
+                                   player_car_idx=driver_info['DriverCarIdx'],
+                                   player_car_est_lap_time=driver_info['DriverCarEstLapTime'],
+                                   player_user_id=player.get('UserID'),
+                                   player_car_model_id=player.get('CarID'),
+                                   drivers=drivers,
+                                   last_session_id=last_session_id,
+                                   leader=leader,
+                                   track_id=weekend_info['TrackID'],
+                                   track_version=weekend_info['TrackVersion'],
+                                   track_length_m=self.parse_track_length_m(weekend_info['TrackLengthOfficial']))
+
+    @staticmethod
+    def find_last_session_id(sessions: list) -> int:
+        """
+        Finds the last session id by checking for valid data starting from the last session until valid data is found
+        Cannot simply take the last as iRacing already pre-populates these in case of officials
+        """
+        session_id = -1
+        while not sessions[session_id]['ResultsPositions'] and abs(session_id) < len(sessions):
+            session_id -= 1
+        return session_id
+
+    @classmethod
+    def parse_track_length_m(cls, track_length_official: str) -> float:
+        """Example input: '3.25 km'"""
+        return float(track_length_official[0:-4]) * cls.km_to_m
@@ -1,36 +1,153 @@
 """Python iRacing sdk for providing the data from the sim"""
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Optional
+
 from irsdk import IRSDK
 
 from src.backend.AWS.resources import DynamoDB
 from src.backend.iRacing.ir_state import IRState
-from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelTelemetry
-from src.backend.iRacing.overlay_telemetries.relative_telemetry import RelativeTelemetry
+from src.backend.iRacing.lap_history import LapHistory, LapHistoryKey
+from src.backend.iRacing.overlay_telemetries.estimation_cache import EstimationCache
+from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelSnapshot, FuelTelemetry
+from src.backend.iRacing.overlay_telemetries.race_projection import RaceProjection
+from src.backend.iRacing.overlay_telemetries.relative_telemetry import RelativeSnapshot, RelativeTelemetry
 from src.backend.iRacing.overlay_telemetries.timing_telemetry import TimingTelemetry
+from src.backend.iRacing.overlay_telemetry import OverlayTelemetry
+from src.backend.iRacing.session_info_cache import SessionInfoCache
+from src.backend.iRacing.telemetry_recorder import TelemetryRecorder
+from src.backend.utils.frame_timing import FrameTimings
+
+
+@dataclass(frozen=True)
+class TelemetrySnapshot:
+    """
+    Immutable state of all overlay telemetry after a single update, safe to hand over to another thread.
+    The sequence increases by one for every snapshot taken, such that a consumer can tell how many it missed.
+    """
+    sequence: int = 0
+    sampled_at: float = 0.0  # perf_counter() at the time the snapshot was taken
+    lap: int = 0  # Laps completed by the player, for the overlays that are updated on a new lap
+    session_info_update: int = -1  # Of the session info the snapshot is based on
+    fuel: FuelSnapshot = field(default_factory=FuelSnapshot)
+    relative: RelativeSnapshot = field(default_factory=RelativeSnapshot)
 
 
 class RITelemetry:
     """Provides all telemetry needed for the overlays"""
 
-    def __init__(self, dynamo_db_resource: DynamoDB):
-        self.ir_sdk = IRSDK()
+    def __init__(self, dynamo_db_resource: Optional[DynamoDB], ir_sdk: Optional[IRSDK] = None,
+                 recorder: Optional[TelemetryRecorder] = None, timings: Optional[FrameTimings] = None,
+                 estimation_cache: Optional[EstimationCache] = None, lap_history: Optional[LapHistory] = None):
+        # Any IRSDK stand-in (e.g. IRReplay) can be given instead of the live sdk
+        self.ir_sdk = ir_sdk if ir_sdk else IRSDK()
         self.ir_state = IRState()
+        self.recorder = recorder
+        self.timings = timings  # Only measures the stages of the update when given
+        self.lap_history = lap_history  # Every completed lap of the player is appended to it when given
+        self.session_info = SessionInfoCache(ir_sdk=self.ir_sdk)
 
-        self.timing_telemetry = TimingTelemetry(ir_sdk=self.ir_sdk)
-        self.fuel_telemetry = FuelTelemetry(ir_sdk=self.ir_sdk, timing_telemetry=self.timing_telemetry)
-        self.relative_telemetry = RelativeTelemetry(ir_sdk=self.ir_sdk, dynamo_db_resource=dynamo_db_resource)
+        self.timing_telemetry = TimingTelemetry(ir_sdk=self.ir_sdk, session_info=self.session_info)
+        self.race_projection = RaceProjection(ir_sdk=self.ir_sdk, session_info=self.session_info,
+                                              timing_telemetry=self.timing_telemetry)
+        self.fuel_telemetry = FuelTelemetry(ir_sdk=self.ir_sdk, timing_telemetry=self.timing_telemetry,
+                                            race_projection=self.race_projection)
+        self.relative_telemetry = RelativeTelemetry(ir_sdk=self.ir_sdk, session_info=self.session_info,
+                                                    dynamo_db_resource=dynamo_db_resource,
+                                                    estimation_cache=estimation_cache)
         # self.standings_telemetry = StandingsTelemetry()
+        self._sequence = 0
+        self._updated_at: Dict[OverlayTelemetry, float] = {}  # perf_counter() of the last update of each
+
+    def connect_db(self, dynamo_db_resource: DynamoDB) -> None:
+        """For when the telemetry was created before the db resource was available, only before the first update"""
+        self.relative_telemetry.connect_db(dynamo_db_resource=dynamo_db_resource)
 
     def update(self):
         """Method that will (attempt to) update all the telemetry data when possible"""
         # Check if still connected to iRacing
-        self.ir_state.update_state(ir_sdk=self.ir_sdk)
+        with self._measure("IRState.update_state"):
+            self.ir_state.update_state(ir_sdk=self.ir_sdk)
         if not self.ir_state.ir_connected:
+            self.session_info.reset()
+            self._updated_at.clear()  # Everything is due on the first tick after connecting
+            if self.lap_history:
+                self.lap_history.end_session()
             return
 
         # Freeze the data coming from the sim, to avoid it being updated while calculating something
-        self.ir_sdk.freeze_var_buffer_latest()
+        # NOTE: Includes the wait for the data valid event of the sim
+        with self._measure("IRSDK.freeze_var_buffer_latest"):
+            self.ir_sdk.freeze_var_buffer_latest()
+        if self.recorder:
+            with self._measure("TelemetryRecorder.record"):
+                self.recorder.record(ir_sdk=self.ir_sdk)
+
+        # Only re-derives the session info data when the sim updated it
+        with self._measure("SessionInfoCache.update"):
+            session_info_changed = self.session_info.update()
+        if session_info_changed and self.lap_history:
+            self.set_lap_statistics()
+
+        # Update the telemetry that is due according to its update policy. The timing telemetry is updated every
+        # tick and first, such that the others can be triggered by the new lap it detects
+        now = perf_counter()
+        for overlay_telemetry in (self.timing_telemetry, self.race_projection, self.fuel_telemetry,
+                                  self.relative_telemetry):
+            if not overlay_telemetry.update_policy.is_due(
+                    elapsed_s=now - self._updated_at.get(overlay_telemetry, float("-inf")),
+                    new_lap=self.timing_telemetry.new_lap,
+                    session_info_changed=session_info_changed):
+                continue
+            with self._measure(f"{type(overlay_telemetry).__name__}.update"):
+                overlay_telemetry.update()
+            self._updated_at[overlay_telemetry] = now
+
+        if self.lap_history and self.timing_telemetry.new_lap:
+            with self._measure("LapHistory.append_lap"):
+                self.append_lap_to_history()
+
+    @property
+    def lap_history_key(self) -> Optional[LapHistoryKey]:
+        """Of the player's car at the current track, None while the session info doesn't tell"""
+        session_info = self.session_info.snapshot
+        if None in (session_info.player_user_id, session_info.player_car_model_id, session_info.track_id):
+            return None
+        return LapHistoryKey(driver_id=session_info.player_user_id, car_id=session_info.player_car_model_id,
+                             track_id=session_info.track_id)
+
+    def set_lap_statistics(self) -> None:
+        """The fuel and the projection fall back on the laps of previous sessions until this one has laps of its own"""
+        key = self.lap_history_key
+        statistics = self.lap_history.statistics(key=key) if key else None
+        self.fuel_telemetry.lap_statistics = statistics
+        self.race_projection.lap_statistics = statistics
+
+    def append_lap_to_history(self) -> None:
+        """Laps without a valid lap time (e.g. the out lap) are left out"""
+        key = self.lap_history_key
+        lap_time = self.timing_telemetry.last_lap_time
+        if lap_time <= 0 or not key:
+            return
+        self.lap_history.append_lap(key=key,
+                                    lap=self.timing_telemetry.lap_count,
+                                    lap_time=lap_time,
+                                    fuel_used=self.fuel_telemetry.lap_consumption)
+
+    def _measure(self, stage: str):
+        return self.timings.measure(stage=stage) if self.timings else nullcontext()
+
+    def close(self) -> None:
+        """Stops the background work of the telemetry components"""
+        self.relative_telemetry.close()
 
-        # Update all telemetry
-        self.timing_telemetry.update()
-        self.fuel_telemetry.update()
-        self.relative_telemetry.update()
+    def snapshot(self) -> TelemetrySnapshot:
+        """To be called after update(), in the same thread"""
+        self._sequence += 1
+        return TelemetrySnapshot(sequence=self._sequence,
+                                 sampled_at=perf_counter(),
+                                 lap=self.timing_telemetry.lap_count,
+                                 session_info_update=self.session_info.snapshot.update,
+                                 fuel=self.fuel_telemetry.snapshot(),
+                                 relative=self.relative_telemetry.snapshot())
@@ -0,0 +1,260 @@
+"""Continuous recording of the iRacing sdk data to a bounded, memory mapped ring file"""
+import logging
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import Iterator, List, Optional, Tuple
+
+from irsdk import IRSDK
+
+RECORDING_EXTENSION = ".ring"
+DEFAULT_RECORDING_FILE = f"logs/telemetry_recording{RECORDING_EXTENSION}"
+
+# The sdk header incl. the (max 4) var buffer descriptors, see irsdk.Header
+SDK_HEADER_LEN = 48 + 4 * 16
+VAR_HEADER_LEN = 144
+
+CHUNK_HEADER = struct.Struct("<4sIIQ")  # magic, format version, chunk size, sequence number
+CHUNK_MAGIC = b"RICH"
+FORMAT_VERSION = 1
+
+RECORD_HEADER = struct.Struct("<BxxxIii")  # record type, payload length, tick count, session info update
+
+
+class RecordType(IntEnum):
+    """Types of the records in a chunk, END (0) matches the zeroed/unwritten part of a chunk"""
+    END = 0
+    LAYOUT = 1  # The sdk header and var headers, needed to interpret the frames
+    SESSION_INFO = 2  # The raw session info yaml
+    FRAME = 3  # The variable buffer of a single tick
+
+
+@dataclass
+class RecordedFrame:
+    """
+    A single tick read back from a recording, with the layout and session info that belong to it.
+    The var buffer stays in the memory map of the recording, it is only copied when var_buffer is read.
+    """
+    tick: int
+    session_info_update: int
+    session_info: bytes
+    layout: bytes
+    mem: mmap.mmap
+    offset: int  # Of the var buffer in mem
+    length: int
+
+    @property
+    def var_buffer(self) -> bytes:
+        return self.mem[self.offset:self.offset + self.length]
+
+
+class TelemetryRecorder:
+    """
+    Appends only the variable buffer of every new sim tick to a ring file of fixed size chunks.
+    The session info yaml is only appended when its update counter changes.
+
+    Each chunk starts with the layout and the current session info, so any chunk can be read on its own
+    and the oldest chunk can be overwritten once the ring is full. This bounds the disk use to
+    nr_chunks * chunk_size, while the writes themselves are plain memory copies into the memory map.
+
+    A recording that is already at file_path (e.g. of the previous session) is kept under a timestamped name,
+    of these only the newest keep_previous are kept.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = 8 * 1024 * 1024, nr_chunks: int = 64,
+                 keep_previous: int = 2):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.nr_chunks = nr_chunks
+        self.keep_previous = keep_previous
+
+        self.frames_recorded = 0
+        self.chunks_written = 0
+
+        self._file = None
+        self._mem: Optional[mmap.mmap] = None
+        self._chunk_index = -1
+        self._sequence = 0
+        self._position = 0  # Write position inside the current chunk
+
+        self._last_tick: Optional[int] = None
+        self._last_header = None
+        self._layout = b""
+        self._session_info_update = -1
+        self._session_info = b""
+
+        self.open()
+
+    @property
+    def file_size(self) -> int:
+        return self.chunk_size * self.nr_chunks
+
+    def open(self) -> None:
+        """Creates the ring file, a previous recording at the same path is rotated first"""
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.rotate()
+
+        self._file = open(self.file_path, "w+b")  # pylint: disable=consider-using-with
+        self._file.truncate(self.file_size)
+        self._mem = mmap.mmap(self._file.fileno(), self.file_size)
+        logging.info("Recording telemetry to %s (%s MB max)", self.file_path, self.file_size // (1024 * 1024))
+
+    def rotate(self) -> None:
+        """Renames the recording at file_path to the time it was last written and drops the oldest rotations"""
+        if not os.path.exists(self.file_path):
+            return
+
+        stem, extension = os.path.splitext(self.file_path)
+        written_at = datetime.fromtimestamp(os.path.getmtime(self.file_path)).strftime("%Y%m%d-%H%M%S")
+        os.replace(self.file_path, f"{stem}_{written_at}{extension}")
+
+        directory = os.path.dirname(self.file_path) or "."
+        prefix = f"{os.path.basename(stem)}_"
+        rotated = sorted(name for name in os.listdir(directory)
+                         if name.startswith(prefix) and name.endswith(extension))  # Sorts by the timestamp
+        for name in rotated[:max(len(rotated) - self.keep_previous, 0)]:
+            os.remove(os.path.join(directory, name))
+            logging.info("Removed the old telemetry recording %s", name)
+
+    def close(self) -> None:
+        if self._mem:
+            self._mem.flush()
+            self._mem.close()
+            self._mem = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def record(self, ir_sdk: IRSDK) -> None:
+        """To be called after freezing the var buffer. Only records when the sim produced a new tick"""
+        var_buffer = ir_sdk._var_buffer_latest
+        tick = var_buffer.tick_count
+        if tick == self._last_tick:
+            return
+        self._last_tick = tick
+
+        header = ir_sdk._header
+        if header is not self._last_header:  # New connection (or dump), the layout might have changed
+            self._last_header = header
+            self._update_layout(ir_sdk=ir_sdk)
+
+        if header.session_info_update != self._session_info_update:
+            self._update_session_info(ir_sdk=ir_sdk)
+            self._write_record(RecordType.SESSION_INFO, self._session_info, tick)
+
+        offset = var_buffer.buf_offset
+        self._write_record(RecordType.FRAME, var_buffer.get_memory()[offset:offset + header.buf_len], tick)
+        self.frames_recorded += 1
+
+    def _update_layout(self, ir_sdk: IRSDK) -> None:
+        header = ir_sdk._header
+        var_headers_len = header.num_vars * VAR_HEADER_LEN
+        layout = ir_sdk._shared_mem[0:SDK_HEADER_LEN] + \
+            ir_sdk._shared_mem[header.var_header_offset:header.var_header_offset + var_headers_len]
+
+        if layout != self._layout:
+            self._layout = layout
+            self._session_info_update = -1  # Force the session info to be written after the new layout
+            self._write_record(RecordType.LAYOUT, self._layout, 0)
+
+    def _update_session_info(self, ir_sdk: IRSDK) -> None:
+        header = ir_sdk._header
+        start = header.session_info_offset
+        end = ir_sdk._shared_mem.find(b"\x00", start, start + header.session_info_len)
+        if end == -1:
+            end = start + header.session_info_len
+        self._session_info = ir_sdk._shared_mem[start:end]
+        self._session_info_update = header.session_info_update
+
+    def _write_record(self, record_type: RecordType, payload: bytes, tick: int) -> None:
+        record_len = RECORD_HEADER.size + len(payload)
+        if record_len + CHUNK_HEADER.size > self.chunk_size:
+            logging.warning("Record of %s bytes does not fit in a chunk, skipped", record_len)
+            return
+
+        if self._chunk_index < 0 or self._position + record_len > self.chunk_size:
+            self._start_next_chunk(tick=tick)
+            if record_type != RecordType.FRAME:  # Already written at the start of the new chunk
+                return
+
+        self._write_at_position(record_type, payload, tick)
+
+    def _start_next_chunk(self, tick: int) -> None:
+        """Moves on to the next chunk in the ring, overwriting the oldest one when the ring is full"""
+        self._chunk_index = (self._chunk_index + 1) % self.nr_chunks
+        self._sequence += 1
+        self._position = self._chunk_index * self.chunk_size
+        self._mem[self._position:self._position + CHUNK_HEADER.size] = \
+            CHUNK_HEADER.pack(CHUNK_MAGIC, FORMAT_VERSION, self.chunk_size, self._sequence)
+        self._position = CHUNK_HEADER.size
+        self._mem[self._chunk_index * self.chunk_size + self._position] = RecordType.END
+        self.chunks_written += 1
+
+        # Makes the chunk readable on its own
+        if self._layout:
+            self._write_at_position(RecordType.LAYOUT, self._layout, 0)
+        if self._session_info:
+            self._write_at_position(RecordType.SESSION_INFO, self._session_info, tick)
+
+    def _write_at_position(self, record_type: RecordType, payload: bytes, tick: int) -> None:
+        start = self._chunk_index * self.chunk_size + self._position
+        end = start + RECORD_HEADER.size + len(payload)
+        self._mem[start:start + RECORD_HEADER.size] = \
+            RECORD_HEADER.pack(record_type, len(payload), tick, self._session_info_update)
+        self._mem[start + RECORD_HEADER.size:end] = payload
+        self._position += RECORD_HEADER.size + len(payload)
+
+        # Terminates the chunk here, such that stale records of the previous round in the ring are never read
+        if self._position + 1 <= self.chunk_size:
+            self._mem[end] = RecordType.END
+
+
+def open_recording(file_path: str) -> mmap.mmap:
+    """Maps a ring file read only, to be closed by the caller once its frames are no longer used"""
+    with open(file_path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_recording(mem: mmap.mmap) -> Iterator[RecordedFrame]:
+    """Reads all frames of a mapped ring file, ordered from the oldest chunk to the newest"""
+    if len(mem) < CHUNK_HEADER.size:
+        return
+    magic, version, chunk_size, _ = CHUNK_HEADER.unpack_from(mem, 0)
+    if magic != CHUNK_MAGIC or version != FORMAT_VERSION:
+        logging.warning("The mapped file is not a (compatible) telemetry recording")
+        return
+
+    chunks: List[Tuple[int, int]] = []
+    for chunk_start in range(0, len(mem), chunk_size):
+        magic, _, _, sequence = CHUNK_HEADER.unpack_from(mem, chunk_start)
+        if magic == CHUNK_MAGIC:
+            chunks.append((sequence, chunk_start))
+
+    for _, chunk_start in sorted(chunks):
+        yield from _read_chunk(mem, chunk_start, chunk_size)
+
+
+def _read_chunk(mem: mmap.mmap, chunk_start: int, chunk_size: int) -> Iterator[RecordedFrame]:
+    position = chunk_start + CHUNK_HEADER.size
+    chunk_end = chunk_start + chunk_size
+    layout, session_info = b"", b""
+    while position + RECORD_HEADER.size <= chunk_end:
+        record_type, length, tick, session_info_update = RECORD_HEADER.unpack_from(mem, position)
+        if record_type == RecordType.END:
+            break
+
+        payload_start = position + RECORD_HEADER.size
+        position = payload_start + length
+
+        if record_type == RecordType.LAYOUT:
+            layout = mem[payload_start:position]
+        elif record_type == RecordType.SESSION_INFO:
+            session_info = mem[payload_start:position]
+        elif record_type == RecordType.FRAME and layout:
+            yield RecordedFrame(tick=tick, session_info_update=session_info_update, session_info=session_info,
+                                layout=layout, mem=mem, offset=payload_start, length=length)
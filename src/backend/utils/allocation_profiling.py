@@ -0,0 +1,227 @@
+"""
+Diagnostic mode that finds the source of frame hitches in memory management: the allocations per tick (attributed to
+module and function), the GC collections with their pause durations and the live object counts per type.
+Far too expensive for normal use, the sampling itself causes a hitch every snapshot interval.
+"""
+import ast
+import gc
+import json
+import linecache
+import logging
+import os
+import tracemalloc
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from src.backend.utils.frame_timing import StageTiming
+
+DEFAULT_ALLOCATION_REPORT_FILE = "logs/allocation_profile.json"
+
+
+@dataclass
+class AllocationSite:
+    """Net allocations of a single function, per tick, averaged over the snapshot intervals"""
+    module: str
+    function: str
+    kib_per_tick: float
+    blocks_per_tick: float
+
+
+@dataclass
+class GCSummary:
+    """Collections of a single generation, pause durations in ms"""
+    generation: int
+    collections: int
+    collected: int
+    uncollectable: int
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+    total_ms: float
+
+
+@dataclass
+class ObjectCountSample:
+    """The counts of the types with the most (GC tracked) live objects at one moment"""
+    elapsed_s: float
+    ticks: int
+    counts: Dict[str, int]
+
+
+@lru_cache(maxsize=None)
+def function_ranges(file_path: str) -> Tuple[Tuple[int, int, str], ...]:
+    """(first line, last line, qualified name) of every function in the file, inner functions after outer ones"""
+    source = "".join(linecache.getlines(file_path))
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return ()
+
+    ranges = []
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                if not isinstance(child, ast.ClassDef):
+                    ranges.append((child.lineno, child.end_lineno, name))
+                visit(child, prefix=f"{name}.")
+            else:
+                visit(child, prefix=prefix)
+
+    visit(tree, prefix="")
+    return tuple(ranges)
+
+
+def function_at(file_path: str, line: int) -> str:
+    function = "<module>"
+    for first, last, name in function_ranges(file_path):
+        if first <= line <= last:
+            function = name  # Keeps going, an inner function is more specific
+    return function
+
+
+def module_of(file_path: str) -> str:
+    """Module path relative to the working directory (the repo root), the file name for anything outside of it"""
+    if file_path.startswith("<"):  # E.g. <frozen importlib._bootstrap>
+        return file_path
+    relative_path = os.path.relpath(file_path)
+    if relative_path.startswith(".."):
+        return os.path.basename(file_path)
+    return os.path.splitext(relative_path)[0].replace(os.sep, ".")
+
+
+class AllocationProfiler:
+    """
+    tick() is to be called once per tick of the loop that is profiled. Every snapshot interval it compares a
+    tracemalloc snapshot against the previous one, the growth is attributed to the functions (of the allocating
+    frame) and divided by the ticks in between. The growth in blocks is what drives the generation 0 collections.
+    The live objects are counted per type at the same moments. The GC collections are timed through gc.callbacks,
+    of whichever thread triggers them.
+    """
+
+    def __init__(self, snapshot_interval_s: float = 30.0, nr_sites: int = 25, nr_types: int = 25):
+        self.snapshot_interval_s = snapshot_interval_s
+        self.nr_sites = nr_sites
+        self.nr_types = nr_types
+
+        self.ticks = 0
+        self.started_at = 0.0
+        self.sites: Dict[Tuple[str, str], List[float]] = {}  # (module, function) -> [bytes, blocks] summed
+        self.object_counts: List[ObjectCountSample] = []
+        self.gc_pauses: Dict[int, StageTiming] = {}
+        self.gc_collected: Counter = Counter()
+        self.gc_uncollectable: Counter = Counter()
+
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_ticks = 0
+        self._sampled_ticks = 0  # Ticks covered by the snapshot comparisons
+        self._next_sample_at = 0.0
+        self._gc_started_at: Optional[float] = None
+
+    def start(self) -> None:
+        tracemalloc.start()
+        gc.callbacks.append(self._on_gc)
+        self.started_at = perf_counter()
+        self._take_sample()
+
+    def stop(self) -> None:
+        """Takes a final sample, such that the ticks since the last one are covered too"""
+        if not tracemalloc.is_tracing():
+            return
+        self._take_sample()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        tracemalloc.stop()
+        self._snapshot = None
+
+    def tick(self) -> None:
+        self.ticks += 1
+        if perf_counter() >= self._next_sample_at:
+            self._take_sample()
+
+    def _take_sample(self) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                # The attribution of the sites to their functions reads and parses their source files
+                tracemalloc.Filter(False, linecache.__file__),
+                tracemalloc.Filter(False, ast.__file__)))
+        if self._snapshot and self.ticks > self._snapshot_ticks:
+            for stat in snapshot.compare_to(self._snapshot, key_type="lineno"):
+                frame = stat.traceback[0]
+                site = self.sites.setdefault((module_of(frame.filename), function_at(frame.filename, frame.lineno)),
+                                             [0.0, 0.0])
+                site[0] += stat.size_diff
+                site[1] += stat.count_diff
+            self._sampled_ticks += self.ticks - self._snapshot_ticks
+        self._snapshot = snapshot
+        self._snapshot_ticks = self.ticks
+
+        counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+        self.object_counts.append(ObjectCountSample(elapsed_s=perf_counter() - self.started_at, ticks=self.ticks,
+                                                    counts=dict(counts.most_common(self.nr_types))))
+        self._next_sample_at = perf_counter() + self.snapshot_interval_s
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._gc_started_at = perf_counter()
+            return
+        if self._gc_started_at is None:  # Registered in the middle of a collection
+            return
+
+        generation = info["generation"]
+        pauses = self.gc_pauses.get(generation)
+        if pauses is None:
+            pauses = self.gc_pauses[generation] = StageTiming()
+        pauses.record(perf_counter() - self._gc_started_at)
+        self.gc_collected[generation] += info["collected"]
+        self.gc_uncollectable[generation] += info["uncollectable"]
+        self._gc_started_at = None
+
+    def allocation_sites(self) -> List[AllocationSite]:
+        """The functions that allocated the most per tick (and kept it until the next sample) first"""
+        ticks = max(self._sampled_ticks, 1)
+        sites = [AllocationSite(module=module, function=function, kib_per_tick=size / 1024 / ticks,
+                                blocks_per_tick=count / ticks)
+                 for (module, function), (size, count) in self.sites.items()]
+        return sorted(sites, key=lambda site: abs(site.blocks_per_tick), reverse=True)[:self.nr_sites]
+
+    def gc_summaries(self) -> List[GCSummary]:
+        return [GCSummary(generation=generation,
+                          collections=pauses.count,
+                          collected=self.gc_collected[generation],
+                          uncollectable=self.gc_uncollectable[generation],
+                          p50_ms=pauses.percentile_s(50) * 1000,
+                          p99_ms=pauses.percentile_s(99) * 1000,
+                          max_ms=pauses.max_s * 1000,
+                          total_ms=pauses.mean_s * pauses.count * 1000)
+                for generation, pauses in sorted(self.gc_pauses.items())]
+
+    def format_table(self) -> str:
+        lines = [f"{'gen':<6}{'n':>8}{'p50':>8}{'p99':>8}{'max':>8}{'total':>10}"]
+        for s in self.gc_summaries():
+            lines.append(f"{s.generation:<6}{s.collections:>8}{s.p50_ms:>8.2f}{s.p99_ms:>8.2f}{s.max_ms:>8.2f}"
+                         f"{s.total_ms:>10.1f}")
+        lines.append(f"{'allocation site':<60}{'KiB/tick':>10}{'blocks/tick':>12}")
+        for site in self.allocation_sites():
+            name = f"{site.module}:{site.function}"
+            lines.append(f"{name[-59:]:<60}{site.kib_per_tick:>10.3f}{site.blocks_per_tick:>12.2f}")
+        return "\n".join(lines)
+
+    def export(self, file_path: str = DEFAULT_ALLOCATION_REPORT_FILE) -> None:
+        """Writes the report as json, pause durations in ms"""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"duration_s": perf_counter() - self.started_at,
+                       "ticks": self.ticks,
+                       "gc": [asdict(summary) for summary in self.gc_summaries()],
+                       "allocation_sites": [asdict(site) for site in self.allocation_sites()],
+                       "object_counts": [asdict(sample) for sample in self.object_counts]}, file, indent=2)
+        logging.info("Allocation profile written to %s", file_path)
@@ -0,0 +1,134 @@
+"""Built-in instrumentation of the time spent per stage of a frame (telemetry update, overlay updates, ...)"""
+import bisect
+import json
+import logging
+import math
+import os
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Dict, Iterator, List
+
+DEFAULT_FRAME_TIMINGS_FILE = "logs/frame_timings.json"
+
+# Log spaced bucket edges from 1 us up to 10 s, the resolution of the percentiles is about 12%
+BUCKETS_PER_DECADE = 20
+BUCKET_EDGES_S = [10 ** (-6 + i / BUCKETS_PER_DECADE) for i in range(7 * BUCKETS_PER_DECADE + 1)]
+
+
+@dataclass
+class StageSummary:
+    """Statistics of a single stage, all durations in ms"""
+    stage: str
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    jitter_ms: float  # Standard deviation of the durations
+
+
+class StageTiming:
+    """Histogram of the durations of a single stage, recording is O(log nr_buckets) and never allocates"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_EDGES_S) + 1)  # The last bucket holds everything beyond the last edge
+        self.count = 0
+        self.max_s = 0.0
+        self._mean_s = 0.0
+        self._m2 = 0.0  # Sum of squared differences from the mean (Welford)
+
+    def record(self, duration_s: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_EDGES_S, duration_s)] += 1
+        self.count += 1
+        self.max_s = max(self.max_s, duration_s)
+
+        delta = duration_s - self._mean_s
+        self._mean_s += delta / self.count
+        self._m2 += delta * (duration_s - self._mean_s)
+
+    @property
+    def mean_s(self) -> float:
+        return self._mean_s
+
+    @property
+    def jitter_s(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def percentile_s(self, percentile: float) -> float:
+        """Interpolates (linearly) inside the bucket that holds the percentile, capped at the max seen"""
+        if not self.count:
+            return 0.0
+
+        rank = percentile / 100 * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = BUCKET_EDGES_S[bucket - 1] if bucket > 0 else 0.0
+                upper = BUCKET_EDGES_S[bucket] if bucket < len(BUCKET_EDGES_S) else self.max_s
+                return min(lower + (upper - lower) * (rank - cumulative) / count, self.max_s)
+            cumulative += count
+        return self.max_s
+
+    def summary(self, stage: str) -> StageSummary:
+        return StageSummary(stage=stage,
+                            count=self.count,
+                            mean_ms=self.mean_s * 1000,
+                            p50_ms=self.percentile_s(50) * 1000,
+                            p95_ms=self.percentile_s(95) * 1000,
+                            p99_ms=self.percentile_s(99) * 1000,
+                            max_ms=self.max_s * 1000,
+                            jitter_ms=self.jitter_s * 1000)
+
+
+class FrameTimings:
+    """
+    Collects a StageTiming per named stage. Stages are recorded from both the telemetry thread and the UI thread,
+    which is fine as long as each stage is only recorded from a single thread.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageTiming] = {}
+        self.started_at = perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage=stage, duration_s=perf_counter() - start)
+
+    def record(self, stage: str, duration_s: float) -> None:
+        stage_timing = self.stages.get(stage)
+        if stage_timing is None:
+            stage_timing = self.stages[stage] = StageTiming()
+        stage_timing.record(duration_s)
+
+    def reset(self) -> None:
+        self.stages = {}
+        self.started_at = perf_counter()
+
+    def summaries(self) -> List[StageSummary]:
+        """Sorted on p99, such that the stage that blows the frame budget comes first"""
+        summaries = [timing.summary(stage) for stage, timing in list(self.stages.items())]
+        return sorted(summaries, key=lambda s: s.p99_ms, reverse=True)
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<36}{'n':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'jit':>8}"]
+        for s in self.summaries():
+            lines.append(f"{s.stage[:35]:<36}{s.count:>8}{s.p50_ms:>8.2f}{s.p95_ms:>8.2f}{s.p99_ms:>8.2f}"
+                         f"{s.max_ms:>8.2f}{s.jitter_ms:>8.2f}")
+        return "\n".join(lines)
+
+    def export(self, file_path: str = DEFAULT_FRAME_TIMINGS_FILE) -> None:
+        """Writes the summaries as json, durations in ms"""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"duration_s": perf_counter() - self.started_at,
+                       "stages": [asdict(summary) for summary in self.summaries()]}, file, indent=2)
+        logging.info("Frame timings written to %s", file_path)
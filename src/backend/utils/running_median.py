@@ -0,0 +1,44 @@
+"""Median of a stream of values, kept up to date per added value instead of sorting the full list on every read"""
+import heapq
+import statistics
+from typing import Iterable, List
+
+
+class RunningMedian:
+    """
+    Two heaps holding the lower and the upper half of the values: adding is O(log n), reading the median O(1).
+    Gives the same result as statistics.median over the same values, which includes raising on no values.
+    """
+
+    def __init__(self, values: Iterable[float] = ()):
+        self._lower: List[float] = []  # Max heap, by storing the negated values
+        self._upper: List[float] = []  # Min heap
+        for value in values:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return len(self._lower) + len(self._upper)
+
+    def add(self, value: float) -> None:
+        if self._lower and value > -self._lower[0]:
+            heapq.heappush(self._upper, value)
+        else:
+            heapq.heappush(self._lower, -value)
+
+        # The lower half holds the middle value in case of an odd number of values
+        if len(self._lower) > len(self._upper) + 1:
+            heapq.heappush(self._upper, -heapq.heappop(self._lower))
+        elif len(self._upper) > len(self._lower):
+            heapq.heappush(self._lower, -heapq.heappop(self._upper))
+
+    def clear(self) -> None:
+        self._lower.clear()
+        self._upper.clear()
+
+    @property
+    def median(self) -> float:
+        if not self._lower:
+            raise statistics.StatisticsError("no median for empty data")
+        if len(self._lower) > len(self._upper):
+            return -self._lower[0]
+        return (-self._lower[0] + self._upper[0]) / 2
@@ -1,23 +1,42 @@
+import logging
 import tkinter
-from time import sleep, time
-from typing import List
+from typing import List, Optional
 
-from src.backend.iRacing.telemetry import RITelemetry
+from src.backend.iRacing.overlay_telemetry import UpdateTrigger
+from src.backend.iRacing.telemetry import RITelemetry, TelemetrySnapshot
+from src.backend.utils.allocation_profiling import AllocationProfiler
+from src.backend.utils.frame_timing import FrameTimings
+from src.client_app.scheduler import TkScheduler
+from src.client_app.telemetry_worker import DISCONNECTED_POLL_INTERVAL_S, TelemetryWorker
 from src.frontend.user_interface import UserInterface
-from src.frontend.utils.ri_event_handler import RIEventTypes, subscribe
+from src.frontend.utils.ri_event_handler import RIEventTypes, dispatch_events, subscribe
 from src.startup.my_configuration import CompleteConfig
 
 
 class ClientApp:
+    """
+    Runs the app on the Tk mainloop. Instead of polling everything in a loop, the telemetry handoff,
+    each overlay and the check for open windows are scheduled at their own rate, the app sleeps in between.
+    """
+    sample_rate = 60  # Hz, the tick rate of the sim
+    window_check_interval_s = 0.25
+
     def __init__(self, root: tkinter.Tk, telemetry: RITelemetry, user_interface: UserInterface,
-                 configuration: CompleteConfig):
+                 configuration: CompleteConfig, timings: Optional[FrameTimings] = None,
+                 profiler: Optional[AllocationProfiler] = None):
         self.configuration = configuration
         self.root = root
         self.telemetry = telemetry
         self.user_interface = user_interface
-        self.max_frames = 545
-        self.desired_time = 1 / self.max_frames
         self._running = True
+        self.timings = timings
+        self.scheduler = TkScheduler(root=root, timings=timings)
+        self.profiler = profiler  # Only a diagnostic mode, a tick is a telemetry handoff to the UI
+        self._previous_snapshot: Optional[TelemetrySnapshot] = None  # To detect the triggers of the overlays
+
+        # Without the worker, the telemetry is updated in between the UI updates on this thread
+        self.telemetry_worker = TelemetryWorker(telemetry=telemetry, sample_rate=self.sample_rate) \
+            if configuration.threaded_telemetry else None
 
         self.user_interface.update()  # Update UI once to see if any windows are opened
         if not self.windows_open:
@@ -29,21 +48,86 @@ class ClientApp:
         subscribe(event_type=RIEventTypes.CLOSE_APP, fn=self.close_app)
 
     def run(self):
-        current_frame = 0
-        while self._running:
-            start = time()
+        if self.telemetry_worker:
+            self.telemetry_worker.start()
+
+        # The events of the user inputs since the previous frame, before anything is redrawn
+        self.scheduler.add(name="ri_event_handler.dispatch_events", fn=dispatch_events,
+                           interval_s=lambda: 1 / self.sample_rate)
+        self.scheduler.add(name="ClientApp.update_telemetry", fn=self.update_telemetry,
+                           interval_s=self.telemetry_interval_s)
+        # Each overlay at the interval of its update policy, the other triggers are handled in update_telemetry
+        for overlay in self.user_interface.overlays_container.overlays:
+            self.scheduler.add(name=self.overlay_job_name(overlay), fn=overlay.update,
+                               interval_s=lambda o=overlay: o.update_policy.interval_s(1 / self.sample_rate))
+        self.scheduler.add(name="ClientApp.check_close", fn=self.check_close,
+                           interval_s=lambda: self.window_check_interval_s)
+
+        if self.profiler:
+            self.profiler.start()
+
+        try:
+            if self._running:
+                self.root.mainloop()
+            self.scheduler.raise_if_failed()
+        finally:
+            self.scheduler.cancel_all()
+            if self.telemetry_worker:
+                self.telemetry_worker.stop()
+            if self.timings:
+                logging.info("Frame timings (ms):\n%s", self.timings.format_table())
+                self.timings.export()
+            if self.profiler:
+                self.profiler.stop()
+                logging.info("Allocation profile:\n%s", self.profiler.format_table())
+                self.profiler.export()
+
+    def telemetry_interval_s(self) -> float:
+        # Without the worker, the freeze in the update waits for the data valid event of the sim on this thread
+        if not self.telemetry_worker and not self.telemetry.ir_state.ir_connected:
+            return DISCONNECTED_POLL_INTERVAL_S
+        return 1 / self.sample_rate
+
+    def check_close(self):
+        if not self.windows_open:  # App should stop running when all windows are closed by user
+            self.close_app()
+
+    def update_telemetry(self):
+        """Hands the newest telemetry snapshot to the UI, the overlays keep the previous one when nothing is new"""
+        if self.telemetry_worker:
+            self.telemetry_worker.raise_if_failed()
+            snapshot = self.telemetry_worker.slot.take()
+        else:
             self.telemetry.update()
-            # telemetry_time = time() - start
-            self.user_interface.update()
-            # ui_time = time() - start + telemetry_time
-            process_time = time() - start
-            sleep_time = max(self.desired_time - process_time, 0)
-            sleep(sleep_time)  # Cap frame rate
-            # actual_time = time() - start
-            # print(f"FPS: {int(1 / actual_time)}, telemetry_time = {telemetry_time:.2f}, ui_time = {ui_time:.2f}")
-
-            if not self.windows_open:  # App should stop running when all windows are closed by user
-                self.close_app()
+            snapshot = self.telemetry.snapshot()
+
+        if snapshot:
+            self.user_interface.set_telemetry(snapshot)
+            self.run_triggered_overlays(snapshot=snapshot)
+        if self.profiler:
+            self.profiler.tick()
+
+    @staticmethod
+    def overlay_job_name(overlay) -> str:
+        return f"{type(overlay).__name__}.update"
+
+    def run_triggered_overlays(self, snapshot: TelemetrySnapshot) -> None:
+        """Updates the overlays right away on a new lap or new session info, when their update policy asks for it"""
+        previous, self._previous_snapshot = self._previous_snapshot, snapshot
+        if previous is None:
+            return
+
+        triggered = UpdateTrigger(0)
+        if snapshot.lap != previous.lap:
+            triggered |= UpdateTrigger.NEW_LAP
+        if snapshot.session_info_update != previous.session_info_update:
+            triggered |= UpdateTrigger.SESSION_INFO
+        if not triggered:
+            return
+
+        for overlay in self.user_interface.overlays_container.overlays:
+            if overlay.update_policy.triggers & triggered:
+                self.scheduler.run_now(name=self.overlay_job_name(overlay))
 
     @property
     def windows_open(self) -> bool:
@@ -67,3 +151,4 @@ class ClientApp:
     def close_app(self, event_data=None):
         """Called when all windows are closed or when main screen is manually closed"""
         self._running = False
+        self.root.quit()  # Returns from the mainloop in run()
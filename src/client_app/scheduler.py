@@ -0,0 +1,96 @@
+"""Periodic jobs on the Tk event loop, such that the app only wakes up when something is due"""
+import logging
+import tkinter
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+from src.backend.utils.frame_timing import FrameTimings
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    fn: Callable[[], None]
+    # Read on every run, such that the rate can be changed while running. None to wait for run_now()
+    interval_s: Callable[[], Optional[float]]
+    due: float = 0.0  # perf_counter() at which the job should run next
+    after_id: Optional[str] = None
+
+
+class TkScheduler:
+    """
+    Runs each job at its own interval through Tk after() calls, the Tk mainloop sleeps in between.
+    The next run is planned relative to when the previous one was due (not when it finished) to avoid drift,
+    a job that fell behind is not caught up but simply runs as soon as possible.
+
+    A job can also be run right away with run_now(), e.g. on a trigger, after which it continues at its interval.
+
+    Tk only reports exceptions of after() callbacks, so the first exception stops the mainloop instead
+    and is re-raised by raise_if_failed().
+
+    With timings, the duration of each job is recorded as a stage of the job's name. The time the mainloop
+    spends on everything else (redrawing, input) shows up as the lateness of the jobs.
+    """
+
+    def __init__(self, root: tkinter.Tk, timings: Optional[FrameTimings] = None):
+        self.root = root
+        self.timings = timings
+        self.jobs: Dict[str, PeriodicJob] = {}
+        self._exception: Optional[BaseException] = None
+
+    def add(self, name: str, fn: Callable[[], None], interval_s: Callable[[], Optional[float]]) -> None:
+        """Adds the job and runs it right away, a job with the same name is replaced"""
+        self.cancel(name=name)
+        job = PeriodicJob(name=name, fn=fn, interval_s=interval_s, due=perf_counter())
+        self.jobs[name] = job
+        job.after_id = self.root.after_idle(self._run, job)
+
+    def run_now(self, name: str) -> None:
+        """Runs the job as soon as the mainloop is idle, instead of when it is due"""
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        if job.after_id:
+            self.root.after_cancel(job.after_id)
+        job.due = perf_counter()
+        job.after_id = self.root.after_idle(self._run, job)
+
+    def cancel(self, name: str) -> None:
+        job = self.jobs.pop(name, None)
+        if job and job.after_id:
+            self.root.after_cancel(job.after_id)
+
+    def cancel_all(self) -> None:
+        for name in list(self.jobs):
+            self.cancel(name=name)
+
+    def raise_if_failed(self) -> None:
+        if self._exception:
+            raise self._exception
+
+    def _run(self, job: PeriodicJob) -> None:
+        if self.jobs.get(job.name) is not job:  # Cancelled while already queued
+            return
+
+        start = perf_counter()
+        try:
+            job.fn()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Scheduled job '%s' failed, stopping", job.name)
+            self._exception = e
+            self.root.quit()
+            return
+        if self.jobs.get(job.name) is not job:  # Cancelled by the job itself
+            return
+
+        now = perf_counter()
+        if self.timings:
+            self.timings.record(stage=job.name, duration_s=now - start)
+            self.timings.record(stage=f"{job.name} lateness", duration_s=max(start - job.due, 0.0))
+        interval_s = job.interval_s()
+        if interval_s is None:  # Until run_now()
+            job.after_id = None
+            return
+        job.due = max(job.due + interval_s, now)
+        job.after_id = self.root.after(max(int((job.due - now) * 1000), 1), self._run, job)
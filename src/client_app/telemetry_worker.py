@@ -0,0 +1,121 @@
+"""Samples the telemetry on its own thread, such that the sampling is not stalled by the rendering (and vice versa)"""
+import logging
+import threading
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Optional
+
+from src.backend.iRacing.telemetry import RITelemetry, TelemetrySnapshot
+
+# While disconnected every update polls the sim status, so there is no need to do that at the sample rate
+DISCONNECTED_POLL_INTERVAL_S = 1.0
+
+
+@dataclass
+class HandoffStats:
+    """Counters of the handoff from the telemetry thread to the UI"""
+    frames_taken: int = 0
+    frames_dropped: int = 0  # Snapshots that were replaced by a newer one before the UI took them
+    latency_total_s: float = 0.0  # Summed time between taking a snapshot and the UI taking it
+    latency_max_s: float = 0.0
+
+    @property
+    def latency_mean_s(self) -> float:
+        return self.latency_total_s / self.frames_taken if self.frames_taken else 0.0
+
+    def __str__(self) -> str:
+        return f"taken: {self.frames_taken}, dropped: {self.frames_dropped}, " \
+               f"latency mean: {self.latency_mean_s * 1000:.2f} ms, max: {self.latency_max_s * 1000:.2f} ms"
+
+
+class LatestValueSlot:
+    """
+    Single producer, single consumer handoff that only holds the newest snapshot.
+    Publishing is a single reference assignment, which is atomic in CPython, so neither side ever blocks.
+    The consumer recognizes new (and missed) snapshots by their sequence number.
+    """
+
+    def __init__(self):
+        self._latest: Optional[TelemetrySnapshot] = None
+        self._last_taken_sequence = 0
+        self.stats = HandoffStats()
+
+    def publish(self, snapshot: TelemetrySnapshot) -> None:
+        """Producer side, replaces any snapshot that was not taken yet"""
+        self._latest = snapshot
+
+    def take(self) -> Optional[TelemetrySnapshot]:
+        """Consumer side, returns the newest snapshot or None when there is nothing new since the last take"""
+        snapshot = self._latest
+        if snapshot is None or snapshot.sequence == self._last_taken_sequence:
+            return None
+
+        self.stats.frames_dropped += max(snapshot.sequence - self._last_taken_sequence - 1, 0)
+        self._last_taken_sequence = snapshot.sequence
+
+        latency = perf_counter() - snapshot.sampled_at
+        self.stats.frames_taken += 1
+        self.stats.latency_total_s += latency
+        self.stats.latency_max_s = max(self.stats.latency_max_s, latency)
+        return snapshot
+
+
+class TelemetryWorker:
+    """
+    Updates the telemetry at (at most) the sim tick rate and publishes a snapshot after every update.
+    When connected, the sim's data valid event (waited on by the freeze) paces the loop.
+    Only when the update returned without waiting for it (e.g. a replay) the loop is capped at the sample rate,
+    sleeping on top of the event wait could make the loop miss every other tick.
+    While disconnected, the sim is polled every DISCONNECTED_POLL_INTERVAL_S.
+
+    NOTE: Only the worker thread may touch the RITelemetry once started, the UI reads the snapshots only.
+    """
+
+    def __init__(self, telemetry: RITelemetry, sample_rate: int = 60):
+        self.telemetry = telemetry
+        self.sample_period = 1 / sample_rate
+        self.slot = LatestValueSlot()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exception: Optional[BaseException] = None
+
+    @property
+    def stats(self) -> HandoffStats:
+        return self.slot.stats
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="TelemetryWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logging.warning("Telemetry worker did not stop within %s s", timeout)
+            self._thread = None
+        logging.info("Telemetry handoff: %s", self.stats)
+
+    def raise_if_failed(self) -> None:
+        """Re-raises an exception of the worker thread in the calling (main) thread"""
+        if self._exception:
+            raise self._exception
+
+    def next_update_delay(self, elapsed: float) -> float:
+        if not self.telemetry.ir_state.ir_connected:
+            return DISCONNECTED_POLL_INTERVAL_S
+        if elapsed < self.sample_period / 2:  # Did not wait for the data valid event
+            return self.sample_period - elapsed
+        return 0.0
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                start = perf_counter()
+                self.telemetry.update()
+                self.slot.publish(self.telemetry.snapshot())
+                self._stop.wait(self.next_update_delay(elapsed=perf_counter() - start))
+        except Exception as e:  # pylint: disable=broad-except
+            self._exception = e
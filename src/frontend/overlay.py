@@ -1,21 +1,20 @@
 import tkinter
 from abc import abstractmethod
+from typing import Optional
+
+from src.backend.iRacing.overlay_telemetry import UpdatePolicy
+from src.frontend.rendering import RenderBackend, TkRenderBackend
 
 
 class Overlay:
     """Super class for overlays"""
 
-    def __init__(self, root: tkinter.Tk):
+    def __init__(self, root: Optional[tkinter.Tk], backend: Optional[RenderBackend] = None):
         self.y = None
         self.x = None
-        self.overlay = tkinter.Toplevel(root)
-        self.overlay.wm_withdraw()  # Step 1 required for showing icon in taskbar
-        self.overlay.overrideredirect(True)
-        self.overlay.lift()  # Step 2 required for showing icon in taskbar
-        self.overlay.wm_attributes("-topmost", True)
-
-        self.overlay.wm_attributes('-transparentcolor', "RED")
-        self.overlay.iconbitmap("images/RacingInsights_Logo.ico")
+        # Creates the widgets, without a display (e.g. for benchmarks) a NullRenderBackend can be given instead
+        self.backend = backend if backend else TkRenderBackend()
+        self.overlay = self.backend.overlay_window(root)
         self.overlay.protocol("WM_DELETE_WINDOW", self._on_closing)
         self.overlay.bind("<ButtonPress-1>", self.start_move)
         self.overlay.bind("<ButtonRelease-1>", self.stop_move)
@@ -79,6 +78,16 @@ class Overlay:
     def locked(self) -> bool:
         ...
 
+    @property
+    @abstractmethod
+    def refresh_rate(self) -> int:
+        """Hz, how often update() should be called"""
+
+    @property
+    def update_policy(self) -> UpdatePolicy:
+        """When update() should be called, by default periodically at the refresh rate"""
+        return UpdatePolicy(rate_hz=max(self.refresh_rate, 1))
+
     @property
     @abstractmethod
     def offset_right(self) -> int:
@@ -0,0 +1,77 @@
+import tkinter
+from typing import Optional
+
+from src.backend.utils.frame_timing import FrameTimings
+from src.frontend.overlay import Overlay
+from src.frontend.rendering import RenderBackend
+from src.frontend.utils.RoundedBorder import RoundedBorder
+from src.startup.my_configuration import CompleteConfig
+
+
+class DebugOverlay(Overlay):
+    """Shows the frame timings per stage (in ms), the stage with the worst p99 on top"""
+    text_color = "#EAEAEA"
+
+    def set_offset_right(self, offset_right):
+        self.configuration.debug.offset_right = offset_right
+
+    def set_offset_down(self, offset_down):
+        self.configuration.debug.offset_down = offset_down
+
+    @property
+    def active(self) -> bool:
+        return self.configuration.debug.active
+
+    @property
+    def locked(self) -> bool:
+        return self.configuration.debug.locked
+
+    @property
+    def refresh_rate(self) -> int:
+        return self.configuration.debug.refresh_rate
+
+    @property
+    def offset_right(self) -> int:
+        return self.configuration.debug.offset_right
+
+    @property
+    def offset_down(self) -> int:
+        return self.configuration.debug.offset_down
+
+    @property
+    def font(self):
+        return f"TkFixedFont {self.configuration.debug.font_size}"
+
+    def _on_closing(self):
+        self.configuration.debug.active = False
+
+    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, timings: FrameTimings,
+                 backend: Optional[RenderBackend] = None):
+        super().__init__(root=root, backend=backend)
+        self.configuration = configuration
+        self.timings = timings
+
+        self.overlay.title("Frame timings")
+        self.overlay.geometry(f"+{self.offset_right}+{self.offset_down}")
+        self.overlay.attributes('-alpha', self.configuration.debug.transparency)
+        self.set_correct_visibility()
+
+        self.table_frame = RoundedBorder(master=self.overlay, bg=self.configuration.bg, backend=self.backend)
+        self.table_variable = self.backend.string_var()
+        self.table = self.backend.label(master=self.table_frame.frame,
+                                        textvariable=self.table_variable,
+                                        font=self.font,
+                                        fg=self.text_color,
+                                        bg=self.configuration.bg,
+                                        justify='left',
+                                        padx=self.configuration.debug.text_padding,
+                                        pady=self.configuration.debug.text_padding
+                                        )
+        self.table.pack(expand=1, anchor='nw', fill='both')
+
+    def update(self) -> None:
+        self.set_correct_visibility()
+        if not self.active:
+            return
+
+        self.table_variable.set(self.timings.format_table())
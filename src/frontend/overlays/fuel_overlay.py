@@ -1,7 +1,10 @@
 import tkinter
+from typing import Optional
 
-from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelTelemetry
+from src.backend.iRacing.overlay_telemetries.fuel_telemetry import FuelSnapshot
+from src.backend.iRacing.overlay_telemetry import UpdatePolicy, UpdateTrigger
 from src.frontend.overlay import Overlay
+from src.frontend.rendering import RenderBackend
 from src.frontend.utils.RoundedBorder import RoundedBorder
 from src.frontend.utils.ri_event_handler import RIEventTypes, subscribe
 from src.startup.my_configuration import CompleteConfig
@@ -12,15 +15,16 @@ class FuelColumn:
     value_color = "#EAEAEA"
 
     def __init__(self, master: tkinter.Frame, configuration: CompleteConfig, header_name: str,
-                 telemetry_ref):
+                 telemetry_name: str, backend: RenderBackend):
         self.master = master
         self.configuration = configuration
-        self.telemetry_reference = telemetry_ref
+        self.telemetry_name = telemetry_name  # Name of the FuelSnapshot field that is shown in this column
         self.state = False
+        self.text: Optional[str] = None  # Currently shown value, the variable is only set when it changes
 
-        self.frame = tkinter.Frame(master=self.master, bg=self.configuration.bg)
+        self.frame = backend.frame(master=self.master, bg=self.configuration.bg)
 
-        self.header = tkinter.Label(master=self.frame,
+        self.header = backend.label(master=self.frame,
                                     text=header_name,
                                     font=self.font,
                                     fg=self.header_color,
@@ -29,9 +33,9 @@ class FuelColumn:
                                     pady=self.y_padding
                                     )
 
-        self.value_variable = tkinter.StringVar()
+        self.value_variable = backend.string_var()
 
-        self.value = tkinter.Label(master=self.frame,
+        self.value = backend.label(master=self.frame,
                                    textvariable=self.value_variable,
                                    font=self.font,
                                    fg=self.value_color,
@@ -54,12 +58,15 @@ class FuelColumn:
     def y_padding(self):
         return self.configuration.fuel.text_padding
 
-    def update(self, desired_state: bool):
+    def update(self, desired_state: bool, telemetry: FuelSnapshot):
         # Activation
         self.set_correct_activation_state(desired_state)
 
         # Telemetry values update
-        self.value_variable.set("{:.2f}".format(self.telemetry_reference.value))
+        text = "{:.2f}".format(getattr(telemetry, self.telemetry_name))
+        if text != self.text:
+            self.value_variable.set(text)
+            self.text = text
 
     def set_correct_activation_state(self, desired_state: bool):
         """Sets the activation state to match what is desired (based on configuration)"""
@@ -72,11 +79,10 @@ class FuelColumn:
     def update_visual_configuration(self):
         """Assumes that any updates from outside to the configuration are visible here. Configures accordingly.
         Called by overlay when overlay receives event"""
-        for widget in self.frame.winfo_children():
-            if isinstance(widget, tkinter.Label):
-                widget.configure(font=self.font,
-                                 padx=self.x_padding,
-                                 pady=self.y_padding)
+        for widget in (self.header, self.value):
+            widget.configure(font=self.font,
+                             padx=self.x_padding,
+                             pady=self.y_padding)
 
     def disable(self):
         """Disables the specific column"""
@@ -120,6 +126,15 @@ class FuelOverlay(Overlay):
         """
         return self.configuration.fuel.locked
 
+    @property
+    def refresh_rate(self) -> int:
+        return self.configuration.fuel.refresh_rate
+
+    @property
+    def update_policy(self) -> UpdatePolicy:
+        """The consumption values change once per lap, which should show right away instead of on the next refresh"""
+        return UpdatePolicy(triggers=UpdateTrigger.TICK | UpdateTrigger.NEW_LAP, rate_hz=max(self.refresh_rate, 1))
+
     @property
     def offset_right(self) -> int:
         return self.configuration.fuel.offset_right
@@ -135,8 +150,9 @@ class FuelOverlay(Overlay):
         """
         self.configuration.fuel.active = False  # Otherwise it will crash because it still thinks it's active
 
-    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, telemetry: FuelTelemetry):
-        super().__init__(root=root)
+    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, telemetry: FuelSnapshot,
+                 backend: Optional[RenderBackend] = None):
+        super().__init__(root=root, backend=backend)
         self.configuration = configuration
         self.telemetry = telemetry
         subscribe(event_type=RIEventTypes.FUEL_FEATURE_CHANGE, fn=self.update_feature_event_handler)
@@ -146,53 +162,68 @@ class FuelOverlay(Overlay):
         self.overlay.attributes('-alpha', self.configuration.fuel.transparency)
         self.set_correct_visibility()
 
-        self.table_frame = RoundedBorder(master=self.overlay, bg=self.configuration.bg)
+        self.table_frame = RoundedBorder(master=self.overlay, bg=self.configuration.bg, backend=self.backend)
 
         # All fuel columns
         self.fuel_live_col = FuelColumn(master=self.table_frame.frame,
                                         configuration=self.configuration,
                                         header_name="Fuel",
-                                        telemetry_ref=self.telemetry.fuel
+                                        telemetry_name="fuel",
+                                        backend=self.backend
                                         )
 
         self.last_consumption_col = FuelColumn(master=self.table_frame.frame,
                                                configuration=self.configuration,
                                                header_name="Last",
-                                               telemetry_ref=self.telemetry.last_consumption
+                                               telemetry_name="last_consumption",
+                                               backend=self.backend
                                                )
 
         self.avg_cons_col = FuelColumn(master=self.table_frame.frame,
                                        configuration=self.configuration,
                                        header_name="Avg",
-                                       telemetry_ref=self.telemetry.average_consumption
+                                       telemetry_name="average_consumption",
+                                       backend=self.backend
                                        )
 
         self.target_cons_col = FuelColumn(master=self.table_frame.frame,
                                           configuration=self.configuration,
                                           header_name="Target",
-                                          telemetry_ref=self.telemetry.target_consumption_extra
+                                          telemetry_name="target_consumption_extra",
+                                          backend=self.backend
                                           )
 
         self.range_col = FuelColumn(master=self.table_frame.frame,
                                     configuration=self.configuration,
                                     header_name="Range",
-                                    telemetry_ref=self.telemetry.range_laps
+                                    telemetry_name="range_laps",
+                                    backend=self.backend
                                     )
 
         self.refuel_col = FuelColumn(master=self.table_frame.frame,
                                      configuration=self.configuration,
                                      header_name="Refuel",
-                                     telemetry_ref=self.telemetry.refuel_amount
+                                     telemetry_name="refuel_amount",
+                                     backend=self.backend
                                      )
 
+        self.refuel_own_pace_col = FuelColumn(master=self.table_frame.frame,
+                                              configuration=self.configuration,
+                                              header_name="Refuel*",
+                                              telemetry_name="refuel_amount_own_pace",
+                                              backend=self.backend
+                                              )
+
         self.target_cons_finish_col = FuelColumn(master=self.table_frame.frame,
                                                  configuration=self.configuration,
                                                  header_name="Finish",
-                                                 telemetry_ref=self.telemetry.target_consumption_finish
+                                                 telemetry_name="target_consumption_finish",
+                                                 backend=self.backend
                                                  )
 
     def update_feature_event_handler(self):
         """Called when an event is posted. Needs to be subscribed!"""
+        self.overlay.attributes('-alpha', self.configuration.fuel.transparency)
         all_fuel_columns = [
             (self.fuel_live_col, self.configuration.fuel.fuel_activated),
             (self.last_consumption_col, self.configuration.fuel.last_activated),
@@ -200,6 +231,7 @@ class FuelOverlay(Overlay):
             (self.target_cons_col, self.configuration.fuel.target_activated),
             (self.range_col, self.configuration.fuel.range_activated),
             (self.refuel_col, self.configuration.fuel.refuel_activated),
+            (self.refuel_own_pace_col, self.configuration.fuel.refuel_own_pace_activated),
             (self.target_cons_finish_col, self.configuration.fuel.finish_activated),
         ]
         for col in all_fuel_columns:
@@ -219,14 +251,17 @@ class FuelOverlay(Overlay):
             (self.target_cons_col, self.configuration.fuel.target_activated),
             (self.range_col, self.configuration.fuel.range_activated),
             (self.refuel_col, self.configuration.fuel.refuel_activated),
+            (self.refuel_own_pace_col, self.configuration.fuel.refuel_own_pace_activated),
             (self.target_cons_finish_col, self.configuration.fuel.finish_activated),
         ]
 
-        self.overlay.attributes('-alpha', self.configuration.fuel.transparency)
-
         activations = [item[1] for item in all_fuel_columns]
         if not any(activations):
             self.configuration.fuel.active = False
 
         for item in all_fuel_columns:
-            item[0].update(desired_state=item[1])
+            item[0].update(desired_state=item[1], telemetry=self.telemetry)
+
+    def set_telemetry(self, telemetry: FuelSnapshot) -> None:
+        """Sets the snapshot that is shown on the next update"""
+        self.telemetry = telemetry
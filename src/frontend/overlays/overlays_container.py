@@ -1,16 +1,40 @@
-from src.backend.iRacing.telemetry import RITelemetry
+from typing import List, Optional
+
+from src.backend.iRacing.telemetry import TelemetrySnapshot
+from src.backend.utils.frame_timing import FrameTimings
+from src.frontend.overlay import Overlay
+from src.frontend.overlays.debug_overlay import DebugOverlay
 from src.frontend.overlays.fuel_overlay import FuelOverlay
+from src.frontend.overlays.relative_canvas_overlay import RelativeCanvasOverlay
 from src.frontend.overlays.relative_overlay import RelativeOverlay
+from src.frontend.rendering import RenderBackend
 from src.startup.my_configuration import CompleteConfig
 
 
 class OverlaysContainer:
     """Container for all the overlay screens"""
 
-    def __init__(self, root, configuration: CompleteConfig, ri_telemetry: RITelemetry):
-        self.fuel_overlay = FuelOverlay(root, configuration, ri_telemetry.fuel_telemetry)
-        self.relative_overlay = RelativeOverlay(root, configuration, ri_telemetry.relative_telemetry)
+    def __init__(self, root, configuration: CompleteConfig, telemetry: TelemetrySnapshot,
+                 timings: Optional[FrameTimings] = None, backend: Optional[RenderBackend] = None):
+        self.fuel_overlay = FuelOverlay(root, configuration, telemetry.fuel, backend)
+        # The renderer is chosen on startup only
+        relative_overlay_type = RelativeCanvasOverlay if configuration.relative.canvas_renderer else RelativeOverlay
+        self.relative_overlay = relative_overlay_type(root, configuration, telemetry.relative, backend)
+        # Only available when the frame timings are measured
+        self.debug_overlay = DebugOverlay(root, configuration, timings, backend) if timings else None
+
+    @property
+    def overlays(self) -> List[Overlay]:
+        overlays = [self.fuel_overlay, self.relative_overlay]
+        if self.debug_overlay:
+            overlays.append(self.debug_overlay)
+        return overlays
+
+    def set_telemetry(self, telemetry: TelemetrySnapshot) -> None:
+        """Hands each overlay its part of the snapshot"""
+        self.fuel_overlay.set_telemetry(telemetry.fuel)
+        self.relative_overlay.set_telemetry(telemetry.relative)
 
     def update(self):
-        self.fuel_overlay.update()
-        self.relative_overlay.update()
+        for overlay in self.overlays:
+            overlay.update()
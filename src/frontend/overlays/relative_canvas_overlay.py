@@ -0,0 +1,189 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.backend.iRacing.overlay_telemetries.relative_telemetry import RelativeEntry
+from src.frontend.overlays.relative_overlay import RelativeOverlay, RelativeRowCells, get_row_cells, value_color
+from src.frontend.rendering import TRANSPARENT_COLOR
+from src.frontend.utils.RoundedBorder import RoundedBorder, get_rectangle_points
+from src.frontend.utils.badge_sprites import BadgeSpriteCache
+from src.startup.my_configuration import CompleteConfig
+
+TEXT_CELLS = ("position", "car_nr", "driver_name", "relative_time")
+BADGE_CELLS = ("license", "irating")
+
+
+class RelativeCanvasRow:
+    """
+    A row of the relative as items on the canvas of the RelativeCanvasOverlay, created once and only moved on a
+    change of the layout. Same interface as the RelativeRow, an update only changes the text, fill or image of the items
+    of the cells that changed.
+    """
+    badge_font_color = "BLACK"
+
+    def __init__(self, canvas: Any, index: int, configuration: CompleteConfig, sprites: BadgeSpriteCache):
+        self.canvas = canvas
+        self.configuration = configuration
+        self.sprites = sprites
+        self.telemetry: Optional[RelativeEntry] = None
+        self.rendered_telemetry: Optional[RelativeEntry] = None
+        self.tag = f"row{index}"
+        self.value_tag = f"row{index}.value"  # The text items in the value color, recolored with a single call
+
+        # What the items currently show, as created below
+        self.cells = RelativeRowCells(position="", car_nr="", driver_name="", license="", irating="", relative_time="",
+                                      value_color=value_color(entry=None),
+                                      license_fill=self.configuration.bg,
+                                      irating_fill=self.configuration.bg)
+
+        self.texts: Dict[str, int] = {}
+        for name in TEXT_CELLS:
+            self.texts[name] = self.canvas.create_text(0, 0, text="", fill=self.cells.value_color,
+                                                       anchor="e" if name == "relative_time" else "w",
+                                                       tags=("text", self.tag, self.value_tag))
+        self.badges: Dict[str, int] = {}
+        self.badge_texts: Dict[str, int] = {}
+        self.badge_size = (0, 0)  # Of the sprites, as set by the layout
+        self.badge_sprites: Dict[str, Any] = {}  # Kept as long as they are shown
+        for name in BADGE_CELLS:
+            self.badges[name] = self.canvas.create_image(0, 0, anchor="nw", tags=("badge", self.tag, name))
+            self.badge_texts[name] = self.canvas.create_text(0, 0, text="", fill=self.badge_font_color, anchor="center",
+                                                             tags=("badge_text", self.tag, name))
+
+    def set_telemetry(self, relative_entry: Optional[RelativeEntry]):
+        """Called from outside by the RelativeOverlay"""
+        self.telemetry = relative_entry
+
+    def update(self):
+        if self.telemetry and self.telemetry is self.rendered_telemetry:  # Entries are never mutated
+            return
+
+        cells = get_row_cells(entry=self.telemetry, configuration=self.configuration)
+        if cells != self.cells:
+            self.draw(cells=cells)
+            self.cells = cells
+
+        self.rendered_telemetry = self.telemetry
+
+    def draw(self, cells: RelativeRowCells):
+        if cells.value_color != self.cells.value_color:
+            self.canvas.itemconfigure(self.value_tag, fill=cells.value_color)
+        for name, item in self.texts.items():
+            text = getattr(cells, name)
+            if text != getattr(self.cells, name):
+                if name == "driver_name":  # Unlike a label of a fixed width, a text item does not clip
+                    text = text[:self.configuration.relative.driver_name_width]
+                self.canvas.itemconfigure(item, text=text)
+        for name in self.badges:
+            fill = getattr(cells, f"{name}_fill")
+            if fill != getattr(self.cells, f"{name}_fill"):
+                self.show_sprite(name=name, fill=fill)
+            text = getattr(cells, name)
+            if text != getattr(self.cells, name):
+                self.canvas.itemconfigure(self.badge_texts[name], text=text)
+
+    def place(self, columns: Dict[str, Tuple[float, float]], y: float, badge_size: Tuple[int, int], visible: bool):
+        """Moves the items into the columns (x and width per cell) of the row, with its middle at y"""
+        for name, item in self.texts.items():
+            x, width = columns[name]
+            self.canvas.coords(item, x + width if name == "relative_time" else x, y)
+            self.canvas.itemconfigure(item, state="normal" if visible else "hidden")
+
+        self.badge_size = badge_size
+        badge_width, badge_height = badge_size
+        for name, item in self.badges.items():
+            badge_visible = visible and name in columns
+            if badge_visible:
+                x, _ = columns[name]
+                self.canvas.coords(item, x, y - badge_height / 2)
+                self.canvas.coords(self.badge_texts[name], x + badge_width / 2, y)
+                self.show_sprite(name=name, fill=getattr(self.cells, f"{name}_fill"))
+            for badge_item in (item, self.badge_texts[name]):
+                self.canvas.itemconfigure(badge_item, state="normal" if badge_visible else "hidden")
+
+    def show_sprite(self, name: str, fill: str):
+        """An image swap, the sprite is only drawn on the first use of the fill and size"""
+        sprite = self.sprites.get(fill=fill, width=self.badge_size[0], height=self.badge_size[1])
+        if sprite is not self.badge_sprites.get(name):
+            self.canvas.itemconfigure(self.badges[name], image=sprite)
+            self.badge_sprites[name] = sprite
+
+
+class RelativeCanvasOverlay(RelativeOverlay):
+    """
+    Alternative renderer of the relative: the whole table is drawn on a single canvas instead of the frames, labels
+    and canvases of the RelativeRows. The text and badge image items of all rows are created up front, a tick only
+    changes the text and fill of items, without any geometry management.
+    Selected with the canvas_renderer setting of the relative configuration.
+    """
+    badge_reference_text = "111111"  # The badges fit this text, as the RoundedLabelFrame does
+
+    def create_table(self):
+        self.canvas = self.backend.canvas(master=self.overlay, bg=TRANSPARENT_COLOR, highlightthickness=0,
+                                          borderwidth=0)
+        self.canvas.pack()
+        self.border = self.canvas.create_polygon(0, 0, 0, 0, smooth=True, fill=self.configuration.bg)
+        self.initialized_rows = [RelativeCanvasRow(canvas=self.canvas, index=i, configuration=self.configuration,
+                                                   sprites=self.badge_sprites)
+                                 for i in range(self.MAX_DRIVERS)]
+
+    def populate_relative_rows(self):
+        self.relative_rows = self.initialized_rows[:self.nr_of_rows]
+        self.layout()
+
+    def reset_activations(self):
+        """Subscribed to the RELATIVE_FEATURE_CHANGE event, the font, paddings or the columns might have changed"""
+        if self.relative_rows:
+            self.layout()
+
+    @property
+    def font(self) -> str:
+        return f"{self.configuration.font.style} " \
+               f"{self.configuration.relative.font_size} " \
+               f"{self.configuration.font.extra}"
+
+    @property
+    def badge_font(self) -> str:
+        return f"TkFixedFont {self.configuration.relative.font_size} bold"
+
+    def get_columns(self, badge_width: int) -> Dict[str, Tuple[float, float]]:
+        """Start and width of the content of each shown cell, in the order of the RelativeRow"""
+        char_width, _ = self.backend.text_size(font=self.font, text="0")
+        padding_x = self.configuration.relative.text_padding_x
+        widths: List[Tuple[str, float]] = [("position", 2 * char_width),
+                                           ("car_nr", 2 * char_width),
+                                           ("driver_name", self.configuration.relative.driver_name_width * char_width)]
+        if self.configuration.relative.license_activated:
+            widths.append(("license", badge_width))
+        if self.configuration.relative.irating_activated:
+            widths.append(("irating", badge_width))
+        widths.append(("relative_time", 4 * char_width))
+
+        columns = {}
+        x = RoundedBorder.my_padding / 2
+        for name, width in widths:
+            columns[name] = (x + padding_x, width)
+            x += width + 2 * padding_x
+        return columns
+
+    def layout(self):
+        """Resizes the canvas to the table and moves every item into place, only on a change of the configuration"""
+        self.canvas.itemconfigure("text", font=self.font)
+        self.canvas.itemconfigure("badge_text", font=self.badge_font)
+
+        badge_size = self.backend.text_size(font=self.badge_font, text=self.badge_reference_text)
+        _, line_height = self.backend.text_size(font=self.font, text="0")
+        row_height = max(line_height, badge_size[1]) + 2 * self.configuration.relative.text_padding_y
+        columns = self.get_columns(badge_width=badge_size[0])
+
+        top = RoundedBorder.my_padding / 2
+        for i, row in enumerate(self.initialized_rows):
+            row.place(columns=columns, y=top + (i + 0.5) * row_height, badge_size=badge_size,
+                      visible=i < len(self.relative_rows))
+
+        last_x, last_width = columns["relative_time"]
+        width = int(last_x + last_width + self.configuration.relative.text_padding_x + RoundedBorder.my_padding / 2)
+        height = int(len(self.relative_rows) * row_height + RoundedBorder.my_padding)
+        width += width % 2
+        height += height % 2
+        self.canvas.configure(width=width, height=height)
+        self.canvas.coords(self.border, get_rectangle_points(x1=0, y1=0, width=width, height=height,
+                                                             feather=RoundedBorder.my_feather))
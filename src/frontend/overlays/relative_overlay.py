@@ -1,11 +1,16 @@
 import tkinter
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from src.backend.iRacing.overlay_telemetries.relative_telemetry import LappedState, RelativeEntry, RelativeTelemetry
+import numpy as np
+
+from src.backend.iRacing.overlay_telemetries.relative_telemetry import LappedState, RelativeEntry, RelativeSnapshot
 from src.frontend.overlay import Overlay
+from src.frontend.rendering import RenderBackend
 from src.frontend.utils.RoundedBorder import RoundedBorder
 from src.frontend.utils.RoundedLabelFrame import RoundedLabelFrame
+from src.frontend.utils.badge_sprites import BadgeSpriteCache
 from src.frontend.utils.ri_event_handler import RIEventTypes, subscribe
 from src.startup.my_configuration import CompleteConfig
 
@@ -20,37 +25,159 @@ class FontColors(Enum):
     WHITE = "#FFFFFF"
 
 
+@dataclass(frozen=True)
+class RelativeRowCells:
+    """Everything a RelativeRow shows, as derived from its RelativeEntry (or the lack of one)"""
+    position: str
+    car_nr: str
+    driver_name: str
+    license: str
+    irating: str
+    relative_time: str
+    value_color: str
+    license_fill: str
+    irating_fill: str
+
+
+def license_color(entry: Optional[RelativeEntry], bg: str) -> str:
+    if not entry:
+        return bg
+    match entry.license[0]:
+        case "P":
+            return "BLACK"
+        case "A":
+            return "BLUE"
+        case "B":
+            return "GREEN"
+        case "C":
+            return "YELLOW"
+        case "D":
+            return "ORANGE"
+        case "R":
+            return "RED"
+
+
+def irating_color(entry: Optional[RelativeEntry], bg: str) -> str:
+    if not entry:
+        return bg
+    ir = entry.irating
+    if ir < 500:
+        return "#430000"
+    if ir < 1000:
+        return "#820000"
+    if ir < 1500:
+        return "#BC0700"
+    if ir < 2000:
+        return "#FF3900"
+    if ir < 2500:
+        return "#FFBA00"
+    if ir < 3000:
+        return "#FFE100"
+    if ir < 4000:
+        return "#B8FF00"
+    if ir < 5000:
+        return "#18FF07"
+    if ir < 6000:
+        return "#00F7CF"
+    if ir < 7000:
+        return "#00ADFF"
+    if ir < 8000:
+        return "#005AF7"
+    if ir < 9000:
+        return "#0018EF"
+    if ir < 10000:
+        return "#3A07AC"
+    else:
+        return "#420063"
+
+
+def value_color(entry: Optional[RelativeEntry]) -> str:
+    if not entry:
+        return FontColors.WHITE.value
+    if entry.is_player:
+        return FontColors.GOLD.value
+    if entry.in_pits:
+        if entry.lapped_state == LappedState.BACKMARKER:
+            return FontColors.BLUE_DARK.value
+        if entry.lapped_state == LappedState.LAPPING:
+            return FontColors.RED_DARK.value
+        else:
+            return FontColors.GREY_DARK.value
+    if entry.lapped_state == LappedState.BACKMARKER:
+        return FontColors.BLUE.value
+    if entry.lapped_state == LappedState.LAPPING:
+        return FontColors.RED.value
+    return FontColors.WHITE.value
+
+
+def get_row_cells(entry: Optional[RelativeEntry], configuration: CompleteConfig) -> RelativeRowCells:
+    """What a row of the relative shows for the entry, whichever renderer draws it"""
+    if not entry:
+        return RelativeRowCells(position="", car_nr="", driver_name="", license="", irating="", relative_time="",
+                                value_color=value_color(entry=entry),
+                                license_fill=configuration.bg_color,
+                                irating_fill=configuration.bg_color)
+
+    return RelativeRowCells(position=str(entry.position),
+                            car_nr=str(entry.car_nr),
+                            driver_name=entry.driver_name,
+                            license=entry.license,
+                            irating=str(entry.irating),
+                            relative_time="{:.1f}".format(entry.relative_time),
+                            value_color=value_color(entry=entry),
+                            license_fill=license_color(entry=entry, bg=configuration.bg),
+                            irating_fill=irating_color(entry=entry, bg=configuration.bg))
+
+
 class RelativeRow:
-    """Class for the row instances that make up the relative"""
+    """
+    Class for the row instances that make up the relative.
+    Tcl calls are the main cost of the UI, so the row only touches the widgets of the cells that changed
+    compared to what it currently shows.
+    """
 
     def update(self):
-        # Configuration of the visual based on telemetry
-        self.update_visual_configuration()
+        if self.telemetry and self.telemetry is self.rendered_telemetry:  # Entries are never mutated
+            return
+
+        cells = self.get_cells()
+        if cells != self.cells:
+            # Configuration of the visual based on telemetry
+            self.update_visual_configuration(cells=cells)
 
-        # Show the new values representing the telemetry
-        self.update_string_vars()
+            # Show the new values representing the telemetry
+            self.update_string_vars(cells=cells)
+            self.cells = cells
 
-    def __init__(self, master: tkinter.Frame, configuration: CompleteConfig):
+        self.rendered_telemetry = self.telemetry
+
+    def __init__(self, master: tkinter.Frame, configuration: CompleteConfig, backend: RenderBackend,
+                 sprites: BadgeSpriteCache):
         # Elements: Position | Car nr | Driver name | *License | *irating | relative time
         self.master = master
         self.configuration = configuration
         self.telemetry: Optional[RelativeEntry] = None
         subscribe(event_type=RIEventTypes.RELATIVE_FEATURE_CHANGE, fn=self.update_event_handler)
 
-        self.frame = tkinter.Frame(master=self.master, bg=self.configuration.bg)
+        self.frame = backend.frame(master=self.master, bg=self.configuration.bg)
 
-        self.previous_value_color = FontColors.WHITE.value
+        # What the widgets currently show, as created below
+        self.cells = RelativeRowCells(position="", car_nr="", driver_name="", license="", irating="", relative_time="",
+                                      value_color=self.value_color,
+                                      license_fill=self.license_color,
+                                      irating_fill=self.irating_color)
+        self.rendered_telemetry: Optional[RelativeEntry] = None
 
-        self.position = tkinter.StringVar()
-        self.car_nr = tkinter.StringVar()
-        self.driver_name = tkinter.StringVar()
-        self.license = tkinter.StringVar()
-        self.irating = tkinter.StringVar()
-        self.relative_time = tkinter.StringVar()
+        self.position = backend.string_var()
+        self.car_nr = backend.string_var()
+        self.driver_name = backend.string_var()
+        self.license = backend.string_var()
+        self.irating = backend.string_var()
+        self.relative_time = backend.string_var()
 
-        self.pos_frame = tkinter.Frame(master=self.frame, bg=self.configuration.bg)
+        self.pos_frame = backend.frame(master=self.frame, bg=self.configuration.bg)
 
-        self.position_label = tkinter.Label(master=self.frame,
+        self.position_label = backend.label(master=self.frame,
                                             textvariable=self.position,
                                             font=self.font,
                                             fg=self.value_color,
@@ -60,7 +187,7 @@ class RelativeRow:
                                             width=2,
                                             )
 
-        self.car_nr_label = tkinter.Label(master=self.frame,
+        self.car_nr_label = backend.label(master=self.frame,
                                           textvariable=self.car_nr,
                                           font=self.font,
                                           fg=self.value_color,
@@ -70,7 +197,7 @@ class RelativeRow:
                                           width=2
                                           )
 
-        self.driver_name_label = tkinter.Label(master=self.frame,
+        self.driver_name_label = backend.label(master=self.frame,
                                                textvariable=self.driver_name,
                                                font=self.font,
                                                fg=self.value_color,
@@ -86,6 +213,8 @@ class RelativeRow:
                                                bg=self.configuration.bg,
                                                fill=self.license_color,
                                                padx=self.x_padding,
+                                               backend=backend,
+                                               sprites=sprites
                                                )
 
         self.irating_label = RoundedLabelFrame(master=self.frame,
@@ -95,9 +224,11 @@ class RelativeRow:
                                                bg=self.configuration.bg,
                                                fill=self.irating_color,
                                                padx=self.x_padding,
+                                               backend=backend,
+                                               sprites=sprites
                                                )
 
-        self.relative_time_label = tkinter.Label(master=self.frame,
+        self.relative_time_label = backend.label(master=self.frame,
                                                  textvariable=self.relative_time,
                                                  font=self.font,
                                                  fg=self.value_color,
@@ -116,74 +247,15 @@ class RelativeRow:
 
     @property
     def license_color(self) -> str:
-        if not self.telemetry:
-            return self.configuration.bg
-        match self.telemetry.license[0]:
-            case "P":
-                return "BLACK"
-            case "A":
-                return "BLUE"
-            case "B":
-                return "GREEN"
-            case "C":
-                return "YELLOW"
-            case "D":
-                return "ORANGE"
-            case "R":
-                return "RED"
+        return license_color(entry=self.telemetry, bg=self.configuration.bg)
 
     @property
     def irating_color(self) -> str:
-        if not self.telemetry:
-            return self.configuration.bg
-        ir = self.telemetry.irating
-        if ir < 500:
-            return "#430000"
-        if ir < 1000:
-            return "#820000"
-        if ir < 1500:
-            return "#BC0700"
-        if ir < 2000:
-            return "#FF3900"
-        if ir < 2500:
-            return "#FFBA00"
-        if ir < 3000:
-            return "#FFE100"
-        if ir < 4000:
-            return "#B8FF00"
-        if ir < 5000:
-            return "#18FF07"
-        if ir < 6000:
-            return "#00F7CF"
-        if ir < 7000:
-            return "#00ADFF"
-        if ir < 8000:
-            return "#005AF7"
-        if ir < 9000:
-            return "#0018EF"
-        if ir < 10000:
-            return "#3A07AC"
-        else:
-            return "#420063"
+        return irating_color(entry=self.telemetry, bg=self.configuration.bg)
 
     @property
     def value_color(self) -> str:
-        if not self.telemetry:
-            return FontColors.WHITE.value
-        if self.telemetry.is_player:
-            return FontColors.GOLD.value
-        if self.telemetry.in_pits:
-            if self.telemetry.lapped_state == LappedState.BACKMARKER:
-                return FontColors.BLUE_DARK.value
-            if self.telemetry.lapped_state == LappedState.LAPPING:
-                return FontColors.RED_DARK.value
-            else:
-                return FontColors.GREY_DARK.value
-        if self.telemetry.lapped_state == LappedState.BACKMARKER:
-            return FontColors.BLUE.value
-        if self.telemetry.lapped_state == LappedState.LAPPING:
-            return FontColors.RED.value
-        return FontColors.WHITE.value
+        return value_color(entry=self.telemetry)
 
     @property
     def font_size(self) -> int:
@@ -222,47 +294,38 @@ class RelativeRow:
             self.irating_label.pack(side='left')
         self.relative_time_label.pack(fill='both')
 
-    def update_visual_configuration(self):
-        new_color = self.value_color
-        if self.telemetry:
-            # No need to update all widgets if color is still same as previous
-            if not new_color == self.previous_value_color:
-                # To optimize, avoiding the winfo_children call, configure manually instead:
-                self.position_label.configure(fg=new_color)
-                self.car_nr_label.configure(fg=new_color)
-                self.driver_name_label.configure(fg=new_color)
-                self.relative_time_label.configure(fg=new_color)
-
-            # Experimental
-            self.irating_label.fill = self.irating_color
-            self.irating_label.change_rounded_rectangle_color()
-            self.license_label.fill = self.license_color
-            self.license_label.change_rounded_rectangle_color()
+    def get_cells(self) -> RelativeRowCells:
+        return get_row_cells(entry=self.telemetry, configuration=self.configuration)
 
-        else:
-            self.irating_label.fill = self.configuration.bg_color
+    def update_visual_configuration(self, cells: RelativeRowCells):
+        # No need to update all widgets if color is still same as previous
+        if cells.value_color != self.cells.value_color:
+            # To optimize, avoiding the winfo_children call, configure manually instead:
+            self.position_label.configure(fg=cells.value_color)
+            self.car_nr_label.configure(fg=cells.value_color)
+            self.driver_name_label.configure(fg=cells.value_color)
+            self.relative_time_label.configure(fg=cells.value_color)
+
+        if cells.irating_fill != self.cells.irating_fill:
+            self.irating_label.fill = cells.irating_fill
             self.irating_label.change_rounded_rectangle_color()
-            self.license_label.fill = self.configuration.bg_color
+        if cells.license_fill != self.cells.license_fill:
+            self.license_label.fill = cells.license_fill
             self.license_label.change_rounded_rectangle_color()
 
-        self.previous_value_color = new_color
-
-    def update_string_vars(self):
-        if self.telemetry:
-            self.position.set(value=str(self.telemetry.position))
-            self.car_nr.set(value=str(self.telemetry.car_nr))
-            self.driver_name.set(value=self.telemetry.driver_name)
-            self.license.set(value=self.telemetry.license)
-            self.irating.set(value=str(self.telemetry.irating))
-            self.relative_time.set(value="{:.1f}".format(self.telemetry.relative_time))
-
-        else:
-            self.position.set(value="")
-            self.car_nr.set(value="")
-            self.driver_name.set(value="")
-            self.license.set(value="")
-            self.irating.set(value="")
-            self.relative_time.set(value="")
+    def update_string_vars(self, cells: RelativeRowCells):
+        if cells.position != self.cells.position:
+            self.position.set(value=cells.position)
+        if cells.car_nr != self.cells.car_nr:
+            self.car_nr.set(value=cells.car_nr)
+        if cells.driver_name != self.cells.driver_name:
+            self.driver_name.set(value=cells.driver_name)
+        if cells.license != self.cells.license:
+            self.license.set(value=cells.license)
+        if cells.irating != self.cells.irating:
+            self.irating.set(value=cells.irating)
+        if cells.relative_time != self.cells.relative_time:
+            self.relative_time.set(value=cells.relative_time)
 
     def update_event_handler(self):
         """Subscribed to the change event"""
@@ -310,6 +373,10 @@ class RelativeOverlay(Overlay):
         """
         return self.configuration.relative.locked
 
+    @property
+    def refresh_rate(self) -> int:
+        return self.configuration.relative.refresh_rate
+
     @property
     def offset_right(self) -> int:
         return self.configuration.relative.offset_right
@@ -325,8 +392,9 @@ class RelativeOverlay(Overlay):
         """
         self.configuration.relative.active = False  # Otherwise it will crash because it still thinks it's active
 
-    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, telemetry: RelativeTelemetry):
-        super().__init__(root=root)
+    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, telemetry: RelativeSnapshot,
+                 backend: Optional[RenderBackend] = None):
+        super().__init__(root=root, backend=backend)
         self.configuration = configuration
         self.telemetry = telemetry
 
@@ -340,11 +408,17 @@ class RelativeOverlay(Overlay):
         subscribe(event_type=RIEventTypes.RELATIVE_FEATURE_CHANGE, fn=self.reset_activations)
         subscribe(event_type=RIEventTypes.RELATIVE_FEATURE_CHANGE, fn=self.update_transparency)
 
+        # Shared by the license and irating badges of all rows
+        self.badge_sprites = BadgeSpriteCache(backend=self.backend)
+        self.create_table()
+
+    def create_table(self):
         # Create a frame to hold the table - with rounded border!
-        self.table_frame = RoundedBorder(master=self.overlay, bg=self.configuration.bg)
+        self.table_frame = RoundedBorder(master=self.overlay, bg=self.configuration.bg, backend=self.backend)
 
-        self.initialized_rows = [RelativeRow(master=self.table_frame.frame, configuration=self.configuration) for _ in
-                                 range(self.MAX_DRIVERS)]
+        self.initialized_rows = [RelativeRow(master=self.table_frame.frame, configuration=self.configuration,
+                                             backend=self.backend, sprites=self.badge_sprites)
+                                 for _ in range(self.MAX_DRIVERS)]
 
     def populate_relative_rows(self):
         for row in self.relative_rows:
@@ -368,14 +442,12 @@ class RelativeOverlay(Overlay):
 
     @property
     def player_index(self) -> int:
-        """Refers to the id of the player in the sorted and filtered relative_time entry telemetry list"""
-        return self.filter_pits_data(_data=self.telemetry.sorted_relative_entries,
-                                     middle_index=self.telemetry.player_id_in_sorted)[1]
+        """Refers to the id of the player in the sorted and filtered relative_time entry telemetry"""
+        return self.filter_pits_data()[1]
 
     @property
-    def relative_entries(self) -> List[Optional[RelativeEntry]]:
-        return self.filter_pits_data(_data=self.telemetry.sorted_relative_entries,
-                                     middle_index=self.telemetry.player_id_in_sorted)[0]
+    def relative_entries(self) -> List[RelativeEntry]:
+        return [self.telemetry.entry(int(i)) for i in self.filter_pits_data()[0]]
 
     @property
     def nr_of_rows(self) -> int:
@@ -388,37 +460,42 @@ class RelativeOverlay(Overlay):
 
     @property
     def offset(self) -> int:
+        return self.get_offset(player_index=self.player_index)
+
+    def get_offset(self, player_index: int) -> int:
         """
-        Offset that indicates where to start looking in the relative_telemetry.sorted_relative_entries
+        Offset that indicates where to start looking in the (filtered) sorted relative entries
         to include the correct number of relative rows and keep the player in the desired location of
         the relative overlay.
         It just serves the purpose of being a parameter for further calculations.
         """
-        return int(max(self.player_index - self.nr_of_rows_front, - self.nr_of_rows_front))
+        return int(max(player_index - self.nr_of_rows_front, - self.nr_of_rows_front))
 
-    def filter_pits_data(self, _data: List[Optional[RelativeEntry]], middle_index: int):
-        data = []
-        index = middle_index
+    def filter_pits_data(self) -> Tuple[np.ndarray, int]:
+        """The indices in the snapshot of the cars to show, and the index of the player among those"""
+        indices = np.arange(len(self.telemetry))
+        index = self.telemetry.player_id_in_sorted
 
         if self.hide_pits:
-            for i, car in enumerate(_data):
-                if car.in_pits and not car.is_player:
-                    if i < middle_index:
-                        index -= 1  # Change the index pointing to the player in case cars in pits should be ignored
-                else:
-                    data.append(car)
-
-        if not self.hide_pits:
-            data = _data
-        return data, index
+            hidden = self.telemetry.in_pits & ~self.telemetry.is_player
+            index -= int(np.count_nonzero(hidden[:index]))  # Cars in the pits in front no longer count
+            indices = indices[~hidden]
+        return indices, index
+
+    def row_entries(self, nr_rows: int) -> Iterator[Optional[RelativeEntry]]:
+        """The entry shown in each row, None for an empty row. Only created for the rows that show it"""
+        indices, player_index = self.filter_pits_data()  # Filtered once, instead of once per row
+        offset = self.get_offset(player_index=player_index)
+        for i in range(nr_rows):
+            if i + offset < 0 or i + offset > len(indices) - 1:
+                yield None
+            else:
+                yield self.telemetry.entry(int(indices[i + offset]))
 
     def update_rows(self):
-        for i, row in enumerate(self.relative_rows):
+        for row, entry in zip(self.relative_rows, self.row_entries(nr_rows=len(self.relative_rows))):
             # Set the telemetry for row
-            if i + self.offset < 0 or i + self.offset > len(self.relative_entries) - 1:
-                row.set_telemetry(relative_entry=None)
-            else:
-                row.set_telemetry(relative_entry=self.relative_entries[i + self.offset])
+            row.set_telemetry(relative_entry=entry)
 
             # Update row based on set telemetry
             row.update()
@@ -448,3 +525,7 @@ class RelativeOverlay(Overlay):
 
         # Update each row
         self.update_rows()
+
+    def set_telemetry(self, telemetry: RelativeSnapshot) -> None:
+        """Sets the snapshot that is shown on the next update"""
+        self.telemetry = telemetry
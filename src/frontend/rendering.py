@@ -0,0 +1,457 @@
+"""
+Thin abstraction over the Tk widgets the overlays create, such that they can be rendered without a display.
+TkRenderBackend creates the actual widgets. NullRenderBackend creates widgets that accept every call and do nothing,
+RecordingRenderBackend widgets that also count the operations per frame and keep their state, which can be compared
+against a golden frame. The stand-in widgets only cover the part of the tkinter API that the overlays use.
+"""
+import json
+import os
+import sys
+import tkinter
+import tkinter.font
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+OVERLAY_ICON_FILE = "images/RacingInsights_Logo.ico"
+TRANSPARENT_COLOR = "RED"  # Shows as see-through in the overlay windows (on Windows)
+
+
+class RenderBackend(ABC):
+    """Creates the windows, widgets and variables of the overlays"""
+
+    @abstractmethod
+    def overlay_window(self, root: Optional[tkinter.Tk]) -> Any:
+        """Hidden, borderless and always on top window"""
+
+    @abstractmethod
+    def frame(self, master: Any, **options) -> Any:
+        ...
+
+    @abstractmethod
+    def label(self, master: Any, **options) -> Any:
+        """A label without a master belongs to the root, as it does in tkinter"""
+
+    @abstractmethod
+    def canvas(self, master: Any, **options) -> Any:
+        ...
+
+    @abstractmethod
+    def string_var(self) -> Any:
+        ...
+
+    @abstractmethod
+    def text_size(self, font: str, text: str) -> Tuple[int, int]:
+        """Width and height (line spacing) in pixels of the text when drawn in the font"""
+
+    @abstractmethod
+    def photo_image(self, width: int, height: int) -> Any:
+        """Transparent image, to be drawn with put()"""
+
+
+class TkRenderBackend(RenderBackend):
+    def __init__(self):
+        self._fonts: Dict[str, tkinter.font.Font] = {}
+        self._text_sizes: Dict[Tuple[str, str], Tuple[int, int]] = {}  # Every measurement is a Tcl call
+
+    def overlay_window(self, root: Optional[tkinter.Tk]) -> tkinter.Toplevel:
+        window = tkinter.Toplevel(root)
+        window.wm_withdraw()  # Step 1 required for showing icon in taskbar
+        window.overrideredirect(True)
+        window.lift()  # Step 2 required for showing icon in taskbar
+        window.wm_attributes("-topmost", True)
+        if sys.platform == "win32":  # Neither is supported by Tk on other platforms
+            window.wm_attributes('-transparentcolor', TRANSPARENT_COLOR)
+            window.iconbitmap(OVERLAY_ICON_FILE)
+        return window
+
+    def frame(self, master: Any, **options) -> tkinter.Frame:
+        return tkinter.Frame(master=master, **options)
+
+    def label(self, master: Any, **options) -> tkinter.Label:
+        return tkinter.Label(master=master, **options)
+
+    def canvas(self, master: Any, **options) -> tkinter.Canvas:
+        return tkinter.Canvas(master=master, **options)
+
+    def string_var(self) -> tkinter.StringVar:
+        return tkinter.StringVar()
+
+    def text_size(self, font: str, text: str) -> Tuple[int, int]:
+        size = self._text_sizes.get((font, text))
+        if size is None:
+            tk_font = self._fonts.get(font)
+            if tk_font is None:
+                tk_font = self._fonts[font] = tkinter.font.Font(font=font)
+            size = self._text_sizes[(font, text)] = (tk_font.measure(text), tk_font.metrics("linespace"))
+        return size
+
+    def photo_image(self, width: int, height: int) -> tkinter.PhotoImage:
+        return tkinter.PhotoImage(width=width, height=height)
+
+
+def font_size_of(font: str) -> int:
+    """Of a font string as the overlays use them, e.g. 'Helvetica 12 bold'"""
+    for part in str(font).split():
+        if part.lstrip("-").isdigit():
+            return abs(int(part))
+    return 10
+
+
+def estimated_text_size(font: str, text: str) -> Tuple[int, int]:
+    """Of a fixed width font, as the stand-in widgets estimate it"""
+    font_size = font_size_of(font)
+    return int(len(text) * font_size * 0.8), int(font_size * 1.6)
+
+
+class RecordedVariable:
+    def __init__(self, backend: "NullRenderBackend"):
+        self.backend = backend
+        self.value = ""
+
+    def set(self, value: str) -> None:
+        self.backend.record("StringVar.set")
+        self.value = value
+
+    def get(self) -> str:
+        return self.value
+
+
+class RecordedImage:
+    """Stand-in for a PhotoImage, which only keeps the colors and the regions it was drawn with"""
+
+    def __init__(self, backend: "NullRenderBackend", width: int, height: int):
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.puts: List[Tuple[str, Tuple[int, int, int, int]]] = []
+        backend.record("image.create")
+
+    def put(self, data: str, to: Tuple[int, int, int, int]) -> None:
+        self.backend.record("image.put")
+        self.puts.append((data, to))
+
+    def state(self) -> dict:
+        return {"width": self.width, "height": self.height, "puts": [[data, *to] for data, to in self.puts]}
+
+
+class RecordedWidget:
+    """
+    Stand-in for a Tk widget (or window) that keeps its options, packing and canvas items.
+    The requested size is estimated from the text and font, such that the layout code has something to work with.
+    """
+
+    def __init__(self, backend: "NullRenderBackend", kind: str, master: Optional["RecordedWidget"], options: dict):
+        self.backend = backend
+        self.kind = kind
+        self.master = master
+        self.options = dict(options)
+        self.children: List[RecordedWidget] = []
+        self.packed: Optional[dict] = None
+        self.visible = kind != "toplevel"
+        self.items: Dict[int, dict] = {}  # Canvas items by id
+        self.bindings: Dict[str, Callable] = {}
+        if master is not None:
+            count = sum(1 for child in master.children if child.kind == kind) + 1
+            self.name = f"{master.name}.!{kind}{count if count > 1 else ''}"
+            master.children.append(self)
+        else:
+            self.name = f".!{kind}{len(backend.windows) + 1}"
+            backend.windows.append(self)
+        backend.record(f"{kind}.create")
+
+    def _record(self, method: str) -> None:
+        self.backend.record(f"{self.kind}.{method}")
+
+    # Generic widget methods
+    def configure(self, **options) -> None:
+        self._record("configure")
+        self.options.update(options)
+
+    config = configure
+
+    def cget(self, option: str) -> Any:
+        return self.options.get(option)
+
+    def pack(self, **options) -> None:
+        self._record("pack")
+        self.packed = options
+
+    def pack_forget(self) -> None:
+        self._record("pack_forget")
+        self.packed = None
+
+    def bind(self, sequence: str, fn: Callable) -> None:
+        self.bindings[sequence] = fn
+
+    def destroy(self) -> None:
+        self._record("destroy")
+        if self.master is not None and self in self.master.children:
+            self.master.children.remove(self)
+
+    def winfo_children(self) -> List["RecordedWidget"]:
+        return list(self.children)
+
+    def winfo_x(self) -> int:
+        return 0
+
+    def winfo_y(self) -> int:
+        return 0
+
+    @property
+    def text(self) -> str:
+        variable = self.options.get("textvariable")
+        return variable.get() if isinstance(variable, RecordedVariable) else str(self.options.get("text", ""))
+
+    def winfo_reqwidth(self) -> int:
+        padding = 2 * int(self.options.get("padx", 0))
+        if self.kind == "label":
+            characters = max(len(self.text), int(self.options.get("width") or 0))
+            return estimated_text_size(self.options.get("font", ""), "0" * characters)[0] + padding
+        packed = [child for child in self.children if child.packed is not None]
+        if self.kind == "frame" and packed:
+            widths = [child.winfo_reqwidth() for child in packed]
+            horizontal = all(child.packed.get("side") in ("left", "right") for child in packed)
+            return (sum(widths) if horizontal else max(widths)) + padding
+        return int(self.options.get("width") or 0) + padding
+
+    def winfo_reqheight(self) -> int:
+        padding = 2 * int(self.options.get("pady", 0))
+        if self.kind == "label":
+            return estimated_text_size(self.options.get("font", ""), "")[1] + padding
+        packed = [child for child in self.children if child.packed is not None]
+        if self.kind == "frame" and packed:
+            heights = [child.winfo_reqheight() for child in packed]
+            horizontal = all(child.packed.get("side") in ("left", "right") for child in packed)
+            return (max(heights) if horizontal else sum(heights)) + padding
+        return int(self.options.get("height") or 0) + padding
+
+    # Window methods
+    def title(self, title: str) -> None:
+        self.options["title"] = title
+
+    def geometry(self, geometry: str) -> None:
+        self._record("geometry")
+        self.options["geometry"] = geometry
+
+    def attributes(self, name: str, value: Any) -> None:
+        self._record("attributes")
+        self.options[name] = value
+
+    wm_attributes = attributes
+
+    def protocol(self, name: str, fn: Callable) -> None:
+        self.bindings[name] = fn
+
+    def wm_withdraw(self) -> None:
+        self._record("withdraw")
+        self.visible = False
+
+    withdraw = wm_withdraw
+
+    def wm_deiconify(self) -> None:
+        self._record("deiconify")
+        self.visible = True
+
+    def lift(self) -> None:
+        self._record("lift")
+
+    def overrideredirect(self, value: bool) -> None:
+        self.options["overrideredirect"] = value
+
+    # Canvas methods
+    def _create_item(self, item_type: str, coords: List[float], options: dict) -> int:
+        self._record(f"create_{item_type}")
+        item_id = len(self.items) + 1
+        self.items[item_id] = {"type": item_type, "coords": list(coords), **options}
+        return item_id
+
+    def create_polygon(self, *coords, **options) -> int:
+        return self._create_item("polygon", _flatten(coords), options)
+
+    def create_rectangle(self, *coords, **options) -> int:
+        return self._create_item("rectangle", _flatten(coords), options)
+
+    def create_text(self, *coords, **options) -> int:
+        return self._create_item("text", _flatten(coords), options)
+
+    def create_image(self, *coords, **options) -> int:
+        return self._create_item("image", _flatten(coords), options)
+
+    def create_window(self, *coords, **options) -> int:
+        return self._create_item("window", _flatten(coords), options)
+
+    def _find(self, item_or_tag: int | str) -> List[dict]:
+        """The items with the id, or with the tag, as Tk resolves them"""
+        if isinstance(item_or_tag, int):
+            return [self.items[item_or_tag]] if item_or_tag in self.items else []
+        return [item for item in self.items.values() if item_or_tag in item.get("tags", ())]
+
+    def coords(self, item_or_tag: int | str, *coords) -> None:
+        self._record("coords")
+        for item in self._find(item_or_tag)[:1]:  # Tk moves the first item only
+            item["coords"] = _flatten(coords)
+
+    def itemconfigure(self, item_or_tag: int | str, **options) -> None:
+        self._record("itemconfigure")
+        for item in self._find(item_or_tag):
+            item.update(options)
+
+    def delete(self, item_or_tag: int | str) -> None:
+        self._record("delete")
+        found = [id(item) for item in self._find(item_or_tag)]
+        for item_id in [item_id for item_id, item in self.items.items() if id(item) in found]:
+            self.items.pop(item_id)
+
+    def state(self) -> dict:
+        """Everything this widget and its children show, in a json serializable form"""
+        state = {"name": self.name, "kind": self.kind,
+                 "options": {name: _serializable(value) for name, value in sorted(self.options.items())
+                             if name != "textvariable"}}
+        if self.kind == "toplevel":
+            state["visible"] = self.visible
+        else:
+            state["packed"] = {name: _serializable(value) for name, value in (self.packed or {}).items()} \
+                if self.packed is not None else None
+        if "textvariable" in self.options:
+            state["text"] = self.text
+        if self.items:
+            state["items"] = {str(item_id): {name: _serializable(value) for name, value in item.items()}
+                              for item_id, item in self.items.items()}
+        state["children"] = [child.state() for child in self.children]
+        return state
+
+
+def _flatten(coords) -> List[float]:
+    flat = []
+    for coord in coords:
+        if isinstance(coord, (list, tuple)):
+            flat.extend(_flatten(coord))
+        else:
+            flat.append(round(float(coord), 2))
+    return flat
+
+
+def _serializable(value: Any) -> Any:
+    if isinstance(value, RecordedWidget):
+        return value.name
+    if isinstance(value, RecordedVariable):
+        return value.get()
+    if isinstance(value, RecordedImage):
+        return value.state()
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, (str, int, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_serializable(v) for v in value]
+    return str(value)
+
+
+class NullRenderBackend(RenderBackend):
+    """Widgets without a display, which do nothing besides keeping their state"""
+    recording = False
+
+    def __init__(self):
+        self.windows: List[RecordedWidget] = []
+        self.root_widget: Optional[RecordedWidget] = None  # Master of the widgets created without one
+
+    def record(self, operation: str) -> None:
+        pass
+
+    def overlay_window(self, root: Optional[tkinter.Tk]) -> RecordedWidget:
+        window = RecordedWidget(backend=self, kind="toplevel", master=None, options={})
+        window.overrideredirect(True)
+        window.wm_attributes("-topmost", True)
+        return window
+
+    def frame(self, master: Any, **options) -> RecordedWidget:
+        return RecordedWidget(backend=self, kind="frame", master=master or self._root(), options=options)
+
+    def label(self, master: Any, **options) -> RecordedWidget:
+        return RecordedWidget(backend=self, kind="label", master=master or self._root(), options=options)
+
+    def canvas(self, master: Any, **options) -> RecordedWidget:
+        return RecordedWidget(backend=self, kind="canvas", master=master or self._root(), options=options)
+
+    def string_var(self) -> RecordedVariable:
+        return RecordedVariable(backend=self)
+
+    def text_size(self, font: str, text: str) -> Tuple[int, int]:
+        return estimated_text_size(font, text)
+
+    def photo_image(self, width: int, height: int) -> RecordedImage:
+        return RecordedImage(backend=self, width=width, height=height)
+
+    def _root(self) -> RecordedWidget:
+        if self.root_widget is None:
+            self.root_widget = RecordedWidget(backend=self, kind="root", master=None, options={})
+        return self.root_widget
+
+
+class RecordingRenderBackend(NullRenderBackend):
+    """
+    Counts the widget operations (the equivalent of the Tcl calls) per frame, end_frame() closes a frame.
+    The state of the windows can be stored as a golden frame and compared against later on.
+    """
+    recording = True
+
+    def __init__(self):
+        super().__init__()
+        self.operations: Counter = Counter()  # Of the current frame
+        self.frames: List[Counter] = []
+
+    def record(self, operation: str) -> None:
+        self.operations[operation] += 1
+
+    def end_frame(self) -> Counter:
+        operations, self.operations = self.operations, Counter()
+        self.frames.append(operations)
+        return operations
+
+    def reset(self) -> None:
+        """Forgets the operations so far, e.g. those of building the widgets"""
+        self.operations = Counter()
+        self.frames = []
+
+    @property
+    def operations_per_frame(self) -> float:
+        return sum(sum(frame.values()) for frame in self.frames) / len(self.frames) if self.frames else 0.0
+
+    def state(self) -> List[dict]:
+        """Of the overlay windows (not of the root), as shown after the last operation"""
+        return [window.state() for window in self.windows if window.kind == "toplevel"]
+
+    def save_golden(self, file_path: str) -> None:
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(self.state(), file, indent=1)
+
+    def compare_golden(self, file_path: str) -> List[str]:
+        """The differences with the golden frame in the file, empty when the frame matches"""
+        with open(file_path, encoding="utf-8") as file:
+            golden = json.load(file)
+        return state_differences(expected=golden, actual=self.state())
+
+
+def state_differences(expected: Any, actual: Any, path: str = "") -> List[str]:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in sorted(set(expected) | set(actual)):
+            if key not in actual:
+                differences.append(f"{path}/{key}: missing")
+            elif key not in expected:
+                differences.append(f"{path}/{key}: unexpected {actual[key]!r}")
+            else:
+                differences += state_differences(expected[key], actual[key], path=f"{path}/{key}")
+        return differences
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} entries expected, got {len(actual)}"]
+        differences = []
+        for index, (expected_value, actual_value) in enumerate(zip(expected, actual)):
+            differences += state_differences(expected_value, actual_value, path=f"{path}/{index}")
+        return differences
+    return [] if expected == actual else [f"{path}: expected {expected!r}, got {actual!r}"]
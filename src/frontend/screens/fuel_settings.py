@@ -40,6 +40,7 @@ class FuelSettings(Screen):
         self.target_var = tkinter.BooleanVar()
         self.range_var = tkinter.BooleanVar()
         self.refuel_var = tkinter.BooleanVar()
+        self.refuel_own_pace_var = tkinter.BooleanVar()
         self.finish_var = tkinter.BooleanVar()
 
         self.lock_button = None
@@ -162,6 +163,13 @@ class FuelSettings(Screen):
                                              onvalue=True,
                                              offvalue=False)
 
+        refuel_own_pace_checkbutton = ttk.Checkbutton(master=check_frame,
+                                                      text="Refuel amount (own pace)",
+                                                      variable=self.refuel_own_pace_var,
+                                                      command=self.update_refuel_own_pace_activated,
+                                                      onvalue=True,
+                                                      offvalue=False)
+
         finish_checkbutton = ttk.Checkbutton(master=check_frame,
                                              text="Finish target",
                                              variable=self.finish_var,
@@ -195,6 +203,11 @@ class FuelSettings(Screen):
                                       text="Show the refuel amount needed to make it to the finish based on your "
                                            "average fuel consumption plus the 'Refuel Margin (%)' (in liters)")
 
+        refuel_own_pace_info = HoverInfoWindow(master_widget=refuel_own_pace_checkbutton,
+                                               text="Same as the refuel amount, but for when you instead of the "
+                                                    "leader take the checkered flag, e.g. when leading the race "
+                                                    "(in liters)")
+
         finish_info = HoverInfoWindow(master_widget=finish_checkbutton,
                                       text="Show the maximum fuel usage per lap needed (from now until the finish) to "
                                            "make it to the finish without refueling (in liters)")
@@ -211,6 +224,7 @@ class FuelSettings(Screen):
         self.target_var.set(value=self.configuration.fuel.target_activated)
         self.range_var.set(value=self.configuration.fuel.range_activated)
         self.refuel_var.set(value=self.configuration.fuel.refuel_activated)
+        self.refuel_own_pace_var.set(value=self.configuration.fuel.refuel_own_pace_activated)
         self.finish_var.set(value=self.configuration.fuel.finish_activated)
 
         # Pack
@@ -240,6 +254,7 @@ class FuelSettings(Screen):
         target_checkbutton.pack(pady=5, fill='both', anchor='nw')
         range_checkbutton.pack(pady=5, fill='both', anchor='nw')
         refuel_checkbutton.pack(pady=5, fill='both', anchor='nw')
+        refuel_own_pace_checkbutton.pack(pady=5, fill='both', anchor='nw')
         finish_checkbutton.pack(pady=5, fill='both', anchor='nw')
 
         # Bind
@@ -259,6 +274,7 @@ class FuelSettings(Screen):
 
     def update_transparency(self, event_data=None):
         self.configuration.fuel.transparency = float(self.transparency_slider.get())
+        post_event(event_type=RIEventTypes.FUEL_FEATURE_CHANGE)
 
     def update_safety_margin(self, event_data=None):
         self.configuration.fuel.safety_margin = float(self.safety_margin_slider.get())
@@ -284,5 +300,8 @@ class FuelSettings(Screen):
     def update_refuel_activated(self):
         self.configuration.fuel.refuel_activated = self.refuel_var.get()
 
+    def update_refuel_own_pace_activated(self):
+        self.configuration.fuel.refuel_own_pace_activated = self.refuel_own_pace_var.get()
+
     def update_finish_activated(self):
         self.configuration.fuel.finish_activated = self.finish_var.get()
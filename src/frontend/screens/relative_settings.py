@@ -243,7 +243,6 @@ class RelativeSettings(Screen):
     def update_padding_x(self, _):
         self.configuration.relative.text_padding_x = int(self.padding_x_slider.get())
         post_event(event_type=RIEventTypes.RELATIVE_FEATURE_CHANGE)
-        post_event(event_type=RIEventTypes.RELATIVE_FEATURE_CHANGE)  # Twice, to avoid not going to 0 on first update
 
     def update_padding_y(self, _):
         self.configuration.relative.text_padding_y = int(self.padding_y_slider.get())
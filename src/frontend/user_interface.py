@@ -1,6 +1,8 @@
 import tkinter
+from typing import Optional
 
-from src.backend.iRacing.telemetry import RITelemetry
+from src.backend.iRacing.telemetry import TelemetrySnapshot
+from src.backend.utils.frame_timing import FrameTimings
 from src.frontend.overlays.overlays_container import OverlaysContainer
 from src.frontend.screens.fuel_settings import FuelSettings
 from src.frontend.screens.main_screen import MainScreen
@@ -11,13 +13,15 @@ from src.startup.my_configuration import CompleteConfig
 class UserInterface:
     """High-level class that contains all other UI elements"""
 
-    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, ri_telemetry: RITelemetry):
+    def __init__(self, root: tkinter.Tk, configuration: CompleteConfig, timings: Optional[FrameTimings] = None):
         self.root = root
 
         # Overlay Screens - Use updates based on configuration-state for activation/visibility
+        # These render the telemetry snapshots handed over by the client app, empty until the first one arrives
         self.overlays_container = OverlaysContainer(root=self.root,
                                                     configuration=configuration,
-                                                    ri_telemetry=ri_telemetry,
+                                                    telemetry=TelemetrySnapshot(),
+                                                    timings=timings,
                                                     )
 
         # UI Screens - Use event handler for activation/visibility
@@ -29,6 +33,9 @@ class UserInterface:
                                                   title="Relative overlay settings",
                                                   configuration=configuration)
 
+    def set_telemetry(self, telemetry: TelemetrySnapshot) -> None:
+        self.overlays_container.set_telemetry(telemetry)
+
     def update(self):
         self.overlays_container.update()
         self.root.update()
@@ -1,5 +1,8 @@
 import tkinter
 from math import cos, sin
+from typing import Optional
+
+from src.frontend.rendering import RenderBackend, TkRenderBackend
 
 
 def get_rectangle_points(x1, y1, width, height, feather, res=10):
@@ -40,12 +43,13 @@ class RoundedBorder:
     my_feather = 5
     my_padding = 2*my_feather
 
-    def __init__(self, master: tkinter.Toplevel, bg: str):
+    def __init__(self, master: tkinter.Toplevel, bg: str, backend: Optional[RenderBackend] = None):
         self.master = master
-        self.canvas = tkinter.Canvas(master=self.master, bg="RED", highlightthickness=0, borderwidth=0)
+        backend = backend if backend else TkRenderBackend()
+        self.canvas = backend.canvas(master=self.master, bg="RED", highlightthickness=0, borderwidth=0)
         self.canvas.pack()
 
-        self.frame = tkinter.Frame(master=self.master, bg=bg, width=300,
+        self.frame = backend.frame(master=self.master, bg=bg, width=300,
                                    height=300)  # This contains all contents!!!
 
         center_x = self.canvas.winfo_reqwidth() // 2
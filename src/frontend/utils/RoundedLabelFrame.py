@@ -1,7 +1,9 @@
 import tkinter
-from math import cos, sin
 from typing import Optional
 
+from src.frontend.rendering import RenderBackend, TkRenderBackend
+from src.frontend.utils.badge_sprites import BadgeSpriteCache
+
 class RoundedLabelFrame:
     """
     Acts like a tkinter frame but can show as a rounded frame with
@@ -15,12 +17,14 @@ class RoundedLabelFrame:
     Whenever an appearance change is made from outside, the .configure()
     method should be called.
 
+    The rounded rectangle is a pre-rendered image of the sprite cache, which
+    can be shared between frames. A change of color or size swaps the image.
+
     NOTE: Uses a lower limit that it will always use for the size,
     this can be influenced by changing the value for self.min_txt_length
     Hence, setting the width or height doesn't always influence the size
     as these might be constrained to the text that is inside.
     """
-    feather_ratio = 15
     my_label_padding_x = 0
     my_label_padding_y = 0
 
@@ -35,7 +39,9 @@ class RoundedLabelFrame:
                  font_color: str = "BLACK",
                  padx: int = 0,
                  pady: int = 0,
-                 txt_len: Optional[int] = 6
+                 txt_len: Optional[int] = 6,
+                 backend: Optional[RenderBackend] = None,
+                 sprites: Optional[BadgeSpriteCache] = None
                  ):
 
         # Configurable settings:
@@ -56,31 +62,29 @@ class RoundedLabelFrame:
         # Fixed settings
         self._font_style = "TkFixedFont"
         self._font_extra = "bold"
-        self._label_check = tkinter.Label(font=self.font, text=self.min_text_ref, padx=0, pady=0)
+        self.backend = backend if backend else TkRenderBackend()
+        self.sprites = sprites if sprites is not None else BadgeSpriteCache(backend=self.backend)
 
         # Initialize the UI - Uses a master same as a tkinter frame would
         self.master = master
 
         # The "frame" is the container, hence it replaces a normal tkinter frame and adds functionality
-        self.frame = tkinter.Frame(master=self.master, bg=self.bg)
-
-        self.canvas = tkinter.Canvas(master=self.frame,
-                                     bg=self.bg,
-                                     width=self.set_width,
-                                     height=self.set_height,
-                                     borderwidth=0,
-                                     highlightthickness=0,
-                                     )
-
-        points = self._get_rectangle_points(x1=0, y1=0,
-                                            width=self.set_width,
-                                            height=self.set_height,
-                                            feather=int(self.set_width / self.feather_ratio))
-
-        self.rounded_rectangle = self._draw_rounded_rectangle(points=points, fill=self.fill)
-
-        self.label = tkinter.Label(master=self.frame, textvariable=self.string_var, fg=self.font_color, bg=self.fill,
-                                   padx=0, pady=0)
+        self.frame = self.backend.frame(master=self.master, bg=self.bg)
+
+        self.canvas = self.backend.canvas(master=self.frame,
+                                          bg=self.bg,
+                                          width=self.set_width,
+                                          height=self.set_height,
+                                          borderwidth=0,
+                                          highlightthickness=0,
+                                          )
+
+        # Kept as long as it is shown, Tk deletes an image together with its Python object
+        self.sprite = self.sprites.get(fill=self.fill, width=self.width, height=self.height)
+        self.rounded_rectangle = self.canvas.create_image(0, 0, anchor="nw", image=self.sprite)
+
+        self.label = self.backend.label(master=self.frame, textvariable=self.string_var, fg=self.font_color,
+                                        bg=self.fill, padx=0, pady=0)
         self.label.pack(fill=tkinter.BOTH, expand=True)
         self.label_window = self.canvas.create_window(int(self.width / 2),
                                                       int(self.height / 2),
@@ -104,19 +108,16 @@ class RoundedLabelFrame:
         Note, this should only be called after changing the self.fill attribute!
         """
         self.label.configure(bg=self.fill)
-        self.canvas.itemconfigure(self.rounded_rectangle, fill=self.fill)
+        self.show_sprite()
 
     def configure(self):
         """re-configures the appearance elements. To be called when changed attributes from outside."""
         self.frame.configure(padx=self.padx, pady=self.pady)
         self.label.configure(font=self.font, bg=self.fill, fg=self.font_color)
         self.canvas.configure(width=self.width, height=self.height, bg=self.bg)
-        self.reconfigure_rounded_rectangle()
+        self.show_sprite()
         self.canvas.coords(self.label_window, int(self.width / 2), int(self.height / 2))
 
-    def _draw_rounded_rectangle(self, points, **kwargs):
-        return self.canvas.create_polygon(points, smooth=True, **kwargs)
-
     @property
     def min_text_ref(self) -> str:
         min_text = ""
@@ -132,61 +133,18 @@ class RoundedLabelFrame:
 
     @property
     def height(self) -> int:
-        self._label_check.config(font=self.font)
-        return max(self._label_check.winfo_reqheight() + self.my_label_padding_y, self.set_height)
+        return max(self.backend.text_size(font=self.font, text=self.min_text_ref)[1] + self.my_label_padding_y,
+                   self.set_height)
 
     @property
     def width(self) -> int:
-        self._label_check.config(font=self.font)
-        return max(self._label_check.winfo_reqwidth() + self.my_label_padding_x, self.set_width)
-
-    @property
-    def my_feather(self) -> int:
-        return int(self.width / self.feather_ratio)
+        return max(self.backend.text_size(font=self.font, text=self.min_text_ref)[0] + self.my_label_padding_x,
+                   self.set_width)
 
-    def reconfigure_rounded_rectangle(self):
-        """
-        This combined with the properties provides the magic sauce for having rounded corners
-        and have them updatable/reconfigurable
-        """
-        points = self._get_rectangle_points(x1=0, y1=0, width=self.width, height=self.height,
-                                            feather=self.my_feather)
-        self.canvas.coords(self.rounded_rectangle, points)
-        self.canvas.itemconfigure(self.rounded_rectangle, fill=self.fill)
-
-    @staticmethod
-    def _get_rectangle_points(x1, y1, width, height, feather, res=10):
-        x2, y2 = x1 + width, y1 + height
-        points = []
-        # top side
-        points += [x1 + feather, y1,
-                   x2 - feather, y1]
-        # top right corner
-        for i in range(res):
-            points += [x2 - feather + sin(i / res * 2) * feather,
-                       y1 + feather - cos(i / res * 2) * feather]
-        # right side
-        points += [x2, y1 + feather,
-                   x2, y2 - feather]
-        # bottom right corner
-        for i in range(res):
-            points += [x2 - feather + cos(i / res * 2) * feather,
-                       y2 - feather + sin(i / res * 2) * feather]
-        # bottom side
-        points += [x2 - feather, y2,
-                   x1 + feather, y2]
-        # bottom left corner
-        for i in range(res):
-            points += [x1 + feather - sin(i / res * 2) * feather,
-                       y2 - feather + cos(i / res * 2) * feather]
-        # left side
-        points += [x1, y2 - feather,
-                   x1, y1 + feather]
-        # top left corner
-        for i in range(res):
-            points += [x1 + feather - cos(i / res * 2) * feather,
-                       y1 + feather - sin(i / res * 2) * feather]
-        return points
+    def show_sprite(self):
+        """Swaps the rounded rectangle for the image of the current fill and size, drawn once per combination"""
+        self.sprite = self.sprites.get(fill=self.fill, width=self.width, height=self.height)
+        self.canvas.itemconfigure(self.rounded_rectangle, image=self.sprite)
 
 # # Example use:
 # root = tkinter.Tk()
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from math import sqrt
+from typing import Any, Tuple
+
+from src.frontend.rendering import RenderBackend
+
+
+class BadgeSpriteCache:
+    """
+    Pre-rendered images of the rounded badges (the license and irating chips), such that a change of color or size is
+    an image swap instead of rebuilding a smooth polygon. The badge is sized to its text, hence an image is keyed by
+    its color, the width of the text and the height of the font. The least recently used images are evicted, whoever
+    shows an image keeps a reference to it, since Tk deletes an image together with its Python object.
+    """
+    feather_ratio = 15  # Width relative to the radius of the corners
+
+    def __init__(self, backend: RenderBackend, max_sprites: int = 64):
+        self.backend = backend
+        self.max_sprites = max_sprites
+        self._sprites: OrderedDict[Tuple[str, int, int], Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._sprites)
+
+    def get(self, fill: str, width: int, height: int) -> Any:
+        key = (fill, width, height)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self._sprites[key] = self.render(fill=fill, width=width, height=height)
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def render(self, fill: str, width: int, height: int) -> Any:
+        """A rounded rectangle on a transparent background, drawn as blocks of the pixel rows of the same width"""
+        image = self.backend.photo_image(width=max(width, 1), height=max(height, 1))
+        radius = min(int(width / self.feather_ratio), height // 2)
+        insets = []
+        for y in range(height):
+            # Distance to the center of the corner circle, zero on the straight part of the sides
+            dy = max(radius - y - 0.5, y + 0.5 - (height - radius), 0)
+            insets.append(round(radius - sqrt(max(radius ** 2 - dy ** 2, 0))) if dy else 0)
+
+        top = 0
+        for y in range(1, height + 1):
+            if y == height or insets[y] != insets[top]:
+                inset = insets[top]
+                if width - 2 * inset > 0:
+                    image.put(fill, to=(inset, top, width - inset, y))
+                top = y
+        return image
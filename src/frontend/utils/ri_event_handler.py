@@ -2,7 +2,11 @@
 # The alternative is to use @property at the side which would be the subscriber in case of an event handler
 # Property should then return the specific attribute related to that event
 
+import inspect
+import threading
+import weakref
 from enum import Enum, auto
+from typing import Any, Callable, Dict, List, Optional
 
 
 class RIEventTypes(Enum):
@@ -16,27 +20,79 @@ class RIEventTypes(Enum):
 
 """
 Event handler to implement an observer (listener) pattern.
-Its main use case is handling the events of user inputs and communicating it to the UI elements
+Its main use case is handling the events of user inputs and communicating it to the UI elements.
+
+Posted events are queued and dispatched once per frame by dispatch_events(), which the ClientApp schedules on the
+Tk thread. The same event (with the same data) posted multiple times within a frame is dispatched once, such that
+e.g. every change of a setting does not rebuild the overlay. Events within the telemetry, which has to act on them
+on its own (worker) thread and within the same update, are posted as immediate instead.
+
+Bound methods are subscribed through a weak reference: a subscriber that is garbage collected unsubscribes itself.
 """
-subscribers = dict()  # Contains event type and all the functions that are subscribed
+subscribers: Dict[RIEventTypes, List[Callable[[], Optional[Callable]]]] = dict()  # References to the subscribers
+_queue: Dict[tuple, Any] = dict()  # Ordered by the first post within the frame
+_queue_lock = threading.Lock()  # Events can be posted from any thread
+
+
+def _reference(fn: Callable) -> Callable[[], Optional[Callable]]:
+    if inspect.ismethod(fn):
+        return weakref.WeakMethod(fn)
+    return lambda: fn  # A plain function is likely the only reference to itself, e.g. a lambda
 
 
-def subscribe(event_type: RIEventTypes, fn):
+def subscribe(event_type: RIEventTypes, fn: Callable):
     """Function to append a specific function/method (fn) to the subscribers of certain event"""
     if event_type not in subscribers:
         subscribers[event_type] = []
-    subscribers[event_type].append(fn)
+    subscribers[event_type].append(_reference(fn))
+
+
+def unsubscribe(event_type: RIEventTypes, fn: Callable):
+    if event_type not in subscribers:
+        return
+    subscribers[event_type] = [reference for reference in subscribers[event_type] if reference() not in (fn, None)]
 
 
-def post_event(event_type: RIEventTypes, data=None):
+def post_event(event_type: RIEventTypes, data=None, immediate: bool = False):
     """
     This gets called when a new event occurs.
-    It will pass the related data to each of the subscribers.
+    It will pass the related data to each of the subscribers, on the next dispatch_events() or right away
+    (on the thread that posts it) when immediate.
     """
+    if immediate:
+        _dispatch(event_type=event_type, data=data)
+        return
+
+    key = (event_type, data)
+    try:
+        hash(key)
+    except TypeError:  # E.g. a dataclass, which is only coalesced with itself
+        key = (event_type, id(data), type(data))
+    with _queue_lock:
+        _queue[key] = data
+
+
+def dispatch_events() -> int:
+    """Dispatches the events posted since the previous call, returns the number of (coalesced) events"""
+    with _queue_lock:
+        events = list(_queue.items())
+        _queue.clear()
+
+    for key, data in events:
+        _dispatch(event_type=key[0], data=data)
+    return len(events)
+
+
+def _dispatch(event_type: RIEventTypes, data=None):
     if event_type not in subscribers:
         return
 
-    for subscribed_function in subscribers[event_type]:
+    for reference in list(subscribers[event_type]):  # A subscriber might (un)subscribe in the meantime
+        subscribed_function = reference()
+        if subscribed_function is None:  # Garbage collected
+            if reference in subscribers[event_type]:
+                subscribers[event_type].remove(reference)
+            continue
         if data:
             subscribed_function(data)
         else:
@@ -56,6 +56,7 @@ class OverlayConfig(Config):
     name: str
     font_size: int
     text_padding: int
+    refresh_rate: int  # Hz, how often the overlay is redrawn
 
 
 class FuelConfig(OverlayConfig):
@@ -71,6 +72,7 @@ class FuelConfig(OverlayConfig):
         self.last_activated: bool = True
         self.range_activated: bool = True
         self.refuel_activated: bool = True
+        self.refuel_own_pace_activated: bool = False
         self.remaining_activated: bool = True
         self.target_activated: bool = True
         self.safety_margin: float = 5
@@ -82,6 +84,7 @@ class FuelConfig(OverlayConfig):
         self.font_size: int = 16
         self.text_padding: int = 4
         self.locked: bool = True
+        self.refresh_rate: int = 10
 
         if self.name in entries:
             add_entries_to_config(config_object=self, **entries[f"{self.name}"])
@@ -100,6 +103,7 @@ class RelativeConfig(OverlayConfig):
         self.nr_rows: int = 7
         self.nr_rows_front: int = 3
         self.driver_name_width: int = 16
+        self.canvas_renderer: bool = False  # Draws the table on a single canvas, see RelativeCanvasOverlay
 
         # General overlay configurations:
         self.offset_down: int = 850
@@ -109,6 +113,28 @@ class RelativeConfig(OverlayConfig):
         self.text_padding_x: int = 4
         self.text_padding_y: int = 4
         self.locked: bool = True
+        self.refresh_rate: int = 30
+
+        if self.name in entries:
+            add_entries_to_config(config_object=self, **entries[f"{self.name}"])
+
+
+class DebugConfig(OverlayConfig):
+    """Class containing all configuration settings for the debug (frame timings) overlay"""
+    name = "debug"
+
+    def __init__(self, **entries):
+        # Debug specific configurations
+        self.active: bool = True  # Only has effect when frame_timing is enabled
+
+        # General overlay configurations:
+        self.offset_down: int = 5
+        self.offset_right: int = 600
+        self.transparency: float = 0.9
+        self.font_size: int = 10
+        self.text_padding: int = 4
+        self.locked: bool = True
+        self.refresh_rate: int = 2
 
         if self.name in entries:
             add_entries_to_config(config_object=self, **entries[f"{self.name}"])
@@ -150,6 +176,10 @@ class CompleteConfig(Config):
     def __init__(self, **entries):
         self.auto_login: bool = False
         self.main_open: bool = True
+        self.record_telemetry: bool = False  # Records the sdk data to logs/, see TelemetryRecorder
+        self.threaded_telemetry: bool = True  # Samples the telemetry on its own thread, see TelemetryWorker
+        self.frame_timing: bool = False  # Measures the time per stage of a frame, see FrameTimings
+        self.allocation_profiling: bool = False  # Profiles the allocations and GC pauses, see AllocationProfiler
         self.bg_color: str = '#1C1C1C'
         self.font = FontConfig(**entries)
         entries.pop(f"{FontConfig.name}", None)  # 'None' to avoid KeyError
@@ -159,6 +189,8 @@ class CompleteConfig(Config):
         entries.pop(f"{FuelConfig.name}", None)
         self.relative = RelativeConfig(**entries)
         entries.pop(f"{RelativeConfig.name}", None)
+        self.debug = DebugConfig(**entries)
+        entries.pop(f"{DebugConfig.name}", None)
 
         # Settings screens
         self.settings = SettingsConfig(**entries)
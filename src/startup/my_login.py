@@ -1,15 +1,13 @@
 """Module for logging"""
 import logging
 import tkinter as tk
+from concurrent.futures import Future
 from dataclasses import dataclass
 from enum import Enum
 from tkinter import messagebox, simpledialog, ttk
 from typing import Optional, Tuple
 
-import keyring as kr
 from PIL import Image, ImageTk
-from cryptography.fernet import Fernet
-from keyring.errors import PasswordDeleteError
 
 from src.backend.AWS.login import CognitoIDPClient, CognitoIDPToken
 from src.frontend.screen import IconTypes, Screen
@@ -123,10 +121,10 @@ class LoginScreen(Screen):
     def icon(self) -> IconTypes:
         return IconTypes.LOGO
 
-    def __init__(self, root: tk.Tk, config: CompleteConfig, cognito: CognitoIDPClient):
+    def __init__(self, root: tk.Tk, config: CompleteConfig, cognito: Future):
         super().__init__(root, title="Login")
         self.cfg_reference = config
-        self.cognito = cognito
+        self._cognito = cognito
 
         self.login_success = False
         self.id_token: Optional[CognitoIDPToken] = None
@@ -139,6 +137,11 @@ class LoginScreen(Screen):
         self.screen.protocol("WM_DELETE_WINDOW", self.on_close)
         self.update()
 
+    @property
+    def cognito(self) -> CognitoIDPClient:
+        """The client is created in the background, it is only waited for once the user submits something"""
+        return self._cognito.result()
+
     def on_log_in(self) -> None:
         """Event associated with the login button press"""
         email, password = self.get_inputs()
@@ -219,12 +222,13 @@ class LoginScreen(Screen):
                 break
 
 
-def do_login(root: tk.Tk, config: CompleteConfig) -> Tuple[bool, Optional[CognitoIDPToken]]:
-    """Performs a full login cycle. If auto login fails, manual will be asked"""
-    cognito = CognitoIDPClient()
-
+def do_login(root: tk.Tk, config: CompleteConfig, cognito: Future) -> Tuple[bool, Optional[CognitoIDPToken]]:
+    """
+    Performs a full login cycle. If auto login fails, manual will be asked.
+    The CognitoIDPClient is the result of the future, such that the login screen does not wait on its construction.
+    """
     if config.auto_login:
-        login_success, id_token = login_automatically(cognito=cognito)
+        login_success, id_token = login_automatically(cognito=cognito.result())
         if login_success:
             return login_success, id_token
 
@@ -243,7 +247,7 @@ def login_automatically(cognito: CognitoIDPClient) -> Tuple[bool, Optional[Cogni
     return cognito.get_login(email=stored_email, password=stored_password)
 
 
-def login_manually(root: tk.Tk, config: CompleteConfig, cognito: CognitoIDPClient) -> Tuple[
+def login_manually(root: tk.Tk, config: CompleteConfig, cognito: Future) -> Tuple[
     bool, Optional[CognitoIDPToken]]:
     """Function used for manually logging in to cognito"""
     # Open login screen
@@ -254,6 +258,9 @@ def login_manually(root: tk.Tk, config: CompleteConfig, cognito: CognitoIDPClien
 
 def retrieve_decrypted(username: KRUserName) -> Optional[str]:
     """Retrieves a decrypted token from the vault based on the username"""
+    import keyring as kr  # pylint: disable=import-outside-toplevel  # Only loaded when auto login is used
+    from cryptography.fernet import Fernet  # pylint: disable=import-outside-toplevel
+
     enc_message = kr.get_password(KRServiceName.CRED.value, username.value)
     key = kr.get_password(KRServiceName.KEY.value, username.value)
 
@@ -269,6 +276,9 @@ def retrieve_decrypted(username: KRUserName) -> Optional[str]:
 
 def delete_encrypted() -> None:
     """Deletes any encrypted tokens stored in the vault"""
+    import keyring as kr  # pylint: disable=import-outside-toplevel
+    from keyring.errors import PasswordDeleteError  # pylint: disable=import-outside-toplevel
+
     for element in KRServiceName:
         service = element.value
         for name in KRUserName:
@@ -281,6 +291,9 @@ def delete_encrypted() -> None:
 
 def store_encrypted(username: KRUserName, secret: str) -> None:
     """Stores the encrypted tokens in the vault"""
+    import keyring as kr  # pylint: disable=import-outside-toplevel
+    from cryptography.fernet import Fernet  # pylint: disable=import-outside-toplevel
+
     key = Fernet.generate_key()
 
     # Instance the Fernet class with the key
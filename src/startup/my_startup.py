@@ -0,0 +1,95 @@
+"""Module for the startup pipeline: the work that can run in the background and the timing of every phase"""
+import importlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Callable, Iterator, List, TypeVar
+
+DEFAULT_STARTUP_TIMINGS_FILE = "logs/startup_timings.json"
+
+T = TypeVar("T")
+
+
+@dataclass
+class StartupPhase:
+    name: str
+    thread: str
+    started_ms: float  # Since the start of the startup, phases on different threads overlap
+    duration_ms: float
+
+
+class StartupTimings:
+    """Records the phases of the startup, from any thread"""
+
+    def __init__(self):
+        self.started_at = perf_counter()
+        self.phases: List[StartupPhase] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            phase = StartupPhase(name=name, thread=threading.current_thread().name,
+                                 started_ms=(start - self.started_at) * 1000,
+                                 duration_ms=(perf_counter() - start) * 1000)
+            with self._lock:
+                self.phases.append(phase)
+
+    def format_table(self) -> str:
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p.started_ms)
+        lines = [f"{'phase':<36}{'thread':<16}{'start':>10}{'duration':>10}"]
+        for p in phases:
+            lines.append(f"{p.name[:35]:<36}{p.thread[:15]:<16}{p.started_ms:>10.0f}{p.duration_ms:>10.0f}")
+        lines.append(f"{'total':<52}{(perf_counter() - self.started_at) * 1000:>10.0f}")
+        return "\n".join(lines)
+
+    def export(self, file_path: str = DEFAULT_STARTUP_TIMINGS_FILE) -> None:
+        """Writes the phases as json, in ms"""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            phases = [asdict(phase) for phase in sorted(self.phases, key=lambda p: p.started_ms)]
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"total_ms": (perf_counter() - self.started_at) * 1000, "phases": phases}, file, indent=2)
+        logging.info("Startup timings written to %s", file_path)
+
+
+class BackgroundStartup:
+    """
+    Runs the startup work that does not need the Tk thread (imports, AWS clients, network calls) on a single
+    background thread, in the order it was submitted, while the Tk thread shows the login screen or builds the UI.
+    A single thread, since boto3 clients are not to be created concurrently on its default session.
+    """
+
+    def __init__(self, timings: StartupTimings):
+        self.timings = timings
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Startup")
+
+    def submit(self, name: str, fn: Callable[[], T]) -> "Future[T]":
+        """The result (or exception) of fn is in the future, its duration is recorded as a phase"""
+        def run() -> T:
+            with self.timings.phase(name):
+                return fn()
+        return self._executor.submit(run)
+
+    def preload(self, *module_names: str) -> "Future[None]":
+        """Imports the modules, such that importing them later on the Tk thread costs next to nothing"""
+        def import_modules() -> None:
+            for module_name in module_names:
+                importlib.import_module(module_name)
+        return self.submit(name=f"import {', '.join(module_names)}", fn=import_modules)
+
+    def shutdown(self) -> None:
+        """Does not wait for the work that is still running, its results are of no use anymore"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
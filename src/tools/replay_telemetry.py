@@ -0,0 +1,64 @@
+"""Headless replay of recorded iRacing sdk dumps through the full telemetry update path"""
+import argparse
+import logging
+from time import perf_counter
+from typing import Optional
+
+from src.backend.iRacing.ir_replay import IRReplay, find_scenario_dumps
+from src.backend.iRacing.telemetry import RITelemetry
+from src.backend.iRacing.telemetry_recorder import TelemetryRecorder
+from src.backend.utils.allocation_profiling import AllocationProfiler
+from src.backend.utils.frame_timing import FrameTimings
+
+
+def run_replay(ri_telemetry: RITelemetry, replay: IRReplay, profiler: Optional[AllocationProfiler] = None) -> float:
+    """Updates the telemetry until the replay is finished, returns the duration in seconds"""
+    start = perf_counter()
+    while not replay.finished:
+        ri_telemetry.update()
+        if profiler:
+            profiler.tick()
+    return perf_counter() - start
+
+
+def main() -> None:
+    """Replays the scenario dumps (or the given dumps) and reports the update throughput"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("dumps", nargs="*", help="Dump files or recordings, defaults to logs/scenario_freeze_*")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 1.0 is real time")
+    parser.add_argument("--fast", action="store_true", help="Replay as fast as possible")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times the dumps are played")
+    parser.add_argument("--record", help="Records the replayed data to this ring file")
+    parser.add_argument("--timings", help="Measures the time per update stage and writes it to this json file")
+    parser.add_argument("--allocations", help="Profiles the allocations and GC pauses, the report goes to this file")
+    parser.add_argument("--snapshot-interval", type=float, default=1.0,
+                        help="Seconds between the allocation snapshots, with --allocations")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    dump_files = args.dumps if args.dumps else find_scenario_dumps()
+    replay = IRReplay(dump_files=dump_files * args.repeat, speed=None if args.fast else args.speed)
+    recorder = TelemetryRecorder(file_path=args.record, chunk_size=1024 * 1024, nr_chunks=4) if args.record else None
+    timings = FrameTimings() if args.timings else None
+    ri_telemetry = RITelemetry(dynamo_db_resource=None, ir_sdk=replay, recorder=recorder, timings=timings)
+
+    profiler = AllocationProfiler(snapshot_interval_s=args.snapshot_interval) if args.allocations else None
+    if profiler:
+        profiler.start()
+
+    duration = run_replay(ri_telemetry=ri_telemetry, replay=replay, profiler=profiler)
+    if recorder:
+        recorder.close()
+    print(f"Replayed {replay.stats.frames_played} frames in {duration:.3f}s "
+          f"({replay.stats.frames_played / duration:.1f} ticks/s), dropped {replay.stats.frames_dropped}")
+    if timings:
+        print(timings.format_table())
+        timings.export(file_path=args.timings)
+    if profiler:
+        profiler.stop()
+        print(profiler.format_table())
+        profiler.export(file_path=args.allocations)
+
+
+if __name__ == '__main__':
+    main()